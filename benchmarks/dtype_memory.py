@@ -0,0 +1,60 @@
+"""Memory benchmark for the dtype policies in :mod:`socceraction.dtypes`.
+
+The SPADL actions in the test data are replicated to simulate a number of
+games. For each dtype policy, the script reports the memory used by the
+actions (with names), the VAEP features and the labels, and the peak memory
+allocated while computing the features::
+
+    python benchmarks/dtype_memory.py --games 100
+"""
+import argparse
+import os
+import tracemalloc
+
+import pandas as pd
+
+import socceraction.spadl as spadl
+from socceraction.dtypes import POLICIES, cast_actions, dtype_policy
+from socceraction.vaep import VAEP
+
+SPADL_JSON = os.path.join(
+    os.path.dirname(__file__), os.pardir, 'tests', 'datasets', 'spadl', 'spadl.json'
+)
+
+
+def _mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--games', type=int, default=100)
+    args = parser.parse_args()
+
+    game_actions = pd.read_json(SPADL_JSON, orient='records')
+    actions = pd.concat(
+        [game_actions.assign(game_id=i) for i in range(args.games)], ignore_index=True
+    )
+    games = pd.DataFrame(
+        {'game_id': range(args.games), 'home_team_id': game_actions.team_id.iloc[0]}
+    )
+    model = VAEP()
+
+    print(f'{len(actions)} actions in {args.games} games')
+    print(f'{"policy":<10}{"actions":>12}{"features":>12}{"labels":>12}{"peak":>12}')
+    for policy in POLICIES:
+        with dtype_policy(policy):
+            policy_actions = spadl.add_names(cast_actions(actions))
+            tracemalloc.start()
+            X = model.compute_features_many(games, policy_actions)
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            y = model.compute_labels_many(games, policy_actions)
+        print(
+            f'{policy:<10}{_mb(policy_actions):>10.1f}MB{_mb(X):>10.1f}MB'
+            f'{_mb(y):>10.1f}MB{peak:>10.1f}MB'
+        )
+
+
+if __name__ == '__main__':
+    main()
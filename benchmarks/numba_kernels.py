@@ -0,0 +1,68 @@
+"""Benchmark of the Numba kernels in :mod:`socceraction.kernels`.
+
+The SPADL actions in the test data are replicated to simulate a number of
+games. For each step that has a Numba kernel, the script reports the time of
+the pandas implementation and of the kernel, after a warm-up call that
+compiles the kernel::
+
+    python benchmarks/numba_kernels.py --games 100
+"""
+import argparse
+import os
+import timeit
+from typing import Any, Callable
+
+import pandas as pd
+
+import socceraction.spadl as spadl
+import socceraction.vaep.features as fs
+import socceraction.vaep.labels as lab
+from socceraction import kernels
+from socceraction.spadl.base import _add_dribbles
+
+SPADL_JSON = os.path.join(
+    os.path.dirname(__file__), os.pardir, 'tests', 'datasets', 'spadl', 'spadl.json'
+)
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> float:
+    fn()
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    if not kernels.NUMBA_AVAILABLE:
+        parser.error('numba is not installed')
+
+    game_actions = pd.read_json(SPADL_JSON, orient='records')
+    actions = pd.concat(
+        [game_actions.assign(game_id=i) for i in range(args.games)], ignore_index=True
+    )
+    named_actions = spadl.add_names(actions)
+    no_dribbles = actions[actions.type_id != spadl.config.actiontypes.index('dribble')]
+    no_dribbles = no_dribbles.reset_index(drop=True)
+
+    steps = {
+        'add_dribbles': lambda: _add_dribbles(no_dribbles),
+        'goalscore': lambda: fs.goalscore([named_actions]),
+        'horizons': lambda: lab.horizons(named_actions, [5, 10, 20]),
+    }
+    print(f'{len(actions)} actions in {args.games} games')
+    print(f'{"step":<20}{"pandas":>12}{"numba":>12}{"speedup":>10}')
+    for name, step in steps.items():
+        with kernels.use_numba(False):
+            fallback = _time(step, args.repeat)
+        with kernels.use_numba(True):
+            accelerated = _time(step, args.repeat)
+        print(
+            f'{name:<20}{fallback * 1e3:>10.1f}ms{accelerated * 1e3:>10.1f}ms'
+            f'{fallback / accelerated:>9.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
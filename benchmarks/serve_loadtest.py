@@ -0,0 +1,93 @@
+"""Load test for the rating service in :mod:`socceraction.serve`.
+
+Start a local instance of the service first, for example::
+
+    python -m socceraction.serve --model xt 43 3 v1 open_xt_12x8_v1.json
+
+and then run::
+
+    python benchmarks/serve_loadtest.py --model xt 43 3 v1 --concurrency 32
+
+Each request rates a sequence of synthetic SPADL actions. The script reports
+the throughput and the latency percentiles of the requests. Compare runs with
+different '--max-batch' and '--max-wait' settings of the service to tune the
+micro-batching.
+"""
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+import numpy as np
+
+import socceraction.spadl.config as spadlconfig
+
+
+def synthetic_actions(nb_actions: int, seed: int = 0) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    return {
+        'action_id': list(range(nb_actions)),
+        'period_id': [1] * nb_actions,
+        'time_seconds': np.sort(rng.uniform(0, 45 * 60, nb_actions)).tolist(),
+        'team_id': rng.choice([1, 2], nb_actions).tolist(),
+        'player_id': rng.integers(1, 23, nb_actions).tolist(),
+        'start_x': rng.uniform(0, spadlconfig.field_length, nb_actions).tolist(),
+        'start_y': rng.uniform(0, spadlconfig.field_width, nb_actions).tolist(),
+        'end_x': rng.uniform(0, spadlconfig.field_length, nb_actions).tolist(),
+        'end_y': rng.uniform(0, spadlconfig.field_width, nb_actions).tolist(),
+        'type_id': rng.integers(0, len(spadlconfig.actiontypes), nb_actions).tolist(),
+        'result_id': rng.integers(0, len(spadlconfig.results), nb_actions).tolist(),
+        'bodypart_id': rng.integers(0, len(spadlconfig.bodyparts), nb_actions).tolist(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument(
+        '--model',
+        nargs=4,
+        required=True,
+        metavar=('TYPE', 'COMPETITION', 'SEASON', 'VERSION'),
+    )
+    parser.add_argument('--home-team-id', type=int, default=1)
+    parser.add_argument('--actions', type=int, default=100, help='actions per request')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    model_type, competition_id, season_id, version = args.model
+    body = json.dumps(
+        {
+            'model_type': model_type,
+            'competition_id': int(competition_id) if competition_id.isdigit() else competition_id,
+            'season_id': int(season_id) if season_id.isdigit() else season_id,
+            'version': int(version) if version.isdigit() else version,
+            'home_team_id': args.home_team_id,
+            'actions': synthetic_actions(args.actions),
+        }
+    ).encode()
+
+    def post(_: int) -> float:
+        request = urllib.request.Request(
+            f'{args.url}/rate', body, {'Content-Type': 'application/json'}
+        )
+        start = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        latencies = np.array(list(pool.map(post, range(args.requests))))
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(latencies * 1000, [50, 95, 99])
+    print(f'{args.requests} requests in {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s)')
+    print(f'latency p50={p50:.1f}ms p95={p95:.1f}ms p99={p99:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
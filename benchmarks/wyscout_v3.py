@@ -0,0 +1,147 @@
+"""Benchmark of the stages of the Wyscout v3 to SPADL converter.
+
+The script generates random Wyscout v3 events and reports the time of each
+stage of :func:`socceraction.spadl.wyscout_v3.convert_to_actions`. The fixes
+that :func:`~socceraction.spadl.wyscout_v3.fix_wyscout_events` applies in a
+single pass are also timed one by one, as separate passes over the events::
+
+    python benchmarks/wyscout_v3.py --events 100000
+"""
+import argparse
+import timeit
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from socceraction.spadl import wyscout_v3 as wy
+
+TYPES = [
+    'pass',
+    'touch',
+    'duel',
+    'acceleration',
+    'interception',
+    'shot',
+    'clearance',
+    'corner',
+    'free_kick',
+    'offside',
+    'game_interruption',
+    'fairplay',
+    'infraction',
+    'shot_against',
+]
+
+
+def _events(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    ids = np.arange(n) * 10
+
+    def flag() -> np.ndarray:
+        return rng.choice([0.0, 1.0, np.nan], n)
+
+    def coordinate() -> np.ndarray:
+        return rng.integers(0, 101, n).astype(float)
+
+    columns = {
+        'id': ids,
+        'match_id': 1,
+        'match_period': np.where(np.arange(n) < n // 2, '1H', '2H'),
+        'minute': np.arange(n) * 90 // n,
+        'second': rng.integers(0, 60, n),
+        'team_id': rng.choice([1, 2], n),
+        'player_id': rng.integers(1, 30, n),
+        'home_team_id': 1,
+        'type_primary': rng.choice(TYPES, n),
+        'pass_height': rng.choice(np.array(['blocked', 'high', None]), n, p=[0.1, 0.3, 0.6]),
+        'location_x': rng.integers(0, 101, n),
+        'location_y': rng.integers(0, 101, n),
+        'pass_end_location_x': coordinate(),
+        'pass_end_location_y': coordinate(),
+        'carry_end_location_x': coordinate(),
+        'carry_end_location_y': coordinate(),
+        'infraction_type': rng.choice(np.array(['hand_foul', 'regular_foul', None]), n),
+        'pass_length': rng.choice([np.nan, 10.0, 40.0], n),
+        'shot_goal_zone': rng.choice(np.array(['gt', 'glb', 'otr', 'pr', 'bc', None]), n),
+        'shot_xg': rng.random(n),
+        'ground_duel_related_duel_id': np.where(rng.random(n) < 0.5, ids + 10, np.nan),
+        'aerial_duel_related_duel_id': np.where(rng.random(n) < 0.2, ids + 10, np.nan),
+        'ground_duel_duel_type': rng.choice(np.array(['dribble', 'defensive', None]), n),
+    }
+    for col in [
+        'type_carry',
+        'type_save',
+        'type_hand_pass',
+        'type_head_pass',
+        'type_head_shot',
+        'type_aerial_duel',
+        'type_cross',
+        'type_free_kick_cross',
+        'type_free_kick_shot',
+        'type_shot_assist',
+        'shot_is_goal',
+        'pass_accurate',
+        'ground_duel_take_on',
+        'ground_duel_kept_possession',
+        'ground_duel_recovered_possession',
+        'aerial_duel_first_touch',
+        'ground_duel_progressed_with_ball',
+        'ground_duel_stopped_progress',
+    ]:
+        columns[col] = flag()
+    return pd.DataFrame(columns)
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    events = _events(args.events)
+    positions = wy.make_new_positions(events)
+    fixed = wy.fix_wyscout_events(positions)
+    actions = wy.create_df_actions(fixed.copy())
+    fixes = [
+        wy.create_shot_coordinates,
+        wy.add_expected_assists,
+        wy.convert_duels,
+        wy.insert_interception_coordinates,
+        wy.add_offside_variable,
+        wy.convert_touches,
+        wy.convert_accelerations,
+        wy.insert_fairplay_coordinates,
+        wy.insert_coordinates_edge_cases,
+    ]
+    # the input of each separate fix is the output of the previous one
+    inputs = [positions]
+    for fix in fixes[:-1]:
+        inputs.append(fix(inputs[-1].copy()))
+
+    print(f'{len(events)} events')
+    separate = 0.0
+    for fix, fix_input in zip(fixes, inputs):
+        # the fixes modify their input
+        elapsed = _time(lambda: fix(fix_input.copy()), args.repeat)
+        elapsed -= _time(fix_input.copy, args.repeat)
+        separate += elapsed
+        print(f'  {fix.__name__:<36}{elapsed * 1e3:>10.1f}ms')
+    print(f'  {"total of the separate fixes":<36}{separate * 1e3:>10.1f}ms')
+    steps = {
+        'make_new_positions': lambda: wy.make_new_positions(events),
+        'fix_wyscout_events': lambda: wy.fix_wyscout_events(positions),
+        'create_df_actions': lambda: wy.create_df_actions(fixed.copy()),
+        'fix_actions': lambda: wy.fix_actions(actions.copy()),
+        'convert_to_actions': lambda: wy.convert_to_actions(events),
+    }
+    for name, step in steps.items():
+        print(f'{name:<38}{_time(step, args.repeat) * 1e3:>10.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""Implements the aggregation of action ratings to player and team ratings.
+
+Action values such as VAEP or xT are typically summarised per player or team
+and normalised by the number of minutes played. The
+:class:`RatingAggregator` reduces the ratings of each batch of games to one
+row per player per game and combines these rows into totals and per-90
+ratings at any level of aggregation. Games can be added incrementally.
+"""
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+import socceraction.spadl.config as spadlconfig
+
+_KEYS = ['game_id', 'player_id', 'team_id', 'season_id']
+
+
+class RatingAggregator:
+    """Aggregate action ratings to player, team and season ratings.
+
+    Parameters
+    ----------
+    value_cols : list(str)
+        The columns with the action values to aggregate.
+    breakdown_col : str, optional
+        The value column that is broken down by action type. Set to None to
+        skip the breakdown.
+
+    Attributes
+    ----------
+    player_games : pd.DataFrame
+        The ratings of each player in each game that was added, with the
+        number of actions, the minutes played and the sum of each value column.
+
+    Examples
+    --------
+    >>> agg = RatingAggregator()
+    >>> for game_id in games.game_id:
+    ...     agg.update(ratings[ratings.game_id == game_id], loader.players(game_id), games)
+    >>> agg.players(min_minutes=900, per_season=True)
+    """
+
+    def __init__(
+        self,
+        value_cols: Sequence[str] = ('offensive_value', 'defensive_value', 'vaep_value'),
+        breakdown_col: Optional[str] = 'vaep_value',
+    ) -> None:
+        self.value_cols = list(value_cols)
+        self.breakdown_col = breakdown_col
+        self.player_games = pd.DataFrame(
+            columns=_KEYS + ['minutes_played', 'nb_actions'] + self.value_cols
+        )
+
+    def update(
+        self,
+        ratings: pd.DataFrame,
+        player_games: pd.DataFrame,
+        games: Optional[pd.DataFrame] = None,
+    ) -> 'RatingAggregator':
+        """Add the ratings of new games.
+
+        The ratings of a game that was added before are replaced.
+
+        Parameters
+        ----------
+        ratings : pd.DataFrame
+            The rated actions, with a 'game_id', 'player_id', 'team_id' and
+            'type_name' or 'type_id' column and the value columns.
+        player_games : pd.DataFrame
+            The players of each game, with a 'game_id', 'player_id', 'team_id'
+            and 'minutes_played' column, as returned by the ``players``
+            method of the data loaders.
+        games : pd.DataFrame, optional
+            The games, with a 'game_id' and 'season_id' column. Without
+            games, all games are assigned to the same season.
+
+        Returns
+        -------
+        RatingAggregator
+            The aggregator itself.
+        """
+        keys = ['game_id', 'player_id', 'team_id']
+        grouped = ratings.groupby(keys, sort=False)
+        sums = grouped[self.value_cols].sum()
+        sums.insert(0, 'nb_actions', grouped.size())
+
+        if self.breakdown_col is not None:
+            if 'type_name' in ratings.columns:
+                type_names = ratings['type_name']
+            else:
+                type_names = pd.Series(
+                    np.asarray(spadlconfig.actiontypes)[ratings['type_id'].values],
+                    index=ratings.index,
+                )
+            breakdown = (
+                ratings.groupby(keys + [type_names.rename('type_name')], sort=False)[
+                    self.breakdown_col
+                ]
+                .sum()
+                .unstack('type_name', fill_value=0.0)
+            )
+            breakdown.columns = [f'{self.breakdown_col}_{t}' for t in breakdown.columns]
+            sums = sums.join(breakdown)
+
+        minutes = player_games.set_index(keys)['minutes_played']
+        new = sums.join(minutes, how='outer').reset_index()
+        new['minutes_played'] = new['minutes_played'].fillna(0)
+        new = new.fillna({c: 0 for c in new.columns if c not in keys})
+        if games is not None:
+            new['season_id'] = new['game_id'].map(games.set_index('game_id')['season_id'])
+        else:
+            new['season_id'] = None
+
+        if len(self.player_games) > 0:
+            old = self.player_games[~self.player_games['game_id'].isin(new['game_id'])]
+            new = pd.concat([old, new], ignore_index=True, sort=False)
+            # action types that were not performed in the old or new games
+            value_cols = [c for c in new.columns if c not in _KEYS]
+            new[value_cols] = new[value_cols].fillna(0)
+        self.player_games = new
+        return self
+
+    def aggregate(self, by: Union[str, List[str]], min_minutes: float = 0) -> pd.DataFrame:
+        """Compute the total and per-90 ratings of each group.
+
+        If the groups are players, the minutes played are the minutes of the
+        player. Otherwise, they are the minutes that the team played, which
+        is the largest number of minutes played by one of its players in each
+        game.
+
+        Parameters
+        ----------
+        by : str or list(str)
+            The columns to group by. A subset of 'player_id', 'team_id',
+            'season_id' and 'game_id'.
+        min_minutes : float
+            Discard the groups with fewer minutes played.
+
+        Returns
+        -------
+        pd.DataFrame
+            The number of games, number of actions, minutes played, the sum of
+            each value column and its per-90 rate for each group.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        pg = self.player_games
+        sum_cols = [c for c in pg.columns if c not in _KEYS + ['minutes_played']]
+        grouped = pg.groupby(by, dropna=False)
+        totals = grouped[sum_cols].sum()
+        if 'player_id' in by:
+            totals.insert(0, 'minutes_played', grouped['minutes_played'].sum())
+            totals.insert(0, 'nb_games', grouped['game_id'].nunique())
+        else:
+            team_games = pg.groupby(['game_id', 'team_id'], as_index=False, dropna=False).agg(
+                {'season_id': 'first', 'minutes_played': 'max'}
+            )
+            team_grouped = team_games.groupby(by, dropna=False)
+            totals.insert(0, 'minutes_played', team_grouped['minutes_played'].sum())
+            totals.insert(0, 'nb_games', team_grouped['game_id'].nunique())
+
+        totals = totals[totals['minutes_played'] >= min_minutes]
+        per90 = totals[sum_cols].div(totals['minutes_played'].replace(0, np.nan), axis=0) * 90
+        per90.columns = [f'{c}_per90' for c in per90.columns]
+        return pd.concat([totals, per90], axis=1)
+
+    def players(self, min_minutes: float = 0, per_season: bool = False) -> pd.DataFrame:
+        """Compute the total and per-90 ratings of each player.
+
+        Parameters
+        ----------
+        min_minutes : float
+            Discard the players with fewer minutes played.
+        per_season : bool
+            Rate each player separately in each season.
+
+        Returns
+        -------
+        pd.DataFrame
+            The ratings of each player. See :meth:`aggregate`.
+        """
+        return self.aggregate(
+            ['season_id', 'player_id'] if per_season else 'player_id', min_minutes
+        )
+
+    def teams(self, per_season: bool = False) -> pd.DataFrame:
+        """Compute the total and per-90 ratings of each team.
+
+        Parameters
+        ----------
+        per_season : bool
+            Rate each team separately in each season.
+
+        Returns
+        -------
+        pd.DataFrame
+            The ratings of each team. See :meth:`aggregate`.
+        """
+        return self.aggregate(['season_id', 'team_id'] if per_season else 'team_id')
+
+    def seasons(self) -> pd.DataFrame:
+        """Compute the total and per-90 ratings of each season.
+
+        Returns
+        -------
+        pd.DataFrame
+            The ratings of all teams in each season. See :meth:`aggregate`.
+        """
+        return self.aggregate('season_id')
@@ -1,45 +1,22 @@
 """Implements a converter for regular SPADL actions to atomic actions."""
-from typing import cast
+from typing import Any
 
+import numpy as np
 import pandas as pd
 from pandera.typing import DataFrame
 
+import socceraction.spadl.base as _spadlbase
 import socceraction.spadl.config as _spadl
-from socceraction.spadl.base import _add_dribbles
+from socceraction.dtypes import cast_actions
+from socceraction.spadl.base import _interleave, _next_idx
 from socceraction.spadl.schema import SPADLSchema
 
 from . import config as _atomicspadl
 from .schema import AtomicSPADLSchema
 
-
-def convert_to_atomic(actions: DataFrame[SPADLSchema]) -> DataFrame[AtomicSPADLSchema]:
-    """Convert regular SPADL actions to atomic actions.
-
-    Parameters
-    ----------
-    actions : pd.DataFrame
-        A SPADL dataframe.
-
-    Returns
-    -------
-    pd.DataFrame
-        The Atomic-SPADL dataframe.
-    """
-    atomic_actions = cast(pd.DataFrame, actions.copy())
-    atomic_actions = _extra_from_passes(atomic_actions)
-    atomic_actions = _add_dribbles(atomic_actions)  # for some reason this adds more dribbles
-    atomic_actions = _extra_from_shots(atomic_actions)
-    atomic_actions = _extra_from_fouls(atomic_actions)
-    atomic_actions = _convert_columns(atomic_actions)
-    atomic_actions = _simplify(atomic_actions)
-    return atomic_actions.pipe(DataFrame[AtomicSPADLSchema])
-
-
-def _extra_from_passes(actions: pd.DataFrame) -> pd.DataFrame:
-    next_actions = actions.shift(-1)
-    same_team = actions.team_id == next_actions.team_id
-
-    passlike = [
+_pass_ids = [
+    _spadl.actiontypes.index(ty)
+    for ty in [
         'pass',
         'cross',
         'throw_in',
@@ -50,9 +27,10 @@ def _extra_from_passes(actions: pd.DataFrame) -> pd.DataFrame:
         'clearance',
         'goalkick',
     ]
-    pass_ids = list(_spadl.actiontypes.index(ty) for ty in passlike)
-
-    interceptionlike = [
+]
+_interception_ids = [
+    _spadl.actiontypes.index(ty)
+    for ty in [
         'interception',
         'tackle',
         'keeper_punch',
@@ -60,176 +38,144 @@ def _extra_from_passes(actions: pd.DataFrame) -> pd.DataFrame:
         'keeper_claim',
         'keeper_pick_up',
     ]
-    interception_ids = list(_spadl.actiontypes.index(ty) for ty in interceptionlike)
-
-    samegame = actions.game_id == next_actions.game_id
-    sameperiod = actions.period_id == next_actions.period_id
-    # samephase = next_actions.time_seconds - actions.time_seconds < max_pass_duration
-    extra_idx = (
-        actions.type_id.isin(pass_ids)
-        & samegame
-        & sameperiod  # & samephase
-        & ~next_actions.type_id.isin(interception_ids)
-    )
-
-    prev = actions[extra_idx]
-    nex = next_actions[extra_idx]
-
-    extra = pd.DataFrame()
-    extra['game_id'] = prev.game_id
-    extra['original_event_id'] = prev.original_event_id
-    extra['period_id'] = prev.period_id
-    extra['action_id'] = prev.action_id + 0.1
-    extra['time_seconds'] = (prev.time_seconds + nex.time_seconds) / 2
-    extra['start_x'] = prev.end_x
-    extra['start_y'] = prev.end_y
-    extra['end_x'] = prev.end_x
-    extra['end_y'] = prev.end_y
-    extra['bodypart_id'] = _atomicspadl.bodyparts.index('foot')
-    extra['result_id'] = -1
-
-    offside = prev.result_id == _spadl.results.index('offside')
-    out = ((nex.type_id == _atomicspadl.actiontypes.index('goalkick')) & (~same_team)) | (
-        nex.type_id == _atomicspadl.actiontypes.index('throw_in')
-    )
-    ar = _atomicspadl.actiontypes
-    extra['type_id'] = -1
-    extra['type_id'] = (
-        extra.type_id.mask(same_team, ar.index('receival'))
-        .mask(~same_team, ar.index('interception'))
-        .mask(out, ar.index('out'))
-        .mask(offside, ar.index('offside'))
-    )
-    is_interception = extra['type_id'] == ar.index('interception')
-    extra['team_id'] = prev.team_id.mask(is_interception, nex.team_id)
-    extra['player_id'] = nex.player_id.mask(out | offside, prev.player_id).astype(
-        prev.player_id.dtype
-    )
+]
+_shot_ids = [_spadl.actiontypes.index(ty) for ty in ['shot', 'shot_freekick', 'shot_penalty']]
+# the actions that restart the game after a shot that went out
+_restart_ids = [
+    _spadl.actiontypes.index(ty) for ty in ['corner_crossed', 'corner_short', 'goalkick']
+]
+_corner_ids = [_spadl.actiontypes.index(ty) for ty in ['corner_crossed', 'corner_short']]
+_freekick_ids = [
+    _spadl.actiontypes.index(ty) for ty in ['freekick_crossed', 'freekick_short', 'shot_freekick']
+]
 
-    actions = pd.concat([actions, extra], ignore_index=True, sort=False)
-    actions = actions.sort_values(['game_id', 'period_id', 'action_id']).reset_index(drop=True)
-    actions['action_id'] = range(len(actions))
-    return actions
 
+def convert_to_atomic(actions: DataFrame[SPADLSchema]) -> DataFrame[AtomicSPADLSchema]:
+    """Convert regular SPADL actions to atomic actions.
 
-def _extra_from_shots(actions: pd.DataFrame) -> pd.DataFrame:
-    next_actions = actions.shift(-1)
-
-    shotlike = ['shot', 'shot_freekick', 'shot_penalty']
-    shot_ids = list(_spadl.actiontypes.index(ty) for ty in shotlike)
+    The receivals, interceptions, outs, offsides, goals, owngoals, cards and
+    dribbles that follow each action are derived in a single pass from the
+    next action of the same game. They are inserted together with the
+    converted actions, such that the actions of multiple games can be
+    converted at once.
 
-    samegame = actions.game_id == next_actions.game_id
-    sameperiod = actions.period_id == next_actions.period_id
+    Parameters
+    ----------
+    actions : pd.DataFrame
+        A SPADL dataframe.
 
-    shot = actions.type_id.isin(shot_ids)
-    goal = shot & (actions.result_id == _spadl.results.index('success'))
-    owngoal = actions.result_id == _spadl.results.index('owngoal')
-    next_corner_goalkick = next_actions.type_id.isin(
-        [
-            _atomicspadl.actiontypes.index('corner_crossed'),
-            _atomicspadl.actiontypes.index('corner_short'),
-            _atomicspadl.actiontypes.index('goalkick'),
-        ]
-    )
-    out = shot & next_corner_goalkick & samegame & sameperiod
-
-    extra_idx = goal | owngoal | out
-    prev = actions[extra_idx]
-    # nex = next_actions[extra_idx]
-
-    extra = pd.DataFrame()
-    extra['game_id'] = prev.game_id
-    extra['original_event_id'] = prev.original_event_id
-    extra['period_id'] = prev.period_id
-    extra['action_id'] = prev.action_id + 0.1
-    extra['time_seconds'] = prev.time_seconds  # + nex.time_seconds) / 2
-    extra['start_x'] = prev.end_x
-    extra['start_y'] = prev.end_y
-    extra['end_x'] = prev.end_x
-    extra['end_y'] = prev.end_y
-    extra['bodypart_id'] = prev.bodypart_id
-    extra['result_id'] = -1
-    extra['team_id'] = prev.team_id
-    extra['player_id'] = prev.player_id
+    Returns
+    -------
+    pd.DataFrame
+        The Atomic-SPADL dataframe.
+    """
+    n = len(actions)
+    game_id = actions.game_id.values
+    period_id = actions.period_id.values
+    time_seconds = actions.time_seconds.values
+    team_id = actions.team_id.values
+    player_id = actions.player_id.values
+    type_id = actions.type_id.values
+    result_id = actions.result_id.values
+    bodypart_id = actions.bodypart_id.values
+    start_x, start_y = actions.start_x.values, actions.start_y.values
+    end_x, end_y = actions.end_x.values, actions.end_y.values
 
     ar = _atomicspadl.actiontypes
-    extra['type_id'] = -1
-    extra['type_id'] = (
-        extra.type_id.mask(out, ar.index('out'))
-        .mask(goal, ar.index('goal'))
-        .mask(owngoal, ar.index('owngoal'))
+    next_idx = _next_idx(n, game_id)
+    # the next action is in the same game and period
+    has_next = (next_idx != np.arange(n)) & (period_id[next_idx] == period_id)
+    next_type = type_id[next_idx]
+    next_team = team_id[next_idx]
+    same_team = next_team == team_id
+
+    # the receival, interception, out or offside after a pass
+    receival = has_next & np.isin(type_id, _pass_ids) & ~np.isin(next_type, _interception_ids)
+    offside = result_id == _spadl.results.index('offside')
+    out = ((next_type == ar.index('goalkick')) & ~same_team) | (next_type == ar.index('throw_in'))
+    receival_type = np.select(
+        [offside, out, same_team],
+        [ar.index('offside'), ar.index('out'), ar.index('receival')],
+        ar.index('interception'),
     )
-    actions = pd.concat([actions, extra], ignore_index=True, sort=False)
-    actions = actions.sort_values(['game_id', 'period_id', 'action_id']).reset_index(drop=True)
-    actions['action_id'] = range(len(actions))
-    return actions
-
-
-def _extra_from_fouls(actions: pd.DataFrame) -> pd.DataFrame:
-    yellow = actions.result_id == _spadl.results.index('yellow_card')
-    red = actions.result_id == _spadl.results.index('red_card')
-
-    prev = actions[yellow | red]
-    extra = pd.DataFrame()
-    extra['game_id'] = prev.game_id
-    extra['original_event_id'] = prev.original_event_id
-    extra['period_id'] = prev.period_id
-    extra['action_id'] = prev.action_id + 0.1
-    extra['time_seconds'] = prev.time_seconds  # + nex.time_seconds) / 2
-    extra['start_x'] = prev.end_x
-    extra['start_y'] = prev.end_y
-    extra['end_x'] = prev.end_x
-    extra['end_y'] = prev.end_y
-    extra['bodypart_id'] = prev.bodypart_id
-    extra['result_id'] = -1
-    extra['team_id'] = prev.team_id
-    extra['player_id'] = prev.player_id
-
-    ar = _atomicspadl.actiontypes
-    extra['type_id'] = -1
-    extra['type_id'] = extra.type_id.mask(yellow, ar.index('yellow_card')).mask(
-        red, ar.index('red_card')
+    receival_team = np.where(receival_type == ar.index('interception'), next_team, team_id)
+    receival_player = np.where(offside | out, player_id, player_id[next_idx])
+    receival_time = (time_seconds + time_seconds[next_idx]) / 2
+
+    # the dribble between a pass or its receival and the next action
+    prev_team = np.where(receival, receival_team, team_id)
+    prev_time = np.where(receival, receival_time, time_seconds)
+    dx = end_x - start_x[next_idx]
+    dy = end_y - start_y[next_idx]
+    dribble = (
+        has_next
+        & (next_team == prev_team)
+        & (dx**2 + dy**2 >= _spadlbase.min_dribble_length**2)
+        & (dx**2 + dy**2 <= _spadlbase.max_dribble_length**2)
+        & (time_seconds[next_idx] - prev_time < _spadlbase.max_dribble_duration)
+    )
+    dribble_time = (prev_time + time_seconds[next_idx]) / 2
+
+    # the goal, owngoal or out after a shot
+    shot = np.isin(type_id, _shot_ids)
+    goal = shot & (result_id == _spadl.results.index('success'))
+    owngoal = result_id == _spadl.results.index('owngoal')
+    # a shot followed by a dribble is not out
+    shot_out = shot & has_next & ~dribble & np.isin(next_type, _restart_ids)
+    shot_type = np.select(
+        [owngoal, goal], [ar.index('owngoal'), ar.index('goal')], ar.index('out')
     )
-    actions = pd.concat([actions, extra], ignore_index=True, sort=False)
-    actions = actions.sort_values(['game_id', 'period_id', 'action_id']).reset_index(drop=True)
-    actions['action_id'] = range(len(actions))
-    return actions
-
-
-def _convert_columns(actions: pd.DataFrame) -> pd.DataFrame:
-    actions['x'] = actions.start_x
-    actions['y'] = actions.start_y
-    actions['dx'] = actions.end_x - actions.start_x
-    actions['dy'] = actions.end_y - actions.start_y
-    return actions[
-        [
-            'game_id',
-            'original_event_id',
-            'action_id',
-            'period_id',
-            'time_seconds',
-            'team_id',
-            'player_id',
-            'x',
-            'y',
-            'dx',
-            'dy',
-            'type_id',
-            'bodypart_id',
-        ]
-    ]
-
-
-def _simplify(actions: pd.DataFrame) -> pd.DataFrame:
-    a = actions
-    ar = _atomicspadl.actiontypes
-
-    cornerlike = ['corner_crossed', 'corner_short']
-    corner_ids = list(_spadl.actiontypes.index(ty) for ty in cornerlike)
 
-    freekicklike = ['freekick_crossed', 'freekick_short', 'shot_freekick']
-    freekick_ids = list(_spadl.actiontypes.index(ty) for ty in freekicklike)
+    yellow = result_id == _spadl.results.index('yellow_card')
+    red = result_id == _spadl.results.index('red_card')
+    card_type = np.where(red, ar.index('red_card'), ar.index('yellow_card'))
+
+    # the card, shot outcome, receival and dribble follow an action in this order
+    inserted = np.column_stack([yellow | red, goal | owngoal | shot_out, receival, dribble])
+    after, kind = np.divmod(np.flatnonzero(inserted), inserted.shape[1])
+    is_dribble = kind == 3
+
+    def choose(*values: Any) -> np.ndarray:
+        # the value of each extra action from the value for its kind
+        return np.choose(kind, [np.asarray(v)[after] if np.ndim(v) else v for v in values])
+
+    next_after = next_idx[after]
+    foot = _atomicspadl.bodyparts.index('foot')
+    extra = pd.DataFrame(
+        {
+            'game_id': game_id[after],
+            'original_event_id': actions.original_event_id.iloc[after].where(~is_dribble).values,
+            'period_id': period_id[after],
+            'time_seconds': choose(time_seconds, time_seconds, receival_time, dribble_time),
+            'team_id': choose(team_id, team_id, receival_team, next_team),
+            'player_id': choose(player_id, player_id, receival_player, player_id[next_idx]),
+            'x': end_x[after],
+            'y': end_y[after],
+            'dx': np.where(is_dribble, start_x[next_after] - end_x[after], 0.0),
+            'dy': np.where(is_dribble, start_y[next_after] - end_y[after], 0.0),
+            'type_id': choose(card_type, shot_type, receival_type, ar.index('dribble')),
+            'bodypart_id': choose(bodypart_id, bodypart_id, foot, foot),
+        }
+    )
 
-    a['type_id'] = a.type_id.mask(a.type_id.isin(corner_ids), ar.index('corner'))
-    a['type_id'] = a.type_id.mask(a.type_id.isin(freekick_ids), ar.index('freekick'))
-    return a
+    type_id = np.where(np.isin(type_id, _corner_ids), ar.index('corner'), type_id)
+    type_id = np.where(np.isin(type_id, _freekick_ids), ar.index('freekick'), type_id)
+    atomic_actions = pd.DataFrame(
+        {
+            'game_id': game_id,
+            'original_event_id': actions.original_event_id.values,
+            'action_id': actions.action_id.values,
+            'period_id': period_id,
+            'time_seconds': time_seconds,
+            'team_id': team_id,
+            'player_id': player_id,
+            'x': start_x,
+            'y': start_y,
+            'dx': end_x - start_x,
+            'dy': end_y - start_y,
+            'type_id': type_id,
+            'bodypart_id': bodypart_id,
+        }
+    )
+    atomic_actions = _interleave(atomic_actions, extra, after)
+    return cast_actions(atomic_actions.pipe(DataFrame[AtomicSPADLSchema]))
@@ -1,6 +1,8 @@
 """Utility functions for working with Atomic-SPADL dataframes."""
 from pandera.typing import DataFrame
 
+from socceraction.dtypes import cast_actions
+
 from . import config as spadlconfig
 from .schema import AtomicSPADLSchema
 
@@ -24,6 +26,7 @@ def add_names(actions: DataFrame[AtomicSPADLSchema]) -> DataFrame[AtomicSPADLSch
         .merge(spadlconfig.actiontypes_df(), how='left')
         .merge(spadlconfig.bodyparts_df(), how='left')
         .pipe(DataFrame[AtomicSPADLSchema])
+        .pipe(cast_actions)
     )
 
 
@@ -3,12 +3,14 @@ from typing import Any, Callable, List, Union
 
 import numpy as np
 import pandas as pd
+from numpy.typing import ArrayLike
 from pandera.typing import DataFrame
 
 import socceraction.atomic.spadl.config as atomicspadl
 from socceraction.atomic.spadl import AtomicSPADLSchema
 from socceraction.spadl import SPADLSchema
 from socceraction.vaep.features import (
+    _goalscore,
     actiontype,
     bodypart,
     bodypart_onehot,
@@ -83,7 +85,7 @@ def feature_column_names(fs: List[FeatureTransfomer], nb_prev_actions: int = 3)
     return list(pd.concat([f(gs) for f in fs], axis=1).columns)
 
 
-def play_left_to_right(gamestates: GameStates, home_team_id: int) -> GameStates:
+def play_left_to_right(gamestates: GameStates, home_team_id: Union[int, ArrayLike]) -> GameStates:
     """Perform all action in the same playing direction.
 
     This changes the start and end location of each action, such that all actions
@@ -93,8 +95,9 @@ def play_left_to_right(gamestates: GameStates, home_team_id: int) -> GameStates:
     ----------
     gamestates : GameStates
         The game states of a game.
-    home_team_id : int
-        The ID of the home team.
+    home_team_id : int or array-like
+        The ID of the home team, or the ID of the home team in the game of
+        each game state.
 
     Returns
     -------
@@ -102,7 +105,7 @@ def play_left_to_right(gamestates: GameStates, home_team_id: int) -> GameStates:
         The game states with all actions performed left to right.
     """
     a0 = gamestates[0]
-    away_idx = a0.team_id != home_team_id
+    away_idx = (a0.team_id != home_team_id).values
     for actions in gamestates:
         actions.loc[away_idx, 'x'] = atomicspadl.field_length - actions[away_idx]['x'].values
         actions.loc[away_idx, 'y'] = atomicspadl.field_width - actions[away_idx]['y'].values
@@ -242,19 +245,10 @@ def goalscore(gamestates: GameStates) -> Features:
         and the goal difference between both teams ('goalscore_diff').
     """
     actions = gamestates[0]
-    teamA = actions['team_id'].values[0]
     goals = actions.type_name == 'goal'
     owngoals = actions['type_name'].str.contains('owngoal')
+    return _goalscore(actions, goals, owngoals)
 
-    teamisA = actions['team_id'] == teamA
-    teamisB = ~teamisA
-    goalsteamA = (goals & teamisA) | (owngoals & teamisB)
-    goalsteamB = (goals & teamisB) | (owngoals & teamisA)
-    goalscoreteamA = goalsteamA.cumsum() - goalsteamA
-    goalscoreteamB = goalsteamB.cumsum() - goalsteamB
-
-    scoredf = pd.DataFrame()
-    scoredf['goalscore_team'] = (goalscoreteamA * teamisA) + (goalscoreteamB * teamisB)
-    scoredf['goalscore_opponent'] = (goalscoreteamB * teamisA) + (goalscoreteamA * teamisB)
-    scoredf['goalscore_diff'] = scoredf['goalscore_team'] - scoredf['goalscore_opponent']
-    return scoredf
+
+# goalscore counts the goals in all preceding actions of the game
+goalscore.requires_game_history = True  # type: ignore
@@ -1,14 +1,16 @@
 """Implements the formula of the Atomic-VAEP framework."""
+from typing import Optional, Tuple
+
+import numpy as np
 import pandas as pd
+from numpy.typing import ArrayLike
 from pandera.typing import DataFrame, Series
 
+import socceraction.atomic.spadl.config as atomicspadl
 from socceraction.atomic.spadl import AtomicSPADLSchema
+from socceraction.vaep.formula import _prev_idx
 
-
-def _prev(x: pd.Series) -> pd.Series:
-    prev_x = x.shift(1)
-    prev_x[:1] = x.values[0]
-    return prev_x
+_goal_ids = np.array([atomicspadl.actiontypes.index(t) for t in ['goal', 'owngoal']])
 
 
 def offensive_value(
@@ -41,20 +43,14 @@ def offensive_value(
     pd.Series
         he ffensive value of each action.
     """
-    sameteam = _prev(actions.team_id) == actions.team_id
-    prev_scores = _prev(scores) * sameteam + _prev(concedes) * (~sameteam)
-
-    # if the previous action was too long ago, the odds of scoring are now 0
-    # toolong_idx = (
-    #    abs(actions.time_seconds - _prev(actions.time_seconds)) > _samephase_nb
-    # )
-    # prev_scores[toolong_idx] = 0
-
-    # if the previous action was a goal, the odds of scoring are now 0
-    prevgoal_idx = _prev(actions.type_name).isin(['goal', 'owngoal'])
-    prev_scores[prevgoal_idx] = 0
-
-    return scores - prev_scores
+    offensive, _ = values_from_arrays(
+        actions.type_id.values,
+        actions.team_id.values,
+        np.asarray(scores, dtype=float),
+        np.asarray(concedes, dtype=float),
+        actions.game_id.values if 'game_id' in actions.columns else None,
+    )
+    return pd.Series(offensive, index=scores.index)
 
 
 def defensive_value(
@@ -87,20 +83,14 @@ def defensive_value(
     pd.Series
         The defensive value of each action.
     """
-    sameteam = _prev(actions.team_id) == actions.team_id
-    prev_concedes = _prev(concedes) * sameteam + _prev(scores) * (~sameteam)
-
-    # if the previous action was too long ago, the odds of scoring are now 0
-    # toolong_idx = (
-    #    abs(actions.time_seconds - _prev(actions.time_seconds)) > _samephase_nb
-    # )
-    # prev_concedes[toolong_idx] = 0
-
-    # if the previous action was a goal, the odds of conceding are now 0
-    prevgoal_idx = _prev(actions.type_name).isin(['goal', 'owngoal'])
-    prev_concedes[prevgoal_idx] = 0
-
-    return -(concedes - prev_concedes)
+    _, defensive = values_from_arrays(
+        actions.type_id.values,
+        actions.team_id.values,
+        np.asarray(scores, dtype=float),
+        np.asarray(concedes, dtype=float),
+        actions.game_id.values if 'game_id' in actions.columns else None,
+    )
+    return pd.Series(defensive, index=concedes.index)
 
 
 def value(
@@ -134,8 +124,66 @@ def value(
     :func:`~socceraction.vaep.formula.offensive_value`: The offensive value
     :func:`~socceraction.vaep.formula.defensive_value`: The defensive value
     """
-    v = pd.DataFrame()
-    v['offensive_value'] = offensive_value(actions, Pscores, Pconcedes)
-    v['defensive_value'] = defensive_value(actions, Pscores, Pconcedes)
+    offensive, defensive = values_from_arrays(
+        actions.type_id.values,
+        actions.team_id.values,
+        np.asarray(Pscores, dtype=float),
+        np.asarray(Pconcedes, dtype=float),
+        actions.game_id.values if 'game_id' in actions.columns else None,
+    )
+    v = pd.DataFrame(index=Pscores.index)
+    v['offensive_value'] = offensive
+    v['defensive_value'] = defensive
     v['vaep_value'] = v['offensive_value'] + v['defensive_value']
     return v
+
+
+def values_from_arrays(
+    type_id: ArrayLike,
+    team_id: ArrayLike,
+    scores: ArrayLike,
+    concedes: ArrayLike,
+    game_id: Optional[ArrayLike] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute the offensive and defensive value of each action from flat arrays.
+
+    This is a vectorised implementation of :func:`offensive_value` and
+    :func:`defensive_value`. The actions of multiple games can be valued in
+    a single call, in which case the previous game state of the first action
+    in each game is the action itself.
+
+    Parameters
+    ----------
+    type_id : array-like
+        The Atomic-SPADL type id of each action.
+    team_id : array-like
+        The team id of each action.
+    scores : array-like
+        The probability of scoring from each corresponding game state.
+    concedes : array-like
+        The probability of conceding from each corresponding game state.
+    game_id : array-like, optional
+        The game id of each action. The actions of each game should be
+        contiguous. If None, all actions are assumed to belong to one game.
+
+    Returns
+    -------
+    tuple(np.ndarray, np.ndarray)
+        The offensive and defensive value of each action.
+    """
+    type_id = np.asarray(type_id)
+    team_id = np.asarray(team_id)
+    scores = np.asarray(scores, dtype=float)
+    concedes = np.asarray(concedes, dtype=float)
+    prev = _prev_idx(len(type_id), game_id)
+
+    sameteam = team_id[prev] == team_id
+    prev_scores = np.where(sameteam, scores[prev], concedes[prev])
+    prev_concedes = np.where(sameteam, concedes[prev], scores[prev])
+
+    # if the previous action was a goal, the odds of scoring are now 0
+    prevgoal_idx = np.isin(type_id[prev], _goal_ids)
+    prev_scores[prevgoal_idx] = 0
+    prev_concedes[prevgoal_idx] = 0
+
+    return scores - prev_scores, -(concedes - prev_concedes)
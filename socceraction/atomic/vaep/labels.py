@@ -1,9 +1,12 @@
 """Implements the label tranformers of the Atomic-VAEP framework."""
+from typing import Sequence
+
 import pandas as pd
 from pandera.typing import DataFrame
 
 import socceraction.atomic.spadl.config as atomicspadl
 from socceraction.atomic.spadl import AtomicSPADLSchema
+from socceraction.vaep.labels import _time_window_labels, _window_labels
 
 
 def scores(actions: DataFrame[AtomicSPADLSchema], nr_actions: int = 10) -> pd.DataFrame:
@@ -23,26 +26,8 @@ def scores(actions: DataFrame[AtomicSPADLSchema], nr_actions: int = 10) -> pd.Da
         True if a goal was scored by the team possessing the ball within the
         next x actions; otherwise False.
     """
-    # merging goals, owngoals and team_ids
-    goals = actions['type_id'] == atomicspadl.actiontypes.index('goal')
-    owngoals = actions['type_id'] == atomicspadl.actiontypes.index('owngoal')
-    y = pd.concat([goals, owngoals, actions['team_id']], axis=1)
-    y.columns = ['goal', 'owngoal', 'team_id']
-
-    # adding future results
-    for i in range(1, nr_actions):
-        for c in ['team_id', 'goal', 'owngoal']:
-            shifted = y[c].shift(-i)
-            shifted[-i:] = y[c][len(y) - 1]
-            y['%s+%d' % (c, i)] = shifted
-
-    res = y['goal']
-    for i in range(1, nr_actions):
-        gi = y['goal+%d' % i] & (y['team_id+%d' % i] == y['team_id'])
-        ogi = y['owngoal+%d' % i] & (y['team_id+%d' % i] != y['team_id'])
-        res = res | gi | ogi
-
-    return pd.DataFrame(res, columns=['scores'])
+    labels = horizons(actions, [nr_actions])
+    return labels[[f'scores_{nr_actions}']].set_axis(['scores'], axis=1)
 
 
 def concedes(actions: DataFrame[AtomicSPADLSchema], nr_actions: int = 10) -> pd.DataFrame:
@@ -62,26 +47,100 @@ def concedes(actions: DataFrame[AtomicSPADLSchema], nr_actions: int = 10) -> pd.
         True if a goal was conceded by the team possessing the ball within the
         next x actions; otherwise False.
     """
-    # merging goals, owngoals and team_ids
-    goals = actions['type_id'] == atomicspadl.actiontypes.index('goal')
-    owngoals = actions['type_id'] == atomicspadl.actiontypes.index('owngoal')
-    y = pd.concat([goals, owngoals, actions['team_id']], axis=1)
-    y.columns = ['goal', 'owngoal', 'team_id']
-
-    # adding future results
-    for i in range(1, nr_actions):
-        for c in ['team_id', 'goal', 'owngoal']:
-            shifted = y[c].shift(-i)
-            shifted[-i:] = y[c][len(y) - 1]
-            y['%s+%d' % (c, i)] = shifted
-
-    res = y['owngoal']
-    for i in range(1, nr_actions):
-        gi = y['goal+%d' % i] & (y['team_id+%d' % i] != y['team_id'])
-        ogi = y['owngoal+%d' % i] & (y['team_id+%d' % i] == y['team_id'])
-        res = res | gi | ogi
-
-    return pd.DataFrame(res, columns=['concedes'])
+    labels = horizons(actions, [nr_actions])
+    return labels[[f'concedes_{nr_actions}']].set_axis(['concedes'], axis=1)
+
+
+def horizons(
+    actions: DataFrame[AtomicSPADLSchema], nr_actions: Sequence[int] = (5, 10, 20)
+) -> pd.DataFrame:
+    """Determine whether the team possessing the ball scored or conceded within multiple horizons.
+
+    All horizons are computed in a single pass over the actions. If the
+    actions of multiple games are given, the look-ahead window never extends
+    into the next game.
+
+    Parameters
+    ----------
+    actions : pd.DataFrame
+        The actions of one or more games. The actions of each game should
+        be contiguous.
+    nr_actions : list(int), default=(5, 10, 20)  # noqa: DAR103
+        The numbers of actions after the current action to consider.
+
+    Returns
+    -------
+    pd.DataFrame
+        A dataframe with a column 'scores_x' and 'concedes_x' for each
+        horizon x, and a row for each action set to True if a goal was
+        scored (conceded) by the team possessing the ball within the next
+        x actions; otherwise False.
+    """
+    goals = actions['type_id'].values == atomicspadl.actiontypes.index('goal')
+    owngoals = actions['type_id'].values == atomicspadl.actiontypes.index('owngoal')
+    return _window_labels(actions, goals, owngoals, nr_actions)
+
+
+def scores_in_time(
+    actions: DataFrame[AtomicSPADLSchema], nr_seconds: float = 10.0
+) -> pd.DataFrame:
+    """Determine whether the team possessing the ball scored a goal within the next x seconds.
+
+    The goals in the window of each action are found with a sorted search over
+    the period and time of the actions, so the labels of a full season can be
+    computed in a single call.
+
+    Parameters
+    ----------
+    actions : pd.DataFrame
+        The actions of one or more games. The actions of each game should be
+        contiguous and sorted by period and time.
+    nr_seconds : float, default=10.0  # noqa: DAR103
+        Number of seconds after the current action to consider. The window
+        does not extend beyond the end of the period.
+
+    Returns
+    -------
+    pd.DataFrame
+        A dataframe with a column 'scores' and a row for each action set to
+        True if a goal was scored by the team possessing the ball within the
+        next x seconds; otherwise False.
+    """
+    goals = actions['type_id'].values == atomicspadl.actiontypes.index('goal')
+    owngoals = actions['type_id'].values == atomicspadl.actiontypes.index('owngoal')
+    y_scores, _ = _time_window_labels(actions, goals, owngoals, nr_seconds)
+    return pd.DataFrame({'scores': y_scores}, index=actions.index)
+
+
+def concedes_in_time(
+    actions: DataFrame[AtomicSPADLSchema], nr_seconds: float = 10.0
+) -> pd.DataFrame:
+    """Determine whether the team possessing the ball conceded a goal within the next x seconds.
+
+    The goals in the window of each action are found with a sorted search over
+    the period and time of the actions, so the labels of a full season can be
+    computed in a single call.
+
+    Parameters
+    ----------
+    actions : pd.DataFrame
+        The actions of one or more games. The actions of each game should be
+        contiguous and sorted by period and time.
+    nr_seconds : float, default=10.0  # noqa: DAR103
+        Number of seconds after the current action to consider. The window
+        does not extend beyond the end of the period.
+
+    Returns
+    -------
+    pd.DataFrame
+        A dataframe with a column 'concedes' and a row for each action set to
+        True if a goal was conceded by the team possessing the ball within the
+        next x seconds; otherwise False.
+    """
+    goals = actions['type_id'].values == atomicspadl.actiontypes.index('goal')
+    owngoals = actions['type_id'].values == atomicspadl.actiontypes.index('owngoal')
+    _, y_concedes = _time_window_labels(actions, goals, owngoals, nr_seconds)
+    return pd.DataFrame({'concedes': y_concedes}, index=actions.index)
 
 
 def goal_from_shot(actions: DataFrame[AtomicSPADLSchema]) -> pd.DataFrame:
@@ -0,0 +1,188 @@
+"""Dtype policies for SPADL actions and the features and labels derived from them.
+
+The dtype policy determines the column types of the SPADL and Atomic-SPADL
+actions that are returned by the converters and by
+:func:`~socceraction.spadl.add_names`, and of the features and labels
+computed by the VAEP models. Two policies are available:
+
+'default'
+    64-bit floats for times and coordinates, 64-bit integers for the
+    period, type, result, bodypart and action ids and Python strings for the
+    names.
+'compact'
+    32-bit floats for times, coordinates and features, 8-bit integers for the
+    period, type, result and bodypart ids, 32-bit integers for the action ids
+    and categoricals for the names.
+
+The policy can be set globally with :func:`set_dtype_policy`, for a block of
+code with the :func:`dtype_policy` context manager, or applied to a single
+dataframe with :func:`cast_actions` and :func:`cast_features`.
+
+Examples
+--------
+>>> with dtype_policy('compact'):
+...     actions = spadl.statsbomb.convert_to_actions(events, home_team_id)
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+POLICIES = ('default', 'compact')
+
+_global_policy = 'default'
+# the policy of the current dtype_policy block, if any
+_local_policy: 'ContextVar[Optional[str]]' = ContextVar('dtype_policy', default=None)
+
+_FLOAT_COLS = ['time_seconds', 'start_x', 'start_y', 'end_x', 'end_y', 'x', 'y', 'dx', 'dy']
+_CODE_COLS = ['period_id', 'type_id', 'result_id', 'bodypart_id']
+_ID_COLS = ['action_id']
+_NAME_COLS = ['type_name', 'result_name', 'bodypart_name']
+
+_DTYPES = {
+    'default': {
+        'float': np.dtype(np.float64),
+        'code': np.dtype(np.int64),
+        'id': np.dtype(np.int64),
+    },
+    'compact': {
+        'float': np.dtype(np.float32),
+        'code': np.dtype(np.int8),
+        'id': np.dtype(np.int32),
+    },
+}
+
+
+def _check_policy(policy: str) -> str:
+    if policy not in POLICIES:
+        raise ValueError(f'Unknown dtype policy {policy!r}; choose from {", ".join(POLICIES)}')
+    return policy
+
+
+def get_dtype_policy() -> str:
+    """Return the active dtype policy.
+
+    Returns
+    -------
+    str
+        The name of the active policy.
+    """
+    return _local_policy.get() or _global_policy
+
+
+def set_dtype_policy(policy: str) -> None:
+    """Set the dtype policy globally, for all threads.
+
+    Parameters
+    ----------
+    policy : str
+        The name of the policy: 'default' or 'compact'.
+    """
+    global _global_policy
+    _global_policy = _check_policy(policy)
+
+
+@contextmanager
+def dtype_policy(policy: str) -> Iterator[None]:
+    """Use a dtype policy within a block of code.
+
+    The policy only applies to the current thread or asyncio task.
+
+    Parameters
+    ----------
+    policy : str
+        The name of the policy: 'default' or 'compact'.
+
+    Yields
+    ------
+    None
+    """
+    token = _local_policy.set(_check_policy(policy))
+    try:
+        yield
+    finally:
+        _local_policy.reset(token)
+
+
+@lru_cache(maxsize=None)
+def _name_categories() -> Dict[str, List[str]]:
+    # The categories are the names of both SPADL and Atomic-SPADL, such that
+    # dataframes of either representation can be concatenated.
+    import socceraction.atomic.spadl.config as atomicconfig
+    import socceraction.spadl.config as spadlconfig
+
+    def union(*names: List[str]) -> List[str]:
+        return list(dict.fromkeys(n for ns in names for n in ns))
+
+    return {
+        'type_name': union(spadlconfig.actiontypes, atomicconfig.actiontypes),
+        'result_name': list(spadlconfig.results),
+        'bodypart_name': union(spadlconfig.bodyparts, atomicconfig.bodyparts),
+    }
+
+
+def cast_actions(actions: pd.DataFrame, policy: Optional[str] = None) -> pd.DataFrame:
+    """Convert the columns of a SPADL or Atomic-SPADL dataframe to a dtype policy.
+
+    Parameters
+    ----------
+    actions : pd.DataFrame
+        A SPADL or Atomic-SPADL dataframe.
+    policy : str, optional
+        The name of the policy. Defaults to the active policy.
+
+    Returns
+    -------
+    pd.DataFrame
+        The actions with the dtypes of the policy.
+    """
+    policy = _check_policy(policy or get_dtype_policy())
+    dtypes = {}
+    for col in actions.columns:
+        if col in _FLOAT_COLS:
+            dtypes[col] = _DTYPES[policy]['float']
+        elif col in _CODE_COLS:
+            dtypes[col] = _DTYPES[policy]['code']
+        elif col in _ID_COLS:
+            dtypes[col] = _DTYPES[policy]['id']
+        elif col in _NAME_COLS:
+            if policy == 'compact':
+                dtypes[col] = pd.CategoricalDtype(_name_categories()[col])
+            else:
+                dtypes[col] = np.dtype(object)
+    changed = {c: t for c, t in dtypes.items() if actions[c].dtype != t}
+    if not changed:
+        return actions
+    return actions.astype(changed)
+
+
+def cast_features(features: pd.DataFrame, policy: Optional[str] = None) -> pd.DataFrame:
+    """Convert the float columns of a features or labels dataframe to a dtype policy.
+
+    Boolean and integer columns are left unchanged.
+
+    Parameters
+    ----------
+    features : pd.DataFrame
+        The features or labels.
+    policy : str, optional
+        The name of the policy. Defaults to the active policy.
+
+    Returns
+    -------
+    pd.DataFrame
+        The features with the float dtype of the policy.
+    """
+    policy = _check_policy(policy or get_dtype_policy())
+    dtype = _DTYPES[policy]['float']
+    changed = {
+        c: dtype
+        for c, t in features.dtypes.items()
+        if pd.api.types.is_float_dtype(t) and t != dtype
+    }
+    if not changed:
+        return features
+    return features.astype(changed)
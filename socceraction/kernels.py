@@ -0,0 +1,244 @@
+"""Optional Numba-compiled kernels for sequential computations on actions.
+
+A few steps of the SPADL conversion and of the VAEP framework walk the
+action stream in order: detecting dribbles between consecutive actions,
+counting the goals scored so far in a game and looking ahead for goals in
+the next actions. When
+`Numba <https://numba.pydata.org>`_ is installed, these steps run as compiled
+loops over the NumPy arrays of the actions. Otherwise, socceraction falls
+back to its pandas implementation. Both implementations give identical
+results.
+
+Numba is not a dependency of socceraction. Install it to enable the
+kernels::
+
+    pip install numba
+
+The kernels can be disabled globally with :func:`set_numba_enabled` or with
+the ``SOCCERACTION_DISABLE_NUMBA`` environment variable, and for a block of
+code with the :func:`use_numba` context manager.
+
+Examples
+--------
+>>> with use_numba(False):
+...     actions = spadl.statsbomb.convert_to_actions(events, home_team_id)
+"""
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # pragma: no cover
+    numba = None
+
+NUMBA_AVAILABLE = numba is not None
+
+_global_enabled = os.environ.get('SOCCERACTION_DISABLE_NUMBA', '') in ('', '0')
+# whether the kernels are enabled in the current use_numba block, if any
+_local_enabled: 'ContextVar[Optional[bool]]' = ContextVar('use_numba', default=None)
+
+
+def _jit(fn: Callable[..., Any]) -> Callable[..., Any]:
+    if numba is None:  # pragma: no cover
+        return fn
+    return numba.njit(cache=True, nogil=True)(fn)
+
+
+def numba_enabled() -> bool:
+    """Return whether the Numba kernels are used.
+
+    Returns
+    -------
+    bool
+        True if Numba is installed and the kernels are enabled.
+    """
+    enabled = _local_enabled.get()
+    if enabled is None:
+        enabled = _global_enabled
+    return NUMBA_AVAILABLE and enabled
+
+
+def set_numba_enabled(enabled: bool) -> None:
+    """Enable or disable the Numba kernels globally, for all threads.
+
+    Parameters
+    ----------
+    enabled : bool
+        Whether to use the Numba kernels when Numba is installed.
+    """
+    global _global_enabled
+    _global_enabled = bool(enabled)
+
+
+@contextmanager
+def use_numba(enabled: bool = True) -> Iterator[None]:
+    """Enable or disable the Numba kernels within a block of code.
+
+    The setting only applies to the current thread or asyncio task.
+
+    Parameters
+    ----------
+    enabled : bool, default=True
+        Whether to use the Numba kernels when Numba is installed.
+
+    Yields
+    ------
+    None
+    """
+    token = _local_enabled.set(bool(enabled))
+    try:
+        yield
+    finally:
+        _local_enabled.reset(token)
+
+
+def accelerated(*arrays: np.ndarray) -> bool:
+    """Return whether the kernels should be used for the given arrays.
+
+    The kernels only accept boolean and numeric arrays. Other arrays, such as
+    strings or nullable extension arrays, are handled by the pandas
+    implementation.
+
+    Parameters
+    ----------
+    *arrays : np.ndarray
+        The arrays that would be passed to a kernel.
+
+    Returns
+    -------
+    bool
+        True if the kernels are enabled and all arrays are numeric.
+    """
+    return numba_enabled() and all(
+        isinstance(a, np.ndarray) and a.dtype.kind in 'biuf' for a in arrays
+    )
+
+
+@_jit
+def dribble_mask(
+    team_id: np.ndarray,
+    period_id: np.ndarray,
+    time_seconds: np.ndarray,
+    start_x: np.ndarray,
+    start_y: np.ndarray,
+    end_x: np.ndarray,
+    end_y: np.ndarray,
+    min_length: float,
+    max_length: float,
+    max_duration: float,
+) -> np.ndarray:  # pragma: no cover
+    """Mark the actions that are followed by a dribble.
+
+    A dribble is inserted between two consecutive actions of the same team
+    in the same period when the next action starts between `min_length` and
+    `max_length` from the end of the action and less than `max_duration`
+    seconds later.
+
+    Returns
+    -------
+    np.ndarray
+        A boolean array with the actions that are followed by a dribble.
+    """
+    n = len(team_id)
+    mask = np.zeros(n, dtype=np.bool_)
+    for i in range(n - 1):
+        if team_id[i] != team_id[i + 1] or period_id[i] != period_id[i + 1]:
+            continue
+        dx = end_x[i] - start_x[i + 1]
+        dy = end_y[i] - start_y[i + 1]
+        d2 = dx**2 + dy**2
+        dt = time_seconds[i + 1] - time_seconds[i]
+        mask[i] = d2 >= min_length**2 and d2 <= max_length**2 and dt < max_duration
+    return mask
+
+
+@_jit
+def goalscore(
+    game_codes: np.ndarray,
+    team_id: np.ndarray,
+    goals: np.ndarray,
+    owngoals: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:  # pragma: no cover
+    """Count the goals of both teams before each action of a game.
+
+    The goals are counted separately for each game code. The games do not
+    have to be contiguous.
+
+    Returns
+    -------
+    tuple(np.ndarray, np.ndarray)
+        The number of goals of the team performing each action and of its
+        opponent before that action.
+    """
+    n = len(team_id)
+    nb_games = game_codes.max() + 1 if n > 0 else 0
+    first_team = np.empty(nb_games, dtype=team_id.dtype)
+    seen = np.zeros(nb_games, dtype=np.bool_)
+    score_a = np.zeros(nb_games, dtype=np.int64)
+    score_b = np.zeros(nb_games, dtype=np.int64)
+    team = np.empty(n, dtype=np.int64)
+    opponent = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        g = game_codes[i]
+        if not seen[g]:
+            first_team[g] = team_id[i]
+            seen[g] = True
+        is_a = team_id[i] == first_team[g]
+        if is_a:
+            team[i] = score_a[g]
+            opponent[i] = score_b[g]
+        else:
+            team[i] = score_b[g]
+            opponent[i] = score_a[g]
+        if (goals[i] and is_a) or (owngoals[i] and not is_a):
+            score_a[g] += 1
+        elif goals[i] or owngoals[i]:
+            score_b[g] += 1
+    return team, opponent
+
+
+@_jit
+def goal_windows(
+    goals: np.ndarray,
+    owngoals: np.ndarray,
+    team_id: np.ndarray,
+    game_start: np.ndarray,
+    window_end: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:  # pragma: no cover
+    """Look ahead for goals in a window starting at each action.
+
+    The window of each action ends before the given (exclusive) end
+    position.
+
+    Returns
+    -------
+    tuple(np.ndarray, np.ndarray)
+        Whether the team performing each action scored and conceded a goal
+        in its window.
+    """
+    n = len(team_id)
+    # the cumulative goals of the first team of the game and of its opponent
+    goals_a = np.zeros(n + 1, dtype=np.int64)
+    goals_b = np.zeros(n + 1, dtype=np.int64)
+    for i in range(n):
+        is_a = team_id[i] == team_id[game_start[i]]
+        goal_a = (goals[i] and is_a) or (owngoals[i] and not is_a)
+        goal_b = (goals[i] and not is_a) or (owngoals[i] and is_a)
+        goals_a[i + 1] = goals_a[i] + goal_a
+        goals_b[i + 1] = goals_b[i] + goal_b
+    scores = np.empty(n, dtype=np.bool_)
+    concedes = np.empty(n, dtype=np.bool_)
+    for i in range(n):
+        scored_a = goals_a[window_end[i]] > goals_a[i]
+        scored_b = goals_b[window_end[i]] > goals_b[i]
+        if team_id[i] == team_id[game_start[i]]:
+            scores[i] = scored_a
+            concedes[i] = scored_b
+        else:
+            scores[i] = scored_b
+            concedes[i] = scored_a
+    return scores, concedes
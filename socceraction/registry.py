@@ -0,0 +1,386 @@
+"""Implements a registry to share fitted models between requests.
+
+The registry maps a (model type, competition, season, version) key to the
+location of a saved model. Models are loaded the first time they are
+requested and kept in memory until the registry runs out of room, at which
+point the least recently used models are evicted. Models that are requested
+very often can be pinned to keep them resident.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+
+import numpy as np
+
+PathOrLoader = Union[str, 'os.PathLike[str]', Callable[[], Any]]
+
+
+class UnknownModelError(KeyError):
+    """Raised when no model is registered with the requested key."""
+
+
+class ModelKey(NamedTuple):
+    """Identifies a model in a :class:`ModelRegistry`."""
+
+    model_type: str
+    competition_id: Any
+    season_id: Any
+    version: Any
+
+
+class RegistryStats(NamedTuple):
+    """Counters that describe the usage of a :class:`ModelRegistry`."""
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    nbytes: int
+
+
+def _load_vaep(path: Union[str, 'os.PathLike[str]']) -> Any:
+    from socceraction.vaep import VAEP
+
+    model = VAEP.load(path)
+    model._check_is_fitted()
+    return model
+
+
+def _load_atomic_vaep(path: Union[str, 'os.PathLike[str]']) -> Any:
+    from socceraction.atomic.vaep import AtomicVAEP
+
+    model = AtomicVAEP.load(path)
+    model._check_is_fitted()
+    return model
+
+
+def _load_xt(path: Union[str, 'os.PathLike[str]']) -> Any:
+    from socceraction.xthreat import load_model
+
+    return load_model(str(path))
+
+
+_LOADERS: Dict[str, Callable[[Any], Any]] = {
+    'vaep': _load_vaep,
+    'atomic_vaep': _load_atomic_vaep,
+    'xt': _load_xt,
+}
+
+
+def _disk_size(path: Union[str, 'os.PathLike[str]']) -> int:
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(root, f))
+            for root, _, files in os.walk(path)
+            for f in files
+        )
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return 0
+
+
+def _nbytes(model: Any) -> int:
+    attrs = getattr(model, '__dict__', {}).values()
+    return sum(a.nbytes for a in attrs if isinstance(a, np.ndarray))
+
+
+class _Entry:
+    __slots__ = ('load', 'size', 'pinned', 'lock')
+
+    def __init__(self, load: Callable[[], Any], size: Optional[int]) -> None:
+        self.load = load
+        self.size = size
+        self.pinned = False
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """A thread-safe, in-process cache of fitted VAEP and xT models.
+
+    Models are registered by the location they were saved to and are only
+    loaded when they are first requested with :meth:`get`. Loaded models
+    remain resident until the number of models exceeds ``max_entries`` or
+    their combined size exceeds ``max_bytes``. When that happens, the least
+    recently used models that are not pinned are evicted.
+
+    Concurrent requests for a model that is not resident yet load it only
+    once; the other requests wait for the result. Different models are
+    loaded in parallel.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        The maximum number of resident models.
+    max_bytes : int, optional
+        The maximum combined size of the resident models in bytes. The size
+        of a model is the size of its files on disk unless it is specified
+        explicitly when the model is registered.
+    loaders : dict(str, callable), optional
+        Functions that load a model of the given type from a path. These
+        extend the default loaders for the 'vaep', 'atomic_vaep' and 'xt'
+        model types.
+
+    Examples
+    --------
+    >>> registry = ModelRegistry(max_entries=50)
+    >>> registry.register('vaep', 43, 3, 'v1', '/models/vaep/43/3/v1')
+    >>> model = registry.get('vaep', 43, 3, 'v1')
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        loaders: Optional[Dict[str, Callable[[Any], Any]]] = None,
+    ) -> None:
+        if max_entries is not None and max_entries < 1:
+            raise ValueError('max_entries should be at least 1')
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError('max_bytes should be positive')
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._loaders = {**_LOADERS, **(loaders or {})}
+        self._entries: Dict[ModelKey, _Entry] = {}
+        self._resident: 'OrderedDict[ModelKey, Any]' = OrderedDict()
+        self._sizes: Dict[ModelKey, int] = {}
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def register(
+        self,
+        model_type: str,
+        competition_id: Any,
+        season_id: Any,
+        version: Any,
+        source: PathOrLoader,
+        size: Optional[int] = None,
+    ) -> ModelKey:
+        """Register the location of a model.
+
+        Registering a key that is already registered replaces its source and
+        evicts the resident copy of the old model.
+
+        Parameters
+        ----------
+        model_type : str
+            The type of the model, e.g. 'vaep', 'atomic_vaep' or 'xt'.
+        competition_id : int or str
+            The competition for which the model was fitted.
+        season_id : int or str
+            The season for which the model was fitted.
+        version : int or str
+            The version of the model.
+        source : str, os.PathLike or callable
+            The path to which the model was saved, or a function without
+            arguments that returns the model.
+        size : int, optional
+            The size of the model in bytes. Defaults to the size of the
+            model's files on disk or to the size of the NumPy arrays that
+            are attributes of the model.
+
+        Raises
+        ------
+        ValueError
+            If the source is a path and there is no loader for the model type.
+
+        Returns
+        -------
+        ModelKey
+            The key of the registered model.
+        """
+        key = ModelKey(model_type, competition_id, season_id, version)
+        if callable(source):
+            load = source
+        else:
+            if model_type not in self._loaders:
+                raise ValueError(f'No loader is available for models of type {model_type!r}.')
+            loader, path = self._loaders[model_type], source
+            load = lambda: loader(path)  # noqa: E731
+            if size is None:
+                size = _disk_size(path)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = _Entry(load, size)
+        return key
+
+    def get(self, model_type: str, competition_id: Any, season_id: Any, version: Any) -> Any:
+        """Return a model, loading it if it is not resident.
+
+        Parameters
+        ----------
+        model_type : str
+            The type of the model.
+        competition_id : int or str
+            The competition for which the model was fitted.
+        season_id : int or str
+            The season for which the model was fitted.
+        version : int or str
+            The version of the model.
+
+        Raises
+        ------
+        UnknownModelError
+            If no model is registered with the given key.
+
+        Returns
+        -------
+        Any
+            The model.
+        """
+        key = ModelKey(model_type, competition_id, season_id, version)
+        with self._lock:
+            model = self._lookup(key)
+            if model is not None:
+                return model
+            entry = self._entry(key)
+
+        # Only one thread loads a model; the others wait for it here.
+        with entry.lock:
+            with self._lock:
+                model = self._lookup(key)
+                if model is not None:
+                    return model
+                self._misses += 1
+            model = entry.load()
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._resident[key] = model
+                    self._sizes[key] = entry.size if entry.size is not None else _nbytes(model)
+                    self._shrink(keep=key)
+        return model
+
+    def pin(self, model_type: str, competition_id: Any, season_id: Any, version: Any) -> None:
+        """Load a model and exclude it from eviction.
+
+        Pinned models still count towards the limits of the registry.
+
+        Parameters
+        ----------
+        model_type : str
+            The type of the model.
+        competition_id : int or str
+            The competition for which the model was fitted.
+        season_id : int or str
+            The season for which the model was fitted.
+        version : int or str
+            The version of the model.
+        """
+        key = ModelKey(model_type, competition_id, season_id, version)
+        with self._lock:
+            self._entry(key).pinned = True
+        self.get(*key)
+
+    def unpin(self, model_type: str, competition_id: Any, season_id: Any, version: Any) -> None:
+        """Allow a pinned model to be evicted again.
+
+        Parameters
+        ----------
+        model_type : str
+            The type of the model.
+        competition_id : int or str
+            The competition for which the model was fitted.
+        season_id : int or str
+            The season for which the model was fitted.
+        version : int or str
+            The version of the model.
+        """
+        key = ModelKey(model_type, competition_id, season_id, version)
+        with self._lock:
+            self._entry(key).pinned = False
+            self._shrink()
+
+    def evict(self, model_type: str, competition_id: Any, season_id: Any, version: Any) -> None:
+        """Remove a model from memory. It is loaded again on the next request.
+
+        Parameters
+        ----------
+        model_type : str
+            The type of the model.
+        competition_id : int or str
+            The competition for which the model was fitted.
+        season_id : int or str
+            The season for which the model was fitted.
+        version : int or str
+            The version of the model.
+        """
+        key = ModelKey(model_type, competition_id, season_id, version)
+        with self._lock:
+            if key in self._resident:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Remove all models from memory, including the pinned ones."""
+        with self._lock:
+            for key in list(self._resident):
+                self._remove(key)
+
+    @property
+    def stats(self) -> RegistryStats:
+        """The hit, miss and eviction counters and the current occupancy."""
+        with self._lock:
+            return RegistryStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._resident),
+                nbytes=sum(self._sizes.values()),
+            )
+
+    def is_resident(
+        self, model_type: str, competition_id: Any, season_id: Any, version: Any
+    ) -> bool:
+        """Return whether a model is currently loaded."""
+        key = ModelKey(model_type, competition_id, season_id, version)
+        with self._lock:
+            return key in self._resident
+
+    def __contains__(self, key: Any) -> bool:
+        with self._lock:
+            return ModelKey(*key) in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _entry(self, key: ModelKey) -> _Entry:
+        entry = self._entries.get(key)
+        if entry is None:
+            raise UnknownModelError(key)
+        return entry
+
+    def _lookup(self, key: ModelKey) -> Optional[Any]:
+        model = self._resident.get(key)
+        if model is not None:
+            self._resident.move_to_end(key)
+            self._hits += 1
+        return model
+
+    def _remove(self, key: ModelKey) -> None:
+        del self._resident[key]
+        del self._sizes[key]
+        self._evictions += 1
+
+    def _discard(self, key: ModelKey) -> None:
+        self._entries.pop(key, None)
+        if key in self._resident:
+            self._remove(key)
+
+    def _is_full(self) -> bool:
+        if self.max_entries is not None and len(self._resident) > self.max_entries:
+            return True
+        if self.max_bytes is not None and sum(self._sizes.values()) > self.max_bytes:
+            return True
+        return False
+
+    def _shrink(self, keep: Optional[ModelKey] = None) -> None:
+        # Evict the least recently used models that are not pinned. The model
+        # that was just loaded is kept, even if it does not fit on its own.
+        candidates = (k for k in list(self._resident) if k != keep and not self._entries[k].pinned)
+        while self._is_full():
+            key = next(candidates, None)
+            if key is None:
+                break
+            self._remove(key)
@@ -0,0 +1,487 @@
+"""Implements a lightweight HTTP service to rate SPADL actions.
+
+The service exposes the models in a :class:`~socceraction.registry.ModelRegistry`
+over HTTP/JSON. Requests that arrive concurrently for the same model are
+gathered into micro-batches, such that each batch is rated with a single model
+call. This amortises the per-call overhead of the model over many requests.
+
+The service only depends on the standard library. Start it from the command
+line with::
+
+    python -m socceraction.serve --model vaep 43 3 v1 /models/vaep/43/3/v1 \\
+        --model xt 43 3 v1 /models/xt/43/3/v1.json --port 8000
+
+A rating request is a POST request to '/rate' with a JSON body such as::
+
+    {
+        "model_type": "vaep",
+        "competition_id": 43,
+        "season_id": 3,
+        "version": "v1",
+        "home_team_id": 782,
+        "actions": [{"action_id": 0, "type_id": 0, ...}, ...]
+    }
+
+The actions can be given as a list of records or as a mapping from column
+names to lists. The 'home_team_id' is only required by VAEP models. The
+response contains one rating record per action, in the order of the actions.
+
+The service responds with status 404 if the model is not registered and with
+status 400 if the request is invalid, for example when the actions miss a
+column that the model needs.
+"""
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from socceraction.registry import ModelKey, ModelRegistry, UnknownModelError
+from socceraction.vaep import VAEP
+from socceraction.xthreat import ExpectedThreat
+
+Request = Dict[str, Any]
+Ratings = List[Dict[str, Any]]
+
+_logger = logging.getLogger(__name__)
+
+# The columns that the actions of a request need for each type of model
+_REQUIRED_COLUMNS = {
+    'vaep': [
+        'period_id',
+        'time_seconds',
+        'team_id',
+        'player_id',
+        'start_x',
+        'start_y',
+        'end_x',
+        'end_y',
+        'type_id',
+        'result_id',
+        'bodypart_id',
+    ],
+    'atomic_vaep': [
+        'period_id',
+        'time_seconds',
+        'team_id',
+        'player_id',
+        'x',
+        'y',
+        'dx',
+        'dy',
+        'type_id',
+        'bodypart_id',
+    ],
+    'xt': ['start_x', 'start_y', 'end_x', 'end_y', 'type_id', 'result_id'],
+}
+# The required columns that do not have to be numeric
+_ID_COLUMNS = ['team_id', 'player_id']
+
+
+class MicroBatcher:
+    """Gather concurrent calls into batches that are processed together.
+
+    A background thread takes the first pending item from the queue and waits
+    at most `max_wait` seconds for more items to arrive, up to a total of
+    `max_batch` items. The batch is then passed to `fn` in a single call. If
+    that call raises an exception, the items of the batch are processed one
+    at a time, such that the exception is only raised for the items that fail
+    on their own.
+
+    Parameters
+    ----------
+    fn : callable
+        A function that maps a list of items to a list of results of the
+        same length.
+    max_batch : int
+        The maximum number of items in a batch.
+    max_wait : float
+        The maximum time in seconds to wait for a batch to fill up.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch: int = 64,
+        max_wait: float = 0.005,
+    ) -> None:
+        if max_batch < 1:
+            raise ValueError('max_batch should be at least 1')
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: 'queue.Queue[Optional[Tuple[Any, Future]]]' = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Any:
+        """Process an item as part of the next batch and wait for its result.
+
+        Parameters
+        ----------
+        item : Any
+            The item to process.
+
+        Returns
+        -------
+        Any
+            The result for the item. If processing the item raised an
+            exception, it is raised again here.
+        """
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def close(self) -> None:
+        """Process the pending items and stop the background thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self) -> Tuple[List[Tuple[Any, Future]], bool]:
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    pending = self._queue.get(timeout=timeout)
+                else:
+                    pending = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is None:
+                return batch, True
+            batch.append(pending)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if not batch:
+                continue
+            items, futures = zip(*batch)
+            try:
+                results = self.fn(list(items))
+            except Exception as e:  # pylint: disable=broad-except
+                if len(batch) == 1:
+                    futures[0].set_exception(e)
+                    continue
+                # a single bad item should not fail the other items
+                for item, future in batch:
+                    self._process_one(item, future)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+
+    def _process_one(self, item: Any, future: Future) -> None:
+        try:
+            (result,) = self.fn([item])
+        except Exception as e:  # pylint: disable=broad-except
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+
+def _to_records(ratings: pd.DataFrame) -> Ratings:
+    # JSON has no NaN; unrated actions are returned as null
+    ratings = ratings.astype(object).where(ratings.notna(), None)
+    return ratings.to_dict(orient='records')
+
+
+def _parse_actions(request: Request, model_type: str) -> pd.DataFrame:
+    """Read the actions of a request and check that a model can rate them."""
+    try:
+        actions = pd.DataFrame(request['actions'])
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'The actions cannot be read: {e}') from e
+    for col in _REQUIRED_COLUMNS.get(model_type, []):
+        if col not in actions.columns:
+            raise ValueError(f'The actions have no {col!r} column.')
+        if actions[col].isna().any():
+            raise ValueError(f'The {col!r} column of the actions has missing values.')
+        if col not in _ID_COLUMNS and not pd.api.types.is_numeric_dtype(actions[col]):
+            raise ValueError(f'The {col!r} column of the actions is not numeric.')
+    return actions
+
+
+def _actions_frame(requests: List[Request]) -> Tuple[pd.DataFrame, np.ndarray]:
+    frames = []
+    for i, request in enumerate(requests):
+        actions = pd.DataFrame(request['actions'])
+        if 'action_id' not in actions.columns:
+            actions['action_id'] = np.arange(len(actions))
+        frames.append(actions.assign(game_id=i))
+    offsets = np.cumsum([0] + [len(f) for f in frames])
+    return pd.concat(frames, ignore_index=True), offsets
+
+
+def rate_vaep_batch(model: VAEP, requests: List[Request]) -> List[Ratings]:
+    """Rate the actions of multiple requests with a single VAEP model call.
+
+    Each request is treated as a separate game, such that the game states
+    of one request never include actions of another request.
+
+    Parameters
+    ----------
+    model : VAEP
+        A fitted VAEP or Atomic-VAEP model.
+    requests : list(dict)
+        The requests, each with an 'actions' and 'home_team_id' field.
+
+    Returns
+    -------
+    list(list(dict))
+        For each request, the 'action_id', 'offensive_value',
+        'defensive_value' and 'vaep_value' of each action.
+    """
+    actions, offsets = _actions_frame(requests)
+    games = pd.DataFrame(
+        {
+            'game_id': np.arange(len(requests)),
+            'home_team_id': [r['home_team_id'] for r in requests],
+        }
+    )
+    ratings = model.rate_many(games, actions)
+    ratings = ratings.reset_index(level='game_id', drop=True).reset_index()
+    return [_to_records(ratings.iloc[s:e]) for s, e in zip(offsets[:-1], offsets[1:])]
+
+
+def rate_xt_batch(model: ExpectedThreat, requests: List[Request]) -> List[Ratings]:
+    """Rate the actions of multiple requests with a single xT model call.
+
+    Parameters
+    ----------
+    model : ExpectedThreat
+        A fitted xT model.
+    requests : list(dict)
+        The requests, each with an 'actions' field.
+
+    Returns
+    -------
+    list(list(dict))
+        For each request, the 'action_id' and 'xt_value' of each action.
+    """
+    actions, offsets = _actions_frame(requests)
+    ratings = pd.DataFrame({'action_id': actions.action_id, 'xt_value': model.rate(actions)})
+    return [_to_records(ratings.iloc[s:e]) for s, e in zip(offsets[:-1], offsets[1:])]
+
+
+class RatingService:
+    """Rate actions with the models in a registry, in micro-batches per model.
+
+    Parameters
+    ----------
+    registry : ModelRegistry
+        The registry from which the models are loaded.
+    max_batch : int
+        The maximum number of requests that are rated together.
+    max_wait : float
+        The maximum time in seconds that a request waits for other requests
+        to join its batch.
+    """
+
+    def __init__(
+        self, registry: ModelRegistry, max_batch: int = 64, max_wait: float = 0.005
+    ) -> None:
+        self.registry = registry
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._batchers: Dict[ModelKey, MicroBatcher] = {}
+        self._lock = threading.Lock()
+
+    def rate(self, request: Request) -> Ratings:
+        """Rate the actions in a request.
+
+        Parameters
+        ----------
+        request : dict
+            A rating request. See the module documentation for its format.
+
+        Raises
+        ------
+        UnknownModelError
+            If the requested model is not registered.
+        ValueError
+            If the request is incomplete or its actions cannot be rated.
+
+        Returns
+        -------
+        list(dict)
+            The rating of each action in the request.
+        """
+        if not isinstance(request, dict):
+            raise ValueError('The request should be a JSON object.')
+        fields = list(ModelKey._fields) + ['actions']
+        if request.get('model_type') in ('vaep', 'atomic_vaep'):
+            fields.append('home_team_id')
+        for field in fields:
+            if field not in request:
+                raise ValueError(f'The request has no {field!r} field.')
+        key = ModelKey(*(request[f] for f in ModelKey._fields))
+        if key not in self.registry:
+            raise UnknownModelError(key)
+        # invalid actions are rejected before they can join a batch
+        actions = _parse_actions(request, key.model_type)
+        return self._batcher(key).submit(dict(request, actions=actions))
+
+    def close(self) -> None:
+        """Stop the background threads of the micro-batchers."""
+        with self._lock:
+            for batcher in self._batchers.values():
+                batcher.close()
+            self._batchers.clear()
+
+    def _batcher(self, key: ModelKey) -> MicroBatcher:
+        with self._lock:
+            if key not in self._batchers:
+                self._batchers[key] = MicroBatcher(
+                    lambda requests: self._rate_batch(key, requests), self.max_batch, self.max_wait
+                )
+            return self._batchers[key]
+
+    def _rate_batch(self, key: ModelKey, requests: List[Request]) -> List[Ratings]:
+        model = self.registry.get(*key)
+        if isinstance(model, VAEP):
+            return rate_vaep_batch(model, requests)
+        if isinstance(model, ExpectedThreat):
+            return rate_xt_batch(model, requests)
+        raise ValueError(f'Models of type {type(model).__name__} cannot be served.')
+
+
+def _error_response(e: Exception) -> Tuple[int, Dict[str, Any]]:
+    """Map an exception raised while rating a request to an HTTP status and body."""
+    if isinstance(e, UnknownModelError):
+        return 404, {'error': f'Unknown model {e}.'}
+    if isinstance(e, KeyError):
+        return 400, {'error': f'The request has no {e} field.'}
+    if isinstance(e, (ValueError, TypeError)):
+        return 400, {'error': str(e)}
+    _logger.error('Failed to rate a request.', exc_info=e)
+    return 500, {'error': 'Internal server error.'}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: '_Server'
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path != '/health':
+            self._send(404, {'error': 'Not found.'})
+            return
+        self._send(200, {'status': 'ok', **self.server.service.registry.stats._asdict()})
+
+    def do_POST(self) -> None:  # noqa: N802
+        if self.path != '/rate':
+            self._send(404, {'error': 'Not found.'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length))
+            ratings = self.server.service.rate(request)
+        except Exception as e:  # pylint: disable=broad-except
+            self._send(*_error_response(e))
+        else:
+            self._send(200, {'ratings': ratings})
+
+    def _send(self, status: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 connections resets clients under load
+    request_queue_size = 128
+
+    def __init__(self, server_address: Tuple[str, int], service: RatingService) -> None:
+        super().__init__(server_address, _Handler)
+        self.service = service
+
+
+def make_server(
+    service: RatingService, host: str = '127.0.0.1', port: int = 8000
+) -> ThreadingHTTPServer:
+    """Create an HTTP server for a rating service.
+
+    The server handles each connection in a separate thread, which allows
+    concurrent requests to be gathered into micro-batches.
+
+    Parameters
+    ----------
+    service : RatingService
+        The service that rates the actions.
+    host : str
+        The host name to listen on.
+    port : int
+        The port to listen on. Use 0 to pick a free port.
+
+    Returns
+    -------
+    ThreadingHTTPServer
+        The server. Call its `serve_forever` method to start it.
+    """
+    return _Server((host, port), service)
+
+
+def _parse_id(value: str) -> Any:
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Start a rating service from the command line."""
+    parser = argparse.ArgumentParser(description='Serve VAEP and xT ratings over HTTP.')
+    parser.add_argument(
+        '--model',
+        nargs=5,
+        action='append',
+        default=[],
+        metavar=('TYPE', 'COMPETITION', 'SEASON', 'VERSION', 'PATH'),
+        help='register a saved model; can be repeated',
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch', type=int, default=64, help='maximum requests per batch')
+    parser.add_argument(
+        '--max-wait', type=float, default=5.0, help='maximum wait for a batch in milliseconds'
+    )
+    parser.add_argument('--max-models', type=int, default=None, help='maximum resident models')
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(max_entries=args.max_models)
+    for model_type, competition_id, season_id, version, path in args.model:
+        registry.register(
+            model_type, _parse_id(competition_id), _parse_id(season_id), _parse_id(version), path
+        )
+    service = RatingService(registry, args.max_batch, args.max_wait / 1000)
+    server = make_server(service, args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
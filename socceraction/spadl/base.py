@@ -4,17 +4,23 @@ A converter should implement 'convert_to_actions' to convert the events to the
 SPADL format.
 
 """
+from typing import Any, Dict, Mapping, Optional, Union
+
+import numpy as np  # type: ignore
 import pandas as pd  # type: ignore
+from numpy.typing import ArrayLike
+
+from socceraction import kernels
 
 from . import config as spadlconfig
 
 
 def _fix_clearances_sa(actions: pd.DataFrame) -> pd.DataFrame:
-    next_actions = actions.shift(-1)
-    next_actions[-1:] = actions[-1:]
-    clearance_idx = actions.type_id == spadlconfig.actiontypes.index('clearance')
-    actions.loc[clearance_idx, 'end_x'] = next_actions[clearance_idx].start_x.values
-    actions.loc[clearance_idx, 'end_y'] = next_actions[clearance_idx].start_y.values
+    # the last clearance of a game ends where it starts
+    next_idx = _next_idx(len(actions), actions.game_id.values)
+    clearance_idx = (actions.type_id == spadlconfig.actiontypes.index('clearance')).values
+    actions.loc[clearance_idx, 'end_x'] = actions.start_x.values[next_idx[clearance_idx]]
+    actions.loc[clearance_idx, 'end_y'] = actions.start_y.values[next_idx[clearance_idx]]
 
     return actions
 
@@ -36,7 +42,10 @@ def _fix_direction_of_play(actions: pd.DataFrame) -> pd.DataFrame:
 
     return actions
 
-def _fix_direction_of_play_sa(actions: pd.DataFrame, home_team_id: int) -> pd.DataFrame:
+def _fix_direction_of_play_sa(
+    actions: pd.DataFrame, home_team_id: Union[int, np.ndarray]
+) -> pd.DataFrame:
+    # the home team of each action can be given to fix actions of multiple games
     away_idx = (actions.team_id != home_team_id).values
     for col in ['start_x', 'end_x']:
         actions.loc[away_idx, col] = spadlconfig.field_length - actions[away_idx][col].values
@@ -46,34 +55,142 @@ def _fix_direction_of_play_sa(actions: pd.DataFrame, home_team_id: int) -> pd.Da
     return actions
 
 
+def _truthy(values: pd.Series) -> np.ndarray:
+    """Evaluate the truth value of each element, as ``bool(value)`` would do."""
+    if values.dtype == bool:
+        return values.values
+    if values.dtype.kind in 'iuf':
+        # NaN is truthy
+        return values.values != 0
+    return np.array([bool(v) for v in values.values], dtype=bool)
+
+
+def _coordinate_columns(columns: Dict[str, np.ndarray], index: pd.Index) -> pd.DataFrame:
+    """Combine object arrays of coordinates, with None for missing values, in a dataframe.
+
+    The coordinates remain integers if all of them are integers, as they were
+    when the coordinates were extracted row by row. Otherwise, all of them
+    are floats.
+    """
+    frame = pd.DataFrame(columns).infer_objects()
+    if not all(pd.api.types.is_integer_dtype(t) for t in frame.dtypes):
+        frame = frame.astype(float)
+    return frame.set_axis(index)
+
+
+def _next_idx(n: int, game_id: Optional[ArrayLike] = None) -> np.ndarray:
+    """Return the position of the next action in the same game.
+
+    The last action of each game is its own next action.
+    """
+    idx = np.arange(n)
+    if game_id is None or n == 0:
+        return np.minimum(idx + 1, max(n - 1, 0))
+    game_id = np.asarray(game_id)
+    next_idx = idx + 1
+    next_idx[-1] = n - 1
+    last_of_game = np.concatenate([game_id[1:] != game_id[:-1], [True]])
+    next_idx[last_of_game] = idx[last_of_game]
+    return next_idx
+
+
+def _action_ids(game_id: ArrayLike) -> np.ndarray:
+    """Number the actions of each game, starting from zero.
+
+    The actions of a game should be consecutive.
+    """
+    game_id = np.asarray(game_id)
+    idx = np.arange(len(game_id))
+    if len(game_id) == 0:
+        return idx
+    new_game = np.concatenate([[True], game_id[1:] != game_id[:-1]])
+    return idx - np.maximum.accumulate(np.where(new_game, idx, 0))
+
+
+def _home_team_ids(
+    game_id: pd.Series, home_team_ids: Union[Mapping[Any, Any], pd.Series]
+) -> np.ndarray:
+    """Look up the home team of the game of each action."""
+    home_team_id = game_id.map(home_team_ids)
+    missing = home_team_id.isna()
+    if missing.any():
+        raise ValueError(f'No home team for games {list(game_id[missing].unique())}')
+    return home_team_id.values
+
+
+def _interleave(actions: pd.DataFrame, extra: pd.DataFrame, after: np.ndarray) -> pd.DataFrame:
+    """Insert extra actions directly after the given actions.
+
+    The output is built in a single pass from the positions of the inserted
+    actions, such that the actions do not have to be sorted again.
+
+    Parameters
+    ----------
+    actions : pd.DataFrame
+        The actions.
+    extra : pd.DataFrame
+        The actions to insert.
+    after : np.ndarray
+        For each extra action, the position of the action that it follows.
+        The positions should be in increasing order. Extra actions that
+        follow the same action are inserted in the given order.
+
+    Returns
+    -------
+    pd.DataFrame
+        The actions with the extra actions inserted, with the actions of each
+        game numbered from zero.
+    """
+    n, k = len(actions), len(extra)
+    # the number of extra actions inserted before each action
+    nb_before = np.zeros(n, dtype=np.int64)
+    np.cumsum(np.bincount(after, minlength=n)[:-1], out=nb_before[1:])
+    order = np.empty(n + k, dtype=np.int64)
+    order[np.arange(n) + nb_before] = np.arange(n)
+    order[after + np.arange(1, k + 1)] = np.arange(n, n + k)
+    actions = pd.concat([actions, extra], ignore_index=True, sort=False).take(order)
+    actions.index = pd.RangeIndex(n + k)
+    actions['action_id'] = _action_ids(actions.game_id.values)
+    return actions
+
+
 min_dribble_length: float = 3.0
 max_dribble_length: float = 60.0
 max_dribble_duration: float = 10.0
 
 
 def _add_dribbles(actions: pd.DataFrame) -> pd.DataFrame:
-    next_actions = actions.shift(-1, fill_value=0)
-
-    same_team = actions.team_id == next_actions.team_id
-    # not_clearance = actions.type_id != actiontypes.index("clearance")
-
-    dx = actions.end_x - next_actions.start_x
-    dy = actions.end_y - next_actions.start_y
-    far_enough = dx**2 + dy**2 >= min_dribble_length**2
-    not_too_far = dx**2 + dy**2 <= max_dribble_length**2
-
-    dt = next_actions.time_seconds - actions.time_seconds
-    same_phase = dt < max_dribble_duration
-    same_period = actions.period_id == next_actions.period_id
-
-    dribble_idx = same_team & far_enough & not_too_far & same_phase & same_period
+    cols = ['team_id', 'period_id', 'time_seconds', 'start_x', 'start_y', 'end_x', 'end_y']
+    arrays = [actions[col].values for col in cols]
+    # no dribble is inserted after the last action of a game
+    same_game = _next_idx(len(actions), actions.game_id.values) != np.arange(len(actions))
+    if kernels.accelerated(*arrays):
+        dribble_idx = same_game & kernels.dribble_mask(
+            *arrays, min_dribble_length, max_dribble_length, max_dribble_duration
+        )
+        prev = actions[dribble_idx]
+        nex = actions.iloc[np.flatnonzero(dribble_idx) + 1].set_axis(prev.index)
+    else:
+        next_actions = actions.shift(-1, fill_value=0)
+        same_team = actions.team_id == next_actions.team_id
+        # not_clearance = actions.type_id != actiontypes.index("clearance")
+
+        dx = actions.end_x - next_actions.start_x
+        dy = actions.end_y - next_actions.start_y
+        far_enough = dx**2 + dy**2 >= min_dribble_length**2
+        not_too_far = dx**2 + dy**2 <= max_dribble_length**2
+
+        dt = next_actions.time_seconds - actions.time_seconds
+        same_phase = dt < max_dribble_duration
+        same_period = actions.period_id == next_actions.period_id
+
+        dribble_idx = same_team & far_enough & not_too_far & same_phase & same_period & same_game
+        prev = actions[dribble_idx]
+        nex = next_actions[dribble_idx]
 
     dribbles = pd.DataFrame()
-    prev = actions[dribble_idx]
-    nex = next_actions[dribble_idx]
     dribbles['game_id'] = nex.game_id
     dribbles['period_id'] = nex.period_id
-    dribbles['action_id'] = prev.action_id + 0.1
     dribbles['time_seconds'] = (prev.time_seconds + nex.time_seconds) / 2
     if 'timestamp' in actions.columns:
         dribbles['timestamp'] = nex.timestamp
@@ -87,7 +204,4 @@ def _add_dribbles(actions: pd.DataFrame) -> pd.DataFrame:
     dribbles['type_id'] = spadlconfig.actiontypes.index('dribble')
     dribbles['result_id'] = spadlconfig.results.index('success')
 
-    actions = pd.concat([actions, dribbles], ignore_index=True, sort=False)
-    actions = actions.sort_values(['game_id', 'period_id', 'action_id']).reset_index(drop=True)
-    actions['action_id'] = range(len(actions))
-    return actions
+    return _interleave(actions, dribbles, np.flatnonzero(dribble_idx))
@@ -1,11 +1,22 @@
 """Opta event stream data to SPADL converter."""
-from typing import Any, Dict, Tuple
+from itertools import chain
+from typing import Any, List, Mapping, Tuple, Union
 
+import numpy as np  # type: ignore
 import pandas as pd  # type: ignore
 from pandera.typing import DataFrame
+from scipy import sparse  # type: ignore
+
+from socceraction.dtypes import cast_actions
 
 from . import config as spadlconfig
-from .base import _add_dribbles, _fix_clearances, _fix_direction_of_play
+from .base import (
+    _action_ids,
+    _add_dribbles,
+    _fix_clearances_sa,
+    _fix_direction_of_play_sa,
+    _home_team_ids,
+)
 from .schema import SPADLSchema
 
 
@@ -25,6 +36,32 @@ def convert_to_actions(events: pd.DataFrame, home_team_id: int) -> DataFrame[SPA
     actions : pd.DataFrame
         DataFrame with corresponding SPADL actions.
 
+    """
+    return convert_to_actions_many(events, dict.fromkeys(events.game_id.unique(), home_team_id))
+
+
+def convert_to_actions_many(
+    events: pd.DataFrame, home_team_ids: Union[Mapping[Any, int], pd.Series]
+) -> DataFrame[SPADLSchema]:
+    """
+    Convert the Opta events of multiple games to SPADL actions.
+
+    All games are converted at once. The fixes that look at the next action
+    stop at the end of each game and the actions of each game are numbered
+    from zero.
+
+    Parameters
+    ----------
+    events : pd.DataFrame
+        DataFrame containing Opta events from one or more games.
+    home_team_ids : dict or pd.Series
+        The ID of the home team of each game, indexed by game ID.
+
+    Returns
+    -------
+    actions : pd.DataFrame
+        DataFrame with corresponding SPADL actions.
+
     """
     actions = pd.DataFrame()
 
@@ -48,11 +85,7 @@ def convert_to_actions(events: pd.DataFrame, home_team_id: int) -> DataFrame[SPA
     for col in ['start_y', 'end_y']:
         actions[col] = events[col].clip(0, 100) / 100 * spadlconfig.field_width
 
-    actions['type_id'] = events[['type_name', 'outcome', 'qualifiers']].apply(_get_type_id, axis=1)
-    actions['result_id'] = events[['type_name', 'outcome', 'qualifiers']].apply(
-        _get_result_id, axis=1
-    )
-    actions['bodypart_id'] = events.qualifiers.apply(_get_bodypart_id)
+    actions['type_id'], actions['result_id'], actions['bodypart_id'] = _parse_events(events)
 
     actions = (
         actions[actions.type_id != spadlconfig.actiontypes.index('non_action')]
@@ -60,100 +93,138 @@ def convert_to_actions(events: pd.DataFrame, home_team_id: int) -> DataFrame[SPA
         .reset_index(drop=True)
     )
     actions = _fix_owngoals(actions)
-    actions = _fix_direction_of_play(actions, home_team_id)
-    actions = _fix_clearances(actions)
-    actions['action_id'] = range(len(actions))
+    actions = _fix_direction_of_play_sa(actions, _home_team_ids(actions.game_id, home_team_ids))
+    actions = _fix_clearances_sa(actions)
+    actions['action_id'] = _action_ids(actions.game_id.values)
     actions = _add_dribbles(actions)
 
-    return actions.pipe(DataFrame[SPADLSchema])
+    return cast_actions(actions.pipe(DataFrame[SPADLSchema]))
 
 
-def _get_bodypart_id(qualifiers: Dict[int, Any]) -> int:
-    if 15 in qualifiers:
-        b = 'head'
-    elif 21 in qualifiers:
-        b = 'other'
-    else:
-        b = 'foot'
-    return spadlconfig.bodyparts.index(b)
-
-
-def _get_result_id(args: Tuple[str, bool, Dict[int, Any]]) -> int:
-    e, outcome, q = args
-    if e == 'offside pass':
-        r = 'offside'  # offside
-    elif e == 'foul':
-        r = 'fail'
-    elif e in ['attempt saved', 'miss', 'post']:
-        r = 'fail'
-    elif e == 'goal':
-        if 28 in q:
-            r = 'owngoal'  # own goal, x and y must be switched
-        else:
-            r = 'success'
-    elif e == 'ball touch':
-        r = 'fail'
-    elif outcome:
-        r = 'success'
-    else:
-        r = 'fail'
-    return spadlconfig.results.index(r)
-
-
-def _get_type_id(args: Tuple[str, bool, Dict[int, Any]]) -> int:  # noqa: C901
-    eventname, outcome, q = args
-    if eventname in ('pass', 'offside pass'):
-        cross = 2 in q
-        freekick = 5 in q
-        corner = 6 in q
-        throw_in = 107 in q
-        goalkick = 124 in q
-        if throw_in:
-            a = 'throw_in'
-        elif freekick and cross:
-            a = 'freekick_crossed'
-        elif freekick:
-            a = 'freekick_short'
-        elif corner and cross:
-            a = 'corner_crossed'
-        elif corner:
-            a = 'corner_short'
-        elif cross:
-            a = 'cross'
-        elif goalkick:
-            a = 'goalkick'
-        else:
-            a = 'pass'
-    elif eventname == 'take on':
-        a = 'take_on'
-    elif eventname == 'foul' and outcome is False:
-        a = 'foul'
-    elif eventname == 'tackle':
-        a = 'tackle'
-    elif eventname in ('interception', 'blocked pass'):
-        a = 'interception'
-    elif eventname in ['miss', 'post', 'attempt saved', 'goal']:
-        if 9 in q:
-            a = 'shot_penalty'
-        elif 26 in q:
-            a = 'shot_freekick'
-        else:
-            a = 'shot'
-    elif eventname == 'save':
-        a = 'keeper_save'
-    elif eventname == 'claim':
-        a = 'keeper_claim'
-    elif eventname == 'punch':
-        a = 'keeper_punch'
-    elif eventname == 'keeper pick-up':
-        a = 'keeper_pick_up'
-    elif eventname == 'clearance':
-        a = 'clearance'
-    elif eventname == 'ball touch' and outcome is False:
-        a = 'bad_touch'
+# the qualifiers that determine the type, result or bodypart of an action
+_QUALIFIERS = {
+    'cross': 2,
+    'freekick': 5,
+    'corner': 6,
+    'penalty': 9,
+    'head': 15,
+    'other_bodypart': 21,
+    'direct_freekick': 26,
+    'owngoal': 28,
+    'throw_in': 107,
+    'goalkick': 124,
+}
+
+
+def _qualifier_matrix(qualifiers: pd.Series) -> sparse.csr_matrix:
+    """Encode the qualifiers as a sparse boolean matrix of events by qualifier ids.
+
+    Events without a dict of qualifiers have no qualifiers.
+    """
+    qualifiers = [q if isinstance(q, dict) else {} for q in qualifiers]
+    lengths = np.fromiter(map(len, qualifiers), dtype=np.int64, count=len(qualifiers))
+    ids = np.fromiter(chain.from_iterable(qualifiers), dtype=np.int64, count=lengths.sum())
+    indptr = np.concatenate([[0], np.cumsum(lengths)])
+    shape = (len(qualifiers), ids.max() + 1 if len(ids) else 0)
+    return sparse.csr_matrix((np.ones(len(ids), dtype=bool), ids, indptr), shape=shape)
+
+
+def _has_qualifiers(matrix: sparse.csr_matrix, qualifier_ids: List[int]) -> np.ndarray:
+    """Return a dense (n, len(qualifier_ids)) mask of the events with each qualifier."""
+    present = [q for q in qualifier_ids if q < matrix.shape[1]]
+    dense = matrix[:, present].toarray() if present else np.zeros((matrix.shape[0], 0), bool)
+    mask = np.zeros((matrix.shape[0], len(qualifier_ids)), dtype=bool)
+    mask[:, [qualifier_ids.index(q) for q in present]] = dense
+    return mask
+
+
+def _parse_events(events: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Compute the SPADL type, result and bodypart of each event."""
+    ats, rs, bps = spadlconfig.actiontypes, spadlconfig.results, spadlconfig.bodyparts
+    mask = _has_qualifiers(_qualifier_matrix(events.qualifiers), list(_QUALIFIERS.values()))
+    q = dict(zip(_QUALIFIERS, mask.T))
+    name = events.type_name.values
+    outcome = events.outcome
+    if outcome.dtype == bool:
+        success, failed = outcome.values, ~outcome.values
     else:
-        a = 'non_action'
-    return spadlconfig.actiontypes.index(a)
+        success = np.array([bool(o) for o in outcome.values], dtype=bool)
+        failed = np.array([o is False for o in outcome.values], dtype=bool)
+
+    is_pass = np.isin(name, ['pass', 'offside pass'])
+    is_shot = np.isin(name, ['miss', 'post', 'attempt saved', 'goal'])
+    type_id = np.select(
+        [
+            is_pass & q['throw_in'],
+            is_pass & q['freekick'] & q['cross'],
+            is_pass & q['freekick'],
+            is_pass & q['corner'] & q['cross'],
+            is_pass & q['corner'],
+            is_pass & q['cross'],
+            is_pass & q['goalkick'],
+            is_pass,
+            name == 'take on',
+            (name == 'foul') & failed,
+            name == 'tackle',
+            np.isin(name, ['interception', 'blocked pass']),
+            is_shot & q['penalty'],
+            is_shot & q['direct_freekick'],
+            is_shot,
+            name == 'save',
+            name == 'claim',
+            name == 'punch',
+            name == 'keeper pick-up',
+            name == 'clearance',
+            (name == 'ball touch') & failed,
+        ],
+        [
+            ats.index('throw_in'),
+            ats.index('freekick_crossed'),
+            ats.index('freekick_short'),
+            ats.index('corner_crossed'),
+            ats.index('corner_short'),
+            ats.index('cross'),
+            ats.index('goalkick'),
+            ats.index('pass'),
+            ats.index('take_on'),
+            ats.index('foul'),
+            ats.index('tackle'),
+            ats.index('interception'),
+            ats.index('shot_penalty'),
+            ats.index('shot_freekick'),
+            ats.index('shot'),
+            ats.index('keeper_save'),
+            ats.index('keeper_claim'),
+            ats.index('keeper_punch'),
+            ats.index('keeper_pick_up'),
+            ats.index('clearance'),
+            ats.index('bad_touch'),
+        ],
+        ats.index('non_action'),
+    )
+    result_id = np.select(
+        [
+            name == 'offside pass',
+            np.isin(name, ['foul', 'attempt saved', 'miss', 'post']),
+            (name == 'goal') & q['owngoal'],
+            name == 'goal',
+            (name == 'ball touch') | ~success,
+        ],
+        [
+            rs.index('offside'),
+            rs.index('fail'),
+            rs.index('owngoal'),
+            rs.index('success'),
+            rs.index('fail'),
+        ],
+        rs.index('success'),
+    )
+    bodypart_id = np.select(
+        [q['head'], q['other_bodypart']],
+        [bps.index('head'), bps.index('other')],
+        bps.index('foot'),
+    )
+    return type_id, result_id, bodypart_id
 
 
 def _fix_owngoals(actions: pd.DataFrame) -> pd.DataFrame:
@@ -1,11 +1,20 @@
 """StatsBomb event stream data to SPADL converter."""
-from typing import Any, Dict, Tuple
+from typing import Any, Callable, Dict, List, Mapping, Tuple, Union
 
+import numpy as np  # type: ignore
 import pandas as pd  # type: ignore
 from pandera.typing import DataFrame
 
+from socceraction.dtypes import cast_actions
+
 from . import config as spadlconfig
-from .base import _add_dribbles, _fix_clearances, _fix_direction_of_play
+from .base import (
+    _action_ids,
+    _add_dribbles,
+    _fix_clearances_sa,
+    _fix_direction_of_play_sa,
+    _home_team_ids,
+)
 from .schema import SPADLSchema
 
 
@@ -26,11 +35,33 @@ def convert_to_actions(events: pd.DataFrame, home_team_id: int) -> DataFrame[SPA
         DataFrame with corresponding SPADL actions.
 
     """
-    actions = pd.DataFrame()
+    return convert_to_actions_many(events, dict.fromkeys(events.game_id.unique(), home_team_id))
+
+
+def convert_to_actions_many(
+    events: pd.DataFrame, home_team_ids: Union[Mapping[Any, int], pd.Series]
+) -> DataFrame[SPADLSchema]:
+    """
+    Convert the StatsBomb events of multiple games to SPADL actions.
+
+    All games are converted at once. The fixes that look at the next action
+    stop at the end of each game and the actions of each game are numbered
+    from zero.
+
+    Parameters
+    ----------
+    events : pd.DataFrame
+        DataFrame containing StatsBomb events from one or more games.
+    home_team_ids : dict or pd.Series
+        The ID of the home team of each game, indexed by game ID.
+
+    Returns
+    -------
+    actions : pd.DataFrame
+        DataFrame with corresponding SPADL actions.
 
-    events = events.copy()
-    events['extra'].fillna({}, inplace=True)
-    events.fillna(0, inplace=True)
+    """
+    actions = pd.DataFrame()
 
     actions['game_id'] = events.game_id
     actions['original_event_id'] = events.event_id
@@ -44,284 +75,279 @@ def convert_to_actions(events: pd.DataFrame, home_team_id: int) -> DataFrame[SPA
         - ((events.period_id > 3) * 15 * 60)
         - ((events.period_id > 4) * 15 * 60)
     )
-    actions['team_id'] = events.team_id
-    actions['player_id'] = events.player_id
-
-    actions['start_x'] = events.location.apply(lambda x: x[0] if x else 1).clip(1, 120)
-    actions['start_y'] = events.location.apply(lambda x: x[1] if x else 1).clip(1, 80)
-    actions['start_x'] = ((actions['start_x'] - 1) / 119) * spadlconfig.field_length
-    actions['start_y'] = 68 - ((actions['start_y'] - 1) / 79) * spadlconfig.field_width
-
-    end_location = events[['location', 'extra']].apply(_get_end_location, axis=1)
-    actions['end_x'] = end_location.apply(lambda x: x[0] if x else 1).clip(1, 120)
-    actions['end_y'] = end_location.apply(lambda x: x[1] if x else 1).clip(1, 80)
-    actions['end_x'] = ((actions['end_x'] - 1) / 119) * spadlconfig.field_length
-    actions['end_y'] = 68 - ((actions['end_y'] - 1) / 79) * spadlconfig.field_width
-
-    actions[['type_id', 'result_id', 'bodypart_id']] = events[['type_name', 'extra']].apply(
-        _parse_event, axis=1, result_type='expand'
-    )
+    actions['team_id'] = events.team_id.fillna(0)
+    actions['player_id'] = events.player_id.fillna(0)
+
+    start, start_missing = _decode_locations(events.location.values)
+    start[start_missing] = 1
+    end = _end_locations(events.extra.values, start)
+    actions['start_x'] = ((np.clip(start[:, 0], 1, 120) - 1) / 119) * spadlconfig.field_length
+    actions['start_y'] = 68 - ((np.clip(start[:, 1], 1, 80) - 1) / 79) * spadlconfig.field_width
+    actions['end_x'] = ((np.clip(end[:, 0], 1, 120) - 1) / 119) * spadlconfig.field_length
+    actions['end_y'] = 68 - ((np.clip(end[:, 1], 1, 80) - 1) / 79) * spadlconfig.field_width
+
+    actions['type_id'], actions['result_id'], actions['bodypart_id'] = _parse_events(events)
 
     actions = (
         actions[actions.type_id != spadlconfig.actiontypes.index('non_action')]
         .sort_values(['game_id', 'period_id', 'time_seconds'])
         .reset_index(drop=True)
     )
-    actions = _fix_direction_of_play(actions, home_team_id)
-    actions = _fix_clearances(actions)
+    actions = _fix_direction_of_play_sa(actions, _home_team_ids(actions.game_id, home_team_ids))
+    actions = _fix_clearances_sa(actions)
 
-    actions['action_id'] = range(len(actions))
+    actions['action_id'] = _action_ids(actions.game_id.values)
     actions = _add_dribbles(actions)
 
-    return actions.pipe(DataFrame[SPADLSchema])
+    return cast_actions(actions.pipe(DataFrame[SPADLSchema]))
+
 
+def _decode_locations(locations: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert an array of [x, y(, z)] lists into an (n, 2) array of coordinates.
 
-Location = Tuple[float, float]
+    Returns the coordinates and a mask of the locations that are missing.
+    The coordinates of missing locations are NaN.
+    """
+    present = np.array(
+        [isinstance(loc, (list, tuple, np.ndarray)) and len(loc) >= 2 for loc in locations],
+        dtype=bool,
+    )
+    coords = np.full((len(locations), 2), np.nan)
+    if present.any():
+        coords[present] = [loc[:2] for loc in locations[present]]
+    return coords, ~present
 
 
-def _get_end_location(q: Tuple[Location, Dict[str, Any]]) -> Location:
-    start_location, extra = q
+def _end_locations(extra: np.ndarray, start: np.ndarray) -> np.ndarray:
+    """Extract the end location of passes, shots and carries from the extra column.
+
+    Events without an end location end at their `start` location.
+    """
+    end = start.copy()
+    todo = np.ones(len(extra), dtype=bool)
     for event in ['pass', 'shot', 'carry']:
-        if event in extra and 'end_location' in extra[event]:
-            return extra[event]['end_location']
-    return start_location
-
-
-def _parse_event(q: Tuple[str, Dict[str, Any]]) -> Tuple[int, int, int]:
-    t, x = q
-    events = {
-        'Pass': _parse_pass_event,
-        'Dribble': _parse_dribble_event,
-        'Carry': _parse_carry_event,
-        'Foul Committed': _parse_foul_event,
-        'Duel': _parse_duel_event,
-        'Interception': _parse_interception_event,
-        'Shot': _parse_shot_event,
-        'Own Goal Against': _parse_own_goal_event,
-        'Goal Keeper': _parse_goalkeeper_event,
-        'Clearance': _parse_clearance_event,
-        'Miscontrol': _parse_miscontrol_event,
-    }
-    parser = events.get(t, _parse_event_as_non_action)
-    a, r, b = parser(x)
-    actiontype = spadlconfig.actiontypes.index(a)
-    result = spadlconfig.results.index(r)
-    bodypart = spadlconfig.bodyparts.index(b)
-    return actiontype, result, bodypart
-
-
-def _parse_event_as_non_action(_extra: Dict[str, Any]) -> Tuple[str, str, str]:
-    a = 'non_action'
-    r = 'success'
-    b = 'foot'
-    return a, r, b
+        idx = np.flatnonzero(todo)
+        details = _field(extra[idx], event)
+        idx = idx[[isinstance(d, dict) and 'end_location' in d for d in details]]
+        end[idx], missing = _decode_locations(_field(extra[idx], event, 'end_location'))
+        end[idx[missing]] = 1
+        todo[idx] = False
+    return end
 
 
-def _parse_pass_event(extra: Dict[str, Any]) -> Tuple[str, str, str]:  # noqa: C901
-
-    a = 'pass'  # default
-    p = extra.get('pass', {})
-    ptype = p.get('type', {}).get('name')
-    height = p.get('height', {}).get('name')
-    cross = p.get('cross')
-    if ptype == 'Free Kick':
-        if height == 'High Pass' or cross:
-            a = 'freekick_crossed'
-        else:
-            a = 'freekick_short'
-    elif ptype == 'Corner':
-        if height == 'High Pass' or cross:
-            a = 'corner_crossed'
-        else:
-            a = 'corner_short'
-    elif ptype == 'Goal Kick':
-        a = 'goalkick'
-    elif ptype == 'Throw-in':
-        a = 'throw_in'
-    elif cross:
-        a = 'cross'
-    else:
-        a = 'pass'
-
-    pass_outcome = extra.get('pass', {}).get('outcome', {}).get('name')
-    if pass_outcome in ['Incomplete', 'Out']:
-        r = 'fail'
-    elif pass_outcome == 'Pass Offside':
-        r = 'offside'
-    else:
-        r = 'success'
-
-    bp = extra.get('pass', {}).get('body_part', {}).get('name')
-    if bp is None:
-        b = 'foot'
-    elif 'Head' in bp:
-        b = 'head'
-    elif 'Foot' in bp or bp == 'Drop Kick':
-        b = 'foot'
-    else:
-        b = 'other'
+def _parse_events(events: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Compute the SPADL type, result and bodypart of each event.
 
-    return a, r, b
+    The events are partitioned by type and the rules of each type are
+    applied to all its events at once.
+    """
+    n = len(events)
+    type_id = np.full(n, spadlconfig.actiontypes.index('non_action'))
+    result_id = np.full(n, spadlconfig.results.index('success'))
+    bodypart_id = np.full(n, spadlconfig.bodyparts.index('foot'))
+    extra = events['extra'].values
+    positions = pd.Series(np.arange(n)).groupby(events['type_name'].values, sort=False)
+    for type_name, idx in positions.indices.items():
+        parser = _event_type_parsers.get(type_name)
+        if parser is not None:
+            type_id[idx], result_id[idx], bodypart_id[idx] = parser(extra[idx])
+    return type_id, result_id, bodypart_id
 
 
-def _parse_dribble_event(extra: Dict[str, Any]) -> Tuple[str, str, str]:
-    a = 'take_on'
+def _field(extra: np.ndarray, *keys: str) -> np.ndarray:
+    """Extract a nested field from an array of dicts, with None if it is missing."""
+    values = np.empty(len(extra), dtype=object)
+    for i, value in enumerate(extra):
+        for key in keys:
+            value = value.get(key) if isinstance(value, dict) else None
+        values[i] = value
+    return values
 
-    dribble_outcome = extra.get('dribble', {}).get('outcome', {}).get('name')
-    if dribble_outcome == 'Incomplete':
-        r = 'fail'
-    elif dribble_outcome == 'Complete':
-        r = 'success'
-    else:
-        r = 'success'
 
-    b = 'foot'
+def _isin(values: np.ndarray, options: List[str]) -> np.ndarray:
+    return pd.Series(values, dtype=object).isin(options).values
 
-    return a, r, b
 
+def _contains(values: np.ndarray, pattern: str) -> np.ndarray:
+    return pd.Series(values, dtype=object).str.contains(pattern, regex=False, na=False).values
 
-def _parse_carry_event(_extra: Dict[str, Any]) -> Tuple[str, str, str]:
-    a = 'dribble'
-    r = 'success'
-    b = 'foot'
-    return a, r, b
 
+IdArrays = Tuple[Any, Any, Any]
 
-def _parse_foul_event(extra: Dict[str, Any]) -> Tuple[str, str, str]:
-    a = 'foul'
 
-    foul_card = extra.get('foul_committed', {}).get('card', {}).get('name', '')
-    if 'Yellow' in foul_card:
-        r = 'yellow_card'
-    elif 'Red' in foul_card:
-        r = 'red_card'
-    else:
-        r = 'success'
+def _bodypart_ids(bp: np.ndarray) -> np.ndarray:
+    bps = spadlconfig.bodyparts
+    return np.select(
+        [pd.isna(bp), _contains(bp, 'Head'), _contains(bp, 'Foot') | (bp == 'Drop Kick')],
+        [bps.index('foot'), bps.index('head'), bps.index('foot')],
+        bps.index('other'),
+    )
 
-    b = 'foot'
 
+def _parse_pass_events(extra: np.ndarray) -> IdArrays:
+    ats = spadlconfig.actiontypes
+    ptype = _field(extra, 'pass', 'type', 'name')
+    cross = np.array([bool(c) for c in _field(extra, 'pass', 'cross')], dtype=bool)
+    high_or_cross = (_field(extra, 'pass', 'height', 'name') == 'High Pass') | cross
+    a = np.select(
+        [
+            (ptype == 'Free Kick') & high_or_cross,
+            ptype == 'Free Kick',
+            (ptype == 'Corner') & high_or_cross,
+            ptype == 'Corner',
+            ptype == 'Goal Kick',
+            ptype == 'Throw-in',
+            cross,
+        ],
+        [
+            ats.index('freekick_crossed'),
+            ats.index('freekick_short'),
+            ats.index('corner_crossed'),
+            ats.index('corner_short'),
+            ats.index('goalkick'),
+            ats.index('throw_in'),
+            ats.index('cross'),
+        ],
+        ats.index('pass'),
+    )
+    outcome = _field(extra, 'pass', 'outcome', 'name')
+    r = np.select(
+        [_isin(outcome, ['Incomplete', 'Out']), outcome == 'Pass Offside'],
+        [spadlconfig.results.index('fail'), spadlconfig.results.index('offside')],
+        spadlconfig.results.index('success'),
+    )
+    b = _bodypart_ids(_field(extra, 'pass', 'body_part', 'name'))
     return a, r, b
 
 
-def _parse_duel_event(extra: Dict[str, Any]) -> Tuple[str, str, str]:
-    if extra.get('duel', {}).get('type', {}).get('name') == 'Tackle':
-        a = 'tackle'
-        duel_outcome = extra.get('duel', {}).get('outcome', {}).get('name')
-        if duel_outcome in ['Lost In Play', 'Lost Out']:
-            r = 'fail'
-        elif duel_outcome in ['Success in Play', 'Won']:
-            r = 'success'
-        else:
-            r = 'success'
-
-        b = 'foot'
-        return a, r, b
-    return _parse_event_as_non_action(extra)
-
-
-def _parse_interception_event(extra: Dict[str, Any]) -> Tuple[str, str, str]:
-    a = 'interception'
-    interception_outcome = extra.get('interception', {}).get('outcome', {}).get('name')
-    if interception_outcome in ['Lost In Play', 'Lost Out']:
-        r = 'fail'
-    elif interception_outcome == 'Won':
-        r = 'success'
-    else:
-        r = 'success'
-    b = 'foot'
-    return a, r, b
+def _parse_dribble_events(extra: np.ndarray) -> IdArrays:
+    outcome = _field(extra, 'dribble', 'outcome', 'name')
+    r = np.where(
+        outcome == 'Incomplete',
+        spadlconfig.results.index('fail'),
+        spadlconfig.results.index('success'),
+    )
+    return spadlconfig.actiontypes.index('take_on'), r, spadlconfig.bodyparts.index('foot')
 
 
-def _parse_shot_event(extra: Dict[str, Any]) -> Tuple[str, str, str]:
-    extra_type = extra.get('shot', {}).get('type', {}).get('name')
-    if extra_type == 'Free Kick':
-        a = 'shot_freekick'
-    elif extra_type == 'Penalty':
-        a = 'shot_penalty'
-    else:
-        a = 'shot'
-
-    shot_outcome = extra.get('shot', {}).get('outcome', {}).get('name')
-    if shot_outcome == 'Goal':
-        r = 'success'
-    elif shot_outcome in ['Blocked', 'Off T', 'Post', 'Saved', 'Wayward']:
-        r = 'fail'
-    else:
-        r = 'fail'
-
-    bp = extra.get('shot', {}).get('body_part', {}).get('name')
-    if bp is None:
-        b = 'foot'
-    elif 'Head' in bp:
-        b = 'head'
-    elif 'Foot' in bp or bp == 'Drop Kick':
-        b = 'foot'
-    else:
-        b = 'other'
+def _parse_carry_events(_extra: np.ndarray) -> IdArrays:
+    return (
+        spadlconfig.actiontypes.index('dribble'),
+        spadlconfig.results.index('success'),
+        spadlconfig.bodyparts.index('foot'),
+    )
 
-    return a, r, b
 
+def _parse_foul_events(extra: np.ndarray) -> IdArrays:
+    card = _field(extra, 'foul_committed', 'card', 'name')
+    r = np.select(
+        [_contains(card, 'Yellow'), _contains(card, 'Red')],
+        [spadlconfig.results.index('yellow_card'), spadlconfig.results.index('red_card')],
+        spadlconfig.results.index('success'),
+    )
+    return spadlconfig.actiontypes.index('foul'), r, spadlconfig.bodyparts.index('foot')
 
-def _parse_own_goal_event(_extra: Dict[str, Any]) -> Tuple[str, str, str]:
-    a = 'bad_touch'
-    r = 'owngoal'
-    b = 'foot'
-    return a, r, b
 
+def _parse_duel_events(extra: np.ndarray) -> IdArrays:
+    tackle = _field(extra, 'duel', 'type', 'name') == 'Tackle'
+    a = np.where(
+        tackle,
+        spadlconfig.actiontypes.index('tackle'),
+        spadlconfig.actiontypes.index('non_action'),
+    )
+    lost = _isin(_field(extra, 'duel', 'outcome', 'name'), ['Lost In Play', 'Lost Out'])
+    r = np.where(
+        tackle & lost, spadlconfig.results.index('fail'), spadlconfig.results.index('success')
+    )
+    return a, r, spadlconfig.bodyparts.index('foot')
 
-def _parse_goalkeeper_event(extra: Dict[str, Any]) -> Tuple[str, str, str]:  # noqa: C901
-    extra_type = extra.get('goalkeeper', {}).get('type', {}).get('name')
-    if extra_type == 'Shot Saved':
-        a = 'keeper_save'
-    elif extra_type in ('Collected', 'Keeper Sweeper'):
-        a = 'keeper_claim'
-    elif extra_type == 'Punch':
-        a = 'keeper_punch'
-    else:
-        a = 'non_action'
-
-    goalkeeper_outcome = extra.get('goalkeeper', {}).get('outcome', {}).get('name', 'x')
-    if goalkeeper_outcome in [
-        'Claim',
-        'Clear',
-        'Collected Twice',
-        'In Play Safe',
-        'Success',
-        'Touched Out',
-    ]:
-        r = 'success'
-    elif goalkeeper_outcome in ['In Play Danger', 'No Touch']:
-        r = 'fail'
-    else:
-        r = 'success'
-
-    bp = extra.get('goalkeeper', {}).get('body_part', {}).get('name')
-    if bp is None:
-        b = 'foot'
-    elif 'Head' in bp:
-        b = 'head'
-    elif 'Foot' in bp or bp == 'Drop Kick':
-        b = 'foot'
-    else:
-        b = 'other'
 
-    return a, r, b
+def _parse_interception_events(extra: np.ndarray) -> IdArrays:
+    lost = _isin(_field(extra, 'interception', 'outcome', 'name'), ['Lost In Play', 'Lost Out'])
+    r = np.where(lost, spadlconfig.results.index('fail'), spadlconfig.results.index('success'))
+    return spadlconfig.actiontypes.index('interception'), r, spadlconfig.bodyparts.index('foot')
 
 
-def _parse_clearance_event(_extra: Dict[str, Any]) -> Tuple[str, str, str]:
-    a = 'clearance'
-    r = 'success'
-    b = 'foot'
+def _parse_shot_events(extra: np.ndarray) -> IdArrays:
+    shot_type = _field(extra, 'shot', 'type', 'name')
+    a = np.select(
+        [shot_type == 'Free Kick', shot_type == 'Penalty'],
+        [
+            spadlconfig.actiontypes.index('shot_freekick'),
+            spadlconfig.actiontypes.index('shot_penalty'),
+        ],
+        spadlconfig.actiontypes.index('shot'),
+    )
+    r = np.where(
+        _field(extra, 'shot', 'outcome', 'name') == 'Goal',
+        spadlconfig.results.index('success'),
+        spadlconfig.results.index('fail'),
+    )
+    b = _bodypart_ids(_field(extra, 'shot', 'body_part', 'name'))
     return a, r, b
 
 
-def _parse_miscontrol_event(_extra: Dict[str, Any]) -> Tuple[str, str, str]:
-    a = 'bad_touch'
-    r = 'fail'
-    b = 'foot'
+def _parse_own_goal_events(_extra: np.ndarray) -> IdArrays:
+    return (
+        spadlconfig.actiontypes.index('bad_touch'),
+        spadlconfig.results.index('owngoal'),
+        spadlconfig.bodyparts.index('foot'),
+    )
+
+
+def _parse_goalkeeper_events(extra: np.ndarray) -> IdArrays:
+    keeper_type = _field(extra, 'goalkeeper', 'type', 'name')
+    a = np.select(
+        [
+            keeper_type == 'Shot Saved',
+            _isin(keeper_type, ['Collected', 'Keeper Sweeper']),
+            keeper_type == 'Punch',
+        ],
+        [
+            spadlconfig.actiontypes.index('keeper_save'),
+            spadlconfig.actiontypes.index('keeper_claim'),
+            spadlconfig.actiontypes.index('keeper_punch'),
+        ],
+        spadlconfig.actiontypes.index('non_action'),
+    )
+    failed = _isin(_field(extra, 'goalkeeper', 'outcome', 'name'), ['In Play Danger', 'No Touch'])
+    r = np.where(failed, spadlconfig.results.index('fail'), spadlconfig.results.index('success'))
+    b = _bodypart_ids(_field(extra, 'goalkeeper', 'body_part', 'name'))
     return a, r, b
 
 
+def _parse_clearance_events(_extra: np.ndarray) -> IdArrays:
+    return (
+        spadlconfig.actiontypes.index('clearance'),
+        spadlconfig.results.index('success'),
+        spadlconfig.bodyparts.index('foot'),
+    )
+
+
+def _parse_miscontrol_events(_extra: np.ndarray) -> IdArrays:
+    return (
+        spadlconfig.actiontypes.index('bad_touch'),
+        spadlconfig.results.index('fail'),
+        spadlconfig.bodyparts.index('foot'),
+    )
+
+
+# the parser of the extra fields of each event type, other event types are non-actions
+_event_type_parsers: Dict[str, Callable[[np.ndarray], IdArrays]] = {
+    'Pass': _parse_pass_events,
+    'Dribble': _parse_dribble_events,
+    'Carry': _parse_carry_events,
+    'Foul Committed': _parse_foul_events,
+    'Duel': _parse_duel_events,
+    'Interception': _parse_interception_events,
+    'Shot': _parse_shot_events,
+    'Own Goal Against': _parse_own_goal_events,
+    'Goal Keeper': _parse_goalkeeper_events,
+    'Clearance': _parse_clearance_events,
+    'Miscontrol': _parse_miscontrol_events,
+}
+
+
 def StatsBombLoader(*args, **kwargs):  # type: ignore # noqa
     from warnings import warn
 
@@ -1,6 +1,8 @@
 """Utility functions for working with SPADL dataframes."""
 from pandera.typing import DataFrame
 import pandas as pd
+from socceraction.dtypes import cast_actions
+
 from . import config as spadlconfig
 from .schema import SPADLSchema
 
@@ -25,6 +27,7 @@ def add_names(actions: DataFrame[SPADLSchema]) -> DataFrame[SPADLSchema]:
         .merge(spadlconfig.results_df(), how='left')
         .merge(spadlconfig.bodyparts_df(), how='left')
         .pipe(DataFrame[SPADLSchema])
+        .pipe(cast_actions)
     )
 
 
@@ -1,14 +1,22 @@
 """Wyscout event stream data to SPADL converter."""
-from typing import Any, Dict, List, Optional, Set
+import warnings
+from typing import Any, Mapping, Tuple, Union
 
+import numpy as np  # type: ignore
 import pandas as pd  # type: ignore
 from pandera.typing import DataFrame
 
+from socceraction.dtypes import cast_actions
+
 from . import config as spadlconfig
 from .base import (
+    _action_ids,
     _add_dribbles,
-    _fix_clearances,
-    _fix_direction_of_play,
+    _coordinate_columns,
+    _fix_clearances_sa,
+    _fix_direction_of_play_sa,
+    _home_team_ids,
+    _truthy,
     min_dribble_length,
 )
 from .schema import SPADLSchema
@@ -38,21 +46,58 @@ def convert_to_actions(events: pd.DataFrame, home_team_id: int) -> DataFrame[SPA
         DataFrame with corresponding SPADL actions.
 
     """
+    return convert_to_actions_many(events, dict.fromkeys(events.game_id.unique(), home_team_id))
+
+
+def convert_to_actions_many(
+    events: pd.DataFrame, home_team_ids: Union[Mapping[Any, int], pd.Series]
+) -> DataFrame[SPADLSchema]:
+    """
+    Convert the Wyscout events of multiple games to SPADL actions.
+
+    All games are converted at once. The fixes that look at the previous or
+    next event stop at the boundaries of each game and the actions of each
+    game are numbered from zero.
+
+    Parameters
+    ----------
+    events : pd.DataFrame
+        DataFrame containing Wyscout events from one or more games.
+    home_team_ids : dict or pd.Series
+        The ID of the home team of each game, indexed by game ID.
+
+    Returns
+    -------
+    actions : pd.DataFrame
+        DataFrame with corresponding SPADL actions.
+
+    """
+    # the events of each game should be consecutive
+    events = events.sort_values("game_id", kind="mergesort")
     events = pd.concat([events, get_tagsdf(events)], axis=1)
     events = make_new_positions(events)
     events = fix_wyscout_events(events)
     actions = create_df_actions(events)
     actions = fix_actions(actions)
-    actions = _fix_direction_of_play(actions, home_team_id)
-    actions = _fix_clearances(actions)
-    actions["action_id"] = range(len(actions))
+    actions = _fix_direction_of_play_sa(actions, _home_team_ids(actions.game_id, home_team_ids))
+    actions = _fix_clearances_sa(actions)
+    actions["action_id"] = _action_ids(actions.game_id.values)
     actions = _add_dribbles(actions)
 
-    return actions.pipe(DataFrame[SPADLSchema])
+    return cast_actions(actions.pipe(DataFrame[SPADLSchema]))
 
 
-def _get_tag_set(tags: List[Dict[str, Any]]) -> Set[int]:
-    return {tag["id"] for tag in tags}
+def _explode_tags(events: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the row position and the bit position of each known tag of the events."""
+    tags = [t if isinstance(t, list) else [] for t in events.tags]
+    lengths = np.fromiter(map(len, tags), dtype=np.int64, count=len(tags))
+    ids = np.fromiter(
+        (tag["id"] for ts in tags for tag in ts), dtype=np.int64, count=lengths.sum()
+    )
+    rows = np.repeat(np.arange(len(tags)), lengths)
+    bits = pd.Index([tag_id for tag_id, _ in wyscout_tags]).get_indexer(ids)
+    known = bits >= 0
+    return rows[known], bits[known]
 
 
 def get_tagsdf(events: pd.DataFrame) -> pd.DataFrame:
@@ -68,11 +113,51 @@ def get_tagsdf(events: pd.DataFrame) -> pd.DataFrame:
     pd.DataFrame
         A dataframe with a column for each tag.
     """
-    tags = events.tags.apply(_get_tag_set)
-    tagsdf = pd.DataFrame()
-    for (tag_id, column) in wyscout_tags:
-        tagsdf[column] = tags.apply(lambda x, tag=tag_id: tag in x)
-    return tagsdf
+    rows, bits = _explode_tags(events)
+    values = np.zeros((len(events), len(wyscout_tags)), dtype=bool)
+    values[rows, bits] = True
+    return pd.DataFrame(values, index=events.index, columns=[col for _, col in wyscout_tags])
+
+
+def get_tag_bitset(events: pd.DataFrame) -> pd.Series:
+    """Represent Wyscout tags as a bitset with one bit for each tag.
+
+    The bit of a tag is its position in ``wyscout_tags``. Use
+    :func:`has_tag` to test for a tag.
+
+    Parameters
+    ----------
+    events : pd.DataFrame
+        Wyscout event dataframe
+
+    Returns
+    -------
+    pd.Series
+        A uint64 series with the tags of each event.
+    """
+    rows, bits = _explode_tags(events)
+    bitset = np.zeros(len(events), dtype=np.uint64)
+    np.bitwise_or.at(bitset, rows, np.left_shift(np.uint64(1), bits.astype(np.uint64)))
+    return pd.Series(bitset, index=events.index, name="tags")
+
+
+def has_tag(bitset: pd.Series, tag: str) -> pd.Series:
+    """Test which events of a tag bitset have a tag.
+
+    Parameters
+    ----------
+    bitset : pd.Series
+        The tags of the events, as returned by :func:`get_tag_bitset`.
+    tag : str
+        The name of the tag, e.g. "accurate".
+
+    Returns
+    -------
+    pd.Series
+        A boolean series that is True for the events with the tag.
+    """
+    bit = np.uint64(1) << np.uint64(_tag_bits[tag])
+    return (bitset & bit) != 0
 
 
 wyscout_tags = [
@@ -136,25 +221,7 @@ wyscout_tags = [
     (1801, "accurate"),
     (1802, "not_accurate"),
 ]
-
-
-def _make_position_vars(event_id: int, positions: List[Dict[str, Optional[float]]]) -> pd.Series:
-    if len(positions) == 2:  # if less than 2 then action is removed
-        start_x = positions[0]["x"]
-        start_y = positions[0]["y"]
-        end_x = positions[1]["x"]
-        end_y = positions[1]["y"]
-    elif len(positions) == 1:
-        start_x = positions[0]["x"]
-        start_y = positions[0]["y"]
-        end_x = start_x
-        end_y = start_y
-    else:
-        start_x = None
-        start_y = None
-        end_x = None
-        end_y = None
-    return pd.Series([event_id, start_x, start_y, end_x, end_y])
+_tag_bits = {col: bit for bit, (_, col) in enumerate(wyscout_tags)}
 
 
 def make_new_positions(events: pd.DataFrame) -> pd.DataFrame:
@@ -170,15 +237,23 @@ def make_new_positions(events: pd.DataFrame) -> pd.DataFrame:
     pd.DataFrame
         Wyscout event dataframe with start and end coordinates for each action.
     """
-    new_positions = events[["event_id", "positions"]].apply(
-        lambda x: _make_position_vars(x[0], x[1]), axis=1
-    )
-    new_positions.columns = ["event_id", "start_x", "start_y", "end_x", "end_y"]
-    events = pd.merge(events, new_positions, left_on="event_id", right_on="event_id")
-    events[["start_x", "end_x"]] = events[["start_x", "end_x"]]
-    events[["start_y", "end_y"]] = events[["start_y", "end_y"]]
-    events = events.drop("positions", axis=1)
-    return events
+    positions = events["positions"].values
+    lengths = np.fromiter(map(len, positions), dtype=np.int64, count=len(positions))
+    # events with more than two positions are removed later on
+    valid = (lengths == 1) | (lengths == 2)
+    start = [p[0] for p in positions[valid]]
+    end = [p[-1] for p in positions[valid]]
+    coords = {}
+    for col, points, key in [
+        ("start_x", start, "x"),
+        ("start_y", start, "y"),
+        ("end_x", end, "x"),
+        ("end_y", end, "y"),
+    ]:
+        coords[col] = np.full(len(positions), None, dtype=object)
+        coords[col][valid] = [point[key] for point in points]
+    events = events.drop("positions", axis=1).reset_index(drop=True)
+    return pd.concat([events, _coordinate_columns(coords, events.index)], axis=1)
 
 
 def fix_wyscout_events(df_events: pd.DataFrame) -> pd.DataFrame:
@@ -307,7 +382,9 @@ def convert_duels(df_events: pd.DataFrame) -> pd.DataFrame:
     df_events2 = df_events.shift(-2)
 
     # Define selector for same period id
-    selector_same_period = df_events["period_id"] == df_events2["period_id"]
+    selector_same_period = (df_events["period_id"] == df_events2["period_id"]) & (
+        df_events["game_id"] == df_events2["game_id"]
+    )
 
     # Define selector for duels that are followed by an 'out of field' event
     selector_duel_out_of_field = (
@@ -402,7 +479,7 @@ def insert_interception_passes(df_events: pd.DataFrame) -> pd.DataFrame:
         ]
 
         df_events = pd.concat([df_events_interceptions, df_events], ignore_index=True)
-        df_events = df_events.sort_values(["period_id", "milliseconds"])
+        df_events = df_events.sort_values(["game_id", "period_id", "milliseconds"])
         df_events = df_events.reset_index(drop=True)
 
     return df_events
@@ -431,7 +508,11 @@ def add_offside_variable(df_events: pd.DataFrame) -> pd.DataFrame:
     df_events1 = df_events.shift(-1)
 
     # Select offside passes
-    selector_offside = (df_events1["type_id"] == 6) & (df_events["type_id"] == 8)
+    selector_offside = (
+        (df_events1["type_id"] == 6)
+        & (df_events["type_id"] == 8)
+        & (df_events["game_id"] == df_events1["game_id"])
+    )
 
     # Set variable 'offside' to 1 for all offside passes
     df_events.loc[selector_offside, "offside"] = 1
@@ -466,9 +547,10 @@ def convert_simulations(df_events: pd.DataFrame) -> pd.DataFrame:
     selector_simulation = df_events["subtype_id"] == 25
 
     # Select actions preceded by a failed take-on
-    selector_previous_is_failed_take_on = (prev_events["take_on_left"]) | (
-        prev_events["take_on_right"]
-    ) & prev_events["not_accurate"]
+    selector_previous_is_failed_take_on = (
+        (prev_events["take_on_left"])
+        | (prev_events["take_on_right"]) & prev_events["not_accurate"]
+    ) & (df_events["game_id"] == prev_events["game_id"])
 
     # Transform simulations not preceded by a failed take-on to a failed take-on
     df_events.loc[selector_simulation & ~selector_previous_is_failed_take_on, "type_id"] = 0
@@ -520,7 +602,8 @@ def convert_touches(df_events: pd.DataFrame) -> pd.DataFrame:
 
     same_x = abs(df_events["end_x"] - df_events1["start_x"]) < min_dribble_length
     same_y = abs(df_events["end_y"] - df_events1["start_y"]) < min_dribble_length
-    same_loc = same_x & same_y
+    same_game = df_events["game_id"] == df_events1["game_id"]
+    same_loc = same_x & same_y & same_game
 
     # df_events.loc[selector_touch_same_player & same_loc, 'subtype_id'] = 70
     # df_events.loc[selector_touch_same_player & same_loc, 'accurate'] = True
@@ -567,9 +650,9 @@ def create_df_actions(df_events: pd.DataFrame) -> pd.DataFrame:
         ]
     ].copy()
     df_actions["original_event_id"] = df_events["event_id"].astype(object)
-    df_actions["bodypart_id"] = df_events.apply(determine_bodypart_id, axis=1)
-    df_actions["type_id"] = df_events.apply(determine_type_id, axis=1)
-    df_actions["result_id"] = df_events.apply(determine_result_id, axis=1)
+    df_actions["bodypart_id"] = _determine_bodypart_ids(df_events)
+    df_actions["type_id"] = _determine_type_ids(df_events)
+    df_actions["result_id"] = _determine_result_ids(df_events)
 
     df_actions = remove_non_actions(df_actions)  # remove all non-actions left
 
@@ -579,6 +662,10 @@ def create_df_actions(df_events: pd.DataFrame) -> pd.DataFrame:
 def determine_bodypart_id(event: pd.DataFrame) -> int:
     """Determint eht body part for each action.
 
+    .. deprecated:: 1.3.0
+           The bodypart ids of all events are determined at once by
+           :func:`create_df_actions`.
+
     Parameters
     ----------
     event : pd.Series
@@ -589,6 +676,9 @@ def determine_bodypart_id(event: pd.DataFrame) -> int:
     int
         id of the body part used for the action
     """
+    warnings.warn(
+        'determine_bodypart_id is deprecated, use create_df_actions instead', DeprecationWarning
+    )
     if event["subtype_id"] in [81, 36, 21, 90, 91]:
         body_part = "other"
     elif event["subtype_id"] == 82:
@@ -603,6 +693,10 @@ def determine_bodypart_id(event: pd.DataFrame) -> int:
 def determine_type_id(event: pd.DataFrame) -> int:  # noqa: C901
     """Determine the type of each action.
 
+    .. deprecated:: 1.3.0
+           The type ids of all events are determined at once by
+           :func:`create_df_actions`.
+
     This function transforms the Wyscout events, sub_events and tags
     into the corresponding SciSports action type
 
@@ -616,6 +710,9 @@ def determine_type_id(event: pd.DataFrame) -> int:  # noqa: C901
     int
         id of the action type
     """
+    warnings.warn(
+        'determine_type_id is deprecated, use create_df_actions instead', DeprecationWarning
+    )
     if event["own_goal"]:
         action_type = "bad_touch"
     elif event["type_id"] == 8:
@@ -666,6 +763,10 @@ def determine_type_id(event: pd.DataFrame) -> int:  # noqa: C901
 def determine_result_id(event: pd.DataFrame) -> int:  # noqa: C901
     """Determine the result of each event.
 
+    .. deprecated:: 1.3.0
+           The result ids of all events are determined at once by
+           :func:`create_df_actions`.
+
     Parameters
     ----------
     event : pd.Series
@@ -676,6 +777,9 @@ def determine_result_id(event: pd.DataFrame) -> int:  # noqa: C901
     int
         result of the action
     """
+    warnings.warn(
+        'determine_result_id is deprecated, use create_df_actions instead', DeprecationWarning
+    )
     if event["offside"] == 1:
         return 2
     if event["type_id"] == 2:  # foul
@@ -700,6 +804,93 @@ def determine_result_id(event: pd.DataFrame) -> int:  # noqa: C901
     return 1
 
 
+# The functions below implement the rules of the deprecated determine_bodypart_id,
+# determine_type_id and determine_result_id as ordered decision tables over all
+# events at once. The first rule that matches an event determines its value.
+
+
+def _determine_bodypart_ids(df_events: pd.DataFrame) -> np.ndarray:
+    subtype_id = df_events["subtype_id"].values
+    bodyparts = spadlconfig.bodyparts
+    rules = [
+        (np.isin(subtype_id, [81, 36, 21, 90, 91]), "other"),
+        (subtype_id == 82, "head"),
+        ((df_events["type_id"].values == 10) & _truthy(df_events["head/body"]), "head/other"),
+    ]
+    return np.select(
+        [cond for cond, _ in rules],
+        [bodyparts.index(b) for _, b in rules],
+        bodyparts.index("foot"),
+    )
+
+
+def _determine_type_ids(df_events: pd.DataFrame) -> np.ndarray:
+    type_id = df_events["type_id"].values
+    subtype_id = df_events["subtype_id"].values
+    tag = {
+        col: _truthy(df_events[col])
+        for col in [
+            "own_goal",
+            "high",
+            "not_accurate",
+            "take_on_left",
+            "take_on_right",
+            "sliding_tackle",
+            "interception",
+        ]
+    }
+    rules = [
+        (tag["own_goal"], "bad_touch"),
+        ((type_id == 8) & (subtype_id == 80), "cross"),
+        (type_id == 8, "pass"),
+        (subtype_id == 36, "throw_in"),
+        ((subtype_id == 30) & tag["high"], "corner_crossed"),
+        (subtype_id == 30, "corner_short"),
+        (subtype_id == 32, "freekick_crossed"),
+        (subtype_id == 31, "freekick_short"),
+        (subtype_id == 34, "goalkick"),
+        ((type_id == 2) & ~np.isin(subtype_id, [22, 23, 24, 26]), "foul"),
+        (type_id == 10, "shot"),
+        (subtype_id == 35, "shot_penalty"),
+        (subtype_id == 33, "shot_freekick"),
+        (type_id == 9, "keeper_save"),
+        (subtype_id == 71, "clearance"),
+        ((subtype_id == 72) & tag["not_accurate"], "bad_touch"),
+        (subtype_id == 70, "dribble"),
+        (tag["take_on_left"] | tag["take_on_right"], "take_on"),
+        (tag["sliding_tackle"], "tackle"),
+        (tag["interception"] & np.isin(subtype_id, [0, 10, 11, 12, 13, 72]), "interception"),
+    ]
+    actiontypes = spadlconfig.actiontypes
+    return np.select(
+        [cond for cond, _ in rules],
+        [actiontypes.index(a) for _, a in rules],
+        actiontypes.index("non_action"),
+    )
+
+
+def _determine_result_ids(df_events: pd.DataFrame) -> np.ndarray:
+    tag = {
+        col: _truthy(df_events[col]) for col in ["goal", "own_goal", "accurate", "not_accurate"]
+    }
+    rules = [
+        (df_events["offside"].values == 1, "offside"),
+        (df_events["type_id"].values == 2, "success"),
+        (tag["goal"], "success"),
+        (tag["own_goal"], "owngoal"),
+        (np.isin(df_events["subtype_id"].values, [100, 33, 35]), "fail"),
+        (tag["accurate"], "success"),
+        (tag["not_accurate"], "fail"),
+    ]
+    # all other actions, such as interceptions, clearances and keeper saves, are successful
+    results = spadlconfig.results
+    return np.select(
+        [cond for cond, _ in rules],
+        [results.index(r) for _, r in rules],
+        results.index("success"),
+    )
+
+
 def remove_non_actions(df_actions: pd.DataFrame) -> pd.DataFrame:
     """Remove the remaining non_actions from the action dataframe.
 
@@ -852,7 +1043,9 @@ def remove_keeper_goal_actions(df_actions: pd.DataFrame) -> pd.DataFrame:
         SciSports action dataframe without keeper actions directly after a goal
     """
     prev_actions = df_actions.shift(1)
-    same_phase = prev_actions.time_seconds + 10 > df_actions.time_seconds
+    same_phase = (prev_actions.time_seconds + 10 > df_actions.time_seconds) & (
+        prev_actions.game_id == df_actions.game_id
+    )
     shot_goals = (prev_actions.type_id == spadlconfig.actiontypes.index("shot")) & (
         prev_actions.result_id == 1
     )
@@ -889,7 +1082,9 @@ def adjust_goalkick_result(df_actions: pd.DataFrame) -> pd.DataFrame:
     """
     nex_actions = df_actions.shift(-1)
     goalkicks = df_actions["type_id"] == spadlconfig.actiontypes.index("goalkick")
-    same_team = df_actions["team_id"] == nex_actions["team_id"]
+    same_team = (df_actions["team_id"] == nex_actions["team_id"]) & (
+        df_actions["game_id"] == nex_actions["game_id"]
+    )
     accurate = same_team & goalkicks
     not_accurate = ~same_team & goalkicks
     df_actions.loc[accurate, "result_id"] = 1
@@ -1,16 +1,22 @@
 """Wyscout event stream data to SPADL converter."""
+import warnings
 from typing import Any, Dict, List, Optional, Set
 
+import numpy as np  # type: ignore
 import pandas as pd  # type: ignore
-from pandas import Series
 from pandera.typing import DataFrame
 
+from socceraction.dtypes import cast_actions
+
 from . import config as spadlconfig
 
 from .base import (
     _add_dribbles,
+    _coordinate_columns,
     _fix_clearances,
     _fix_direction_of_play,
+    _fix_direction_of_play_sa,
+    _truthy,
     min_dribble_length,
 )
 
@@ -25,82 +31,106 @@ from .schema import SPADLSchema
 # Enter at your own risk.
 ###################################
 
-# def convert_to_actions(events: pd.DataFrame, home_team_id: int) -> pd.DataFrame:
-def convert_to_actions(events: pd.DataFrame) -> pd.DataFrame:
-    # -> DataFrame[SPADLSchema]:
+
+def convert_to_actions(
+    events: pd.DataFrame, home_team_id: Optional[int] = None
+) -> DataFrame[SPADLSchema]:
     """
     Convert Wyscout events to SPADL actions.
     Parameters
     ----------
     events : pd.DataFrame
-        DataFrame containing Wyscout events from a single game.
-    home_team_id : int
-        ID of the home team in the corresponding game.
+        DataFrame containing flattened Wyscout v3 events from a single game.
+        Besides the event attributes, it should contain the 'match_id',
+        'match_period', 'minute', 'second', 'team_id' and 'player_id' of each
+        event.
+    home_team_id : int, optional
+        ID of the home team in the corresponding game. If not given, the
+        home team is read from the 'home_team_id' column of the events.
     Returns
     -------
     actions : pd.DataFrame
         DataFrame with corresponding SPADL actions.
     """
-    # events = pd.concat([events, get_tagsdf(events)], axis=1)
     events = make_new_positions(events)
     events = fix_wyscout_events(events)
     actions = create_df_actions(events)
     actions = fix_actions(actions)
-    actions = _fix_direction_of_play(actions)
+    if home_team_id is None:
+        actions = _fix_direction_of_play(actions)
+    else:
+        actions = _fix_direction_of_play_sa(actions, home_team_id)
     actions = _fix_clearances(actions)
+    actions = create_spadl_actions(actions)
     actions["action_id"] = range(len(actions))
     # actions = _add_dribbles(actions)
 
-    return events
-    # events.pipe(DataFrame[SPADLSchema])
-
+    return cast_actions(actions.pipe(DataFrame[SPADLSchema]))
 
-# def _get_tag_set(tags: List[Dict[str, Any]]) -> Set[int]:
-#     return {tag["id"] for tag in tags}
-#
-#
-# def get_tagsdf(events: pd.DataFrame) -> pd.DataFrame:
-#     """Represent Wyscout tags as a boolean dataframe.
-#     Parameters
-#     ----------
-#     events : pd.DataFrame
-#         Wyscout event dataframe
-#     Returns
-#     -------
-#     pd.DataFrame
-#         A dataframe with a column for each tag.
-#     """
-#
 
-
-def _make_position_vars(events: pd.DataFrame) -> Series:
-    if events["pass_height"] == "blocked":
-        start_x = end_x = events["location_x"]
-        start_y = end_y = events["location_y"]
-    elif events["type_primary"] in ["pass", "clearance", "throw_in", "interception",
-                                    "goal_kick", "free_kick", "corner",
-                                    "fairplay"]:
-        start_x = events["location_x"]
-        start_y = events["location_y"]
-        end_x = events["pass_end_location_x"]
-        end_y = events["pass_end_location_y"]
-    elif events["type_primary"] in ["touch", "duel", "acceleration", "goalkeeper_exit"]:
-        if events["type_carry"] == 1:
-            start_x = events["location_x"]
-            start_y = events["location_y"]
-            end_x = events["carry_end_location_x"]
-            end_y = events["carry_end_location_y"]
-        else:
-            start_x = events["location_x"]
-            start_y = events["location_y"]
-            end_x = None
-            end_y = None
-    else:
-        start_x = events["location_x"]
-        start_y = events["location_y"]
-        end_x = None
-        end_y = None
-    return pd.Series([events['id'], start_x, start_y, end_x, end_y])
+def create_spadl_actions(df_actions: pd.DataFrame) -> pd.DataFrame:
+    """Select the SPADL attributes of the actions.
+    The action types, results and body parts are encoded by their SPADL id.
+    Events that do not correspond to a SPADL action or that do not have a
+    location are removed.
+    Parameters
+    ----------
+    df_actions : pd.DataFrame
+        Wyscout action dataframe
+    Returns
+    -------
+    pd.DataFrame
+        SPADL action dataframe
+    """
+    type_name = df_actions["type_primary"].replace(_spadl_type_names).values
+    type_name[(type_name == "touch") & (df_actions["result"].values == 0)] = "bad_touch"
+    type_id = pd.Index(spadlconfig.actiontypes).get_indexer(type_name)
+    period_id = df_actions["match_period"].map(_period_ids).values
+    # the minutes are counted from the start of the game
+    time_seconds = (
+        df_actions["minute"].values * 60
+        + df_actions["second"].values
+        - np.take(_period_start, period_id - 1)
+    )
+    spadl_actions = pd.DataFrame(
+        {
+            "game_id": df_actions["match_id"].values,
+            "original_event_id": df_actions["original_event_id"].values,
+            "period_id": period_id,
+            "time_seconds": time_seconds.astype(float),
+            "team_id": df_actions["team_id"].values,
+            "player_id": df_actions["player_id"].values,
+            "start_x": df_actions["start_x"].values,
+            "start_y": df_actions["start_y"].values,
+            # actions without an end location end where they start
+            "end_x": df_actions["end_x"].fillna(df_actions["start_x"]).values,
+            "end_y": df_actions["end_y"].fillna(df_actions["start_y"]).values,
+            "type_id": type_id,
+            "result_id": df_actions["result"].values,
+            "bodypart_id": pd.Index(spadlconfig.bodyparts).get_indexer(df_actions["bodypart"]),
+        }
+    )
+    # remove all non-actions and the actions without a location
+    spadl_actions = spadl_actions[
+        (type_id >= 0)
+        & (type_id != spadlconfig.actiontypes.index("non_action"))
+        & spadl_actions["start_x"].notna().values
+    ]
+    return spadl_actions.reset_index(drop=True)
+
+
+# Wyscout types that are named differently in SPADL. All other types that are
+# not a SPADL action type are removed, except for failed touches.
+_spadl_type_names = {
+    "free_kick_crossed": "freekick_crossed",
+    "free_kick_pass": "freekick_short",
+    "free_kick_shot": "shot_freekick",
+    "goal_kick": "goalkick",
+    "carry": "dribble",
+    "acceleration": "dribble",
+}
+_period_ids = {"1H": 1, "2H": 2, "E1": 3, "E2": 4, "P": 5}
+_period_start = np.array([0, 45, 90, 105, 120]) * 60
 
 
 def make_new_positions(events: pd.DataFrame) -> pd.DataFrame:
@@ -114,19 +144,55 @@ def make_new_positions(events: pd.DataFrame) -> pd.DataFrame:
     pd.DataFrame
         Wyscout event dataframe with start and end coordinates for each action.
     """
-    new_positions = events.apply(
-        lambda x: _make_position_vars(x), axis=1
+    type_primary = events["type_primary"]
+    blocked = events["pass_height"].eq("blocked").values
+    passlike = type_primary.isin(
+        [
+            "pass",
+            "clearance",
+            "throw_in",
+            "interception",
+            "goal_kick",
+            "free_kick",
+            "corner",
+            "fairplay",
+        ]
+    ).values
+    carry = type_primary.isin(["touch", "duel", "acceleration", "goalkeeper_exit"]).values & (
+        events["type_carry"].values == 1
     )
-    new_positions.columns = ["id", "start_x", "start_y", "end_x", "end_y"]
-    events = pd.merge(events, new_positions, left_on="id", right_on="id")
-    events[["start_x", "end_x"]] = events[["start_x", "end_x"]]
-    events[["start_y", "end_y"]] = events[["start_y", "end_y"]]
-    # events = events.drop("positions", axis=1)
-    return events
+
+    def values(col: str) -> np.ndarray:
+        return events[col].values.astype(object)
+
+    coords = {
+        "start_x": values("location_x"),
+        "start_y": values("location_y"),
+        "end_x": np.select(
+            [blocked, passlike, carry],
+            [values("location_x"), values("pass_end_location_x"), values("carry_end_location_x")],
+            None,
+        ),
+        "end_y": np.select(
+            [blocked, passlike, carry],
+            [values("location_y"), values("pass_end_location_y"), values("carry_end_location_y")],
+            None,
+        ),
+    }
+    events = events.reset_index(drop=True)
+    return pd.concat([events, _coordinate_columns(coords, events.index)], axis=1)
 
 
 def fix_wyscout_events(df_events: pd.DataFrame) -> pd.DataFrame:
     """Perform some fixes on the Wyscout events such that the spadl action dataframe can be built.
+
+    The fixes of :func:`create_shot_coordinates`, :func:`add_expected_assists`,
+    :func:`convert_duels`, :func:`insert_interception_coordinates`,
+    :func:`add_offside_variable`, :func:`convert_touches`,
+    :func:`convert_accelerations`, :func:`insert_fairplay_coordinates` and
+    :func:`insert_coordinates_edge_cases` are applied in a single pass over the
+    columns of the events.
+
     Parameters
     ----------
     df_events : pd.DataFrame
@@ -136,20 +202,188 @@ def fix_wyscout_events(df_events: pd.DataFrame) -> pd.DataFrame:
     pd.DataFrame
         Wyscout event dataframe with an extra column 'offside'
     """
-    df_events = create_shot_coordinates(df_events)
-    df_events = add_expected_assists(df_events)
-    df_events = convert_duels(df_events)
-    # df_events = convert_duels_success(df_events)
-    df_events = insert_interception_coordinates(df_events)
-    df_events = add_offside_variable(df_events)
-    df_events = convert_touches(df_events)
-    df_events = convert_accelerations(df_events)
-    df_events = insert_fairplay_coordinates(df_events)
-    df_events = insert_coordinates_edge_cases(df_events)
-    # df_events = convert_simulations(df_events)
-    return df_events
+    events = df_events
+    type_primary = events["type_primary"].values.astype(object)
+    team_id = events["team_id"].values
+    location_x = events["location_x"].values.astype(float)
+    location_y = events["location_y"].values.astype(float)
+    start_x = events["start_x"].values.astype(float)
+    start_y = events["start_y"].values.astype(float)
+    end_x = events["end_x"].values.astype(float)
+    end_y = events["end_y"].values.astype(float)
+    carry = events["type_carry"].values == 1
+
+    # create_shot_coordinates
+    goal_zone = events["shot_goal_zone"]
+    zones = pd.Index(list(_shot_end_locations)).get_indexer(goal_zone)
+    on_goal = zones >= 0
+    shot_end = np.array(list(_shot_end_locations.values()))[zones[on_goal]]
+    end_x[on_goal] = shot_end[:, 0]
+    end_y[on_goal] = shot_end[:, 1]
+    blocked = goal_zone.eq("bc").values
+    end_x[blocked] = start_x[blocked]
+    end_y[blocked] = start_y[blocked]
+
+    # add_expected_assists
+    metric_xa = _column(events, "metric_xa", np.nan).astype(float)
+    shot_assist = events["type_shot_assist"].values == 1
+    metric_xa[shot_assist] = _shift(events["shot_xg"].values, -1)[shot_assist]
+
+    # convert_duels
+    duel = type_primary == "duel"
+    duel_won = (
+        (events["ground_duel_kept_possession"].values == 1)
+        | (events["ground_duel_recovered_possession"].values == 1)
+        | (events["aerial_duel_first_touch"].values == 1)
+        | (events["ground_duel_progressed_with_ball"].values == 1)
+        | (events["ground_duel_stopped_progress"].values == 1)
+    )
+    duel_success = _column(events, "duel_success", np.nan)
+    duel_failure = _column(events, "duel_failure", np.nan)
+    duel_success[duel] = duel_won[duel].astype(object)
+    duel_failure[duel] = (~duel_won[duel]).astype(object)
+    dribble = duel & events["ground_duel_duel_type"].eq("dribble").values
+    type_primary[dribble] = "dribble"
+    type_primary[dribble & (events["ground_duel_take_on"].values == 1)] = "take_on"
+    # the end of a duel is the start of the next action, or of the action
+    # after that if the next action is the related duel of the opponent
+    next_id = _shift(events["id"].values, -1)
+    related_duel_next = (events["ground_duel_related_duel_id"].values == next_id) | (
+        events["aerial_duel_related_duel_id"].values == next_id
+    )
+    duel_end = duel & ~carry
+    for end, location in [(end_x, location_x), (end_y, location_y)]:
+        end[duel_end] = np.where(
+            related_duel_next,
+            _relative(_shift(location, -2), team_id == _shift(team_id, -2)),
+            _relative(_shift(location, -1), team_id == _shift(team_id, -1)),
+        )[duel_end]
+
+    # insert_interception_coordinates
+    interception = type_primary == "interception"
+    same_team_next = team_id == _shift(team_id, -1)
+    end_x[interception] = _relative(_shift(start_x, -1), same_team_next)[interception]
+    end_y[interception] = _relative(_shift(start_y, -1), same_team_next)[interception]
+
+    # add_offside_variable
+    offside = ((type_primary == "pass") & (_shift(type_primary, -1) == "offside")).astype(int)
+
+    # the next events of the remaining fixes are the next events after
+    # removing the offside events
+    keep = type_primary != "offside"
+    events = events.take(np.flatnonzero(keep))
+    events.index = pd.RangeIndex(len(events))
+    type_primary = type_primary[keep]
+    team_id = team_id[keep]
+    location_x, location_y = location_x[keep], location_y[keep]
+    start_x, start_y = start_x[keep], start_y[keep]
+    end_x, end_y = end_x[keep], end_y[keep]
+    carry = carry[keep]
+    next_type = _shift(type_primary, -1)
+    next_location_x = _shift(location_x, -1)
+    next_location_y = _shift(location_y, -1)
+    same_team_next = team_id == _shift(team_id, -1)
+
+    # convert_touches and convert_accelerations
+    flags = {}
+    for event_type, success_types, fail_types in [
+        ("touch", _touch_success_types, _touch_fail_types),
+        ("acceleration", _acceleration_success_types, _acceleration_fail_types),
+    ]:
+        selected = type_primary == event_type
+        next_success = _isin(next_type, success_types)
+        next_fail = _isin(next_type, fail_types)
+        # a touch or an acceleration is successful if the same team keeps
+        # the ball, or if the opponent loses it
+        decided = selected & ((next_type == "duel") | next_success | next_fail)
+        successful = (next_type == "duel") | np.where(same_team_next, next_success, next_fail)
+        success = _column(events, f"{event_type}_success", np.nan)
+        fail = _column(events, f"{event_type}_fail", np.nan)
+        success[decided] = successful[decided].astype(object)
+        fail[decided] = (~successful[decided]).astype(object)
+        flags[f"{event_type}_success"] = success
+        flags[f"{event_type}_fail"] = fail
+        moved = selected & ~carry
+        end_x[moved] = _relative(next_location_x, same_team_next)[moved]
+        end_y[moved] = _relative(next_location_y, same_team_next)[moved]
+
+    # insert_fairplay_coordinates
+    interruption = (type_primary == "game_interruption") & (next_type == "fairplay")
+    same_team_prev = team_id == _shift(team_id, 1)
+    restart_x = _relative(_shift(start_x, 1), same_team_prev)[interruption]
+    restart_y = _relative(_shift(start_y, 1), same_team_prev)[interruption]
+    start_x[interruption] = end_x[interruption] = restart_x
+    start_y[interruption] = end_y[interruption] = restart_y
+    before_interruption = (next_type == "game_interruption") & (
+        _shift(type_primary, -2) == "fairplay"
+    )
+    end_x[before_interruption] = start_x[before_interruption]
+    end_y[before_interruption] = start_y[before_interruption]
+
+    # insert_coordinates_edge_cases
+    open_ended = _isin(type_primary, _open_ended_types) & np.isnan(end_x)
+    end_x[open_ended] = start_x[open_ended]
+    end_y[open_ended] = start_y[open_ended]
+
+    columns = {
+        "type_primary": type_primary,
+        "start_x": start_x,
+        "start_y": start_y,
+        "end_x": end_x,
+        "end_y": end_y,
+        "metric_xa": metric_xa[keep],
+        "duel_success": duel_success[keep],
+        "duel_failure": duel_failure[keep],
+        "offside": offside[keep],
+        **flags,
+    }
+    for col, values in columns.items():
+        events[col] = values
+    return events
 
 
+# estimated end coordinates of the shots in each goal zone
+_shot_end_locations = {
+    **dict.fromkeys(["gt", "gc", "gb"], (100.0, 50.0)),
+    **dict.fromkeys(["gtr", "gr", "gbr"], (100.0, 55.0)),
+    **dict.fromkeys(["gtl", "gl", "glb"], (100.0, 45.0)),
+    **dict.fromkeys(["ot", "pt"], (100.0, 50.0)),
+    **dict.fromkeys(["otr", "or", "obr"], (100.0, 60.0)),
+    **dict.fromkeys(["otl", "ol", "olb"], (100.0, 40.0)),
+    **dict.fromkeys(["ptl", "pl", "plb"], (100.0, 55.38)),
+    **dict.fromkeys(["ptr", "pr", "pbr"], (100.0, 44.62)),
+}
+_touch_success_types = ["pass", "shot", "acceleration", "clearance", "touch", "interception"]
+_touch_fail_types = ["game_interruption", "infraction", "offside", "shot_against"]
+_acceleration_success_types = ["pass", "shot", "acceleration", "clearance", "interception"]
+_acceleration_fail_types = ["game_interruption", "infraction", "offside", "shot_against"]
+_open_ended_types = ["pass", "carry", "cross", "acceleration", "dribble", "take_on"]
+
+
+def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+    """Shift an array like ``pd.Series.shift``, with NaN for the missing values."""
+    shifted = np.full(len(values), np.nan, dtype=float if values.dtype.kind in "biuf" else object)
+    if periods > 0:
+        shifted[periods:] = values[:-periods]
+    else:
+        shifted[:periods] = values[-periods:]
+    return shifted
+
+
+def _isin(values: np.ndarray, types: List[str]) -> np.ndarray:
+    return pd.Series(values).isin(types).values
+
+
+def _relative(coordinates: np.ndarray, same_team: np.ndarray) -> np.ndarray:
+    """Mirror the coordinates of the actions of the opponent."""
+    return np.where(same_team, coordinates, 100 - coordinates)
+
+
+def _column(events: pd.DataFrame, col: str, default: Any) -> np.ndarray:
+    """Return a writable object array with the values of a column, if it exists."""
+    if col in events:
+        return events[col].values.astype(object)
+    return np.full(len(events), default, dtype=object)
 
 
 def create_shot_coordinates(df_events: pd.DataFrame) -> pd.DataFrame:
@@ -679,8 +913,8 @@ def convert_accelerations(df_events: pd.DataFrame) -> pd.DataFrame:
     # next action type
     selector_next_action = df_events1["type_primary"].isin(["pass", "shot", "acceleration",
                                                             "clearance", "acceleration", "interception"])
-    selector_next_action2 = df_events1["type_primary"].isin(["game_interruption", "infraction"
-                                                                                  "offside", "shot_against"])
+    selector_next_action2 = df_events1["type_primary"].isin(["game_interruption", "infraction",
+                                                             "offside", "shot_against"])
     selector_next_duel = df_events1["type_primary"] == "duel"
 
     # same player/team
@@ -737,9 +971,10 @@ def create_df_actions(df_events: pd.DataFrame) -> pd.DataFrame:
     # df_events["time_seconds"] = df_events["milliseconds"] / 1000
     df_actions = df_events
     df_actions["original_event_id"] = df_events["id"].astype(object)
-    df_actions["bodypart"] = df_events.apply(determine_bodypart_id, axis=1)
-    df_actions["type_primary"] = df_events.apply(determine_type_id, axis=1)
-    df_actions["result"] = df_events.apply(determine_result_id, axis=1)
+    df_actions["bodypart"] = _determine_bodyparts(df_events)
+    df_actions["type_primary"] = _determine_types(df_events)
+    # the result depends on the converted type_primary
+    df_actions["result"] = _determine_results(df_events)
 
     # df_actions = remove_non_actions(df_actions)  # remove all non-actions left
 
@@ -748,6 +983,11 @@ def create_df_actions(df_events: pd.DataFrame) -> pd.DataFrame:
 
 def determine_bodypart_id(event: pd.DataFrame) -> int:
     """Determint eht body part for each action.
+
+    .. deprecated:: 1.3.0
+           The bodypart ids of all events are determined at once by
+           :func:`create_df_actions`.
+
     Parameters
     ----------
     event : pd.Series
@@ -757,6 +997,9 @@ def determine_bodypart_id(event: pd.DataFrame) -> int:
     int
         id of the body part used for the action
     """
+    warnings.warn(
+        'determine_bodypart_id is deprecated, use create_df_actions instead', DeprecationWarning
+    )
     if event["type_save"] == 1 or event["type_primary"] == "throw_in" or event["type_hand_pass"] == 1 \
             or event["infraction_type"] == "hand_foul":
         body_part = "other"
@@ -771,6 +1014,11 @@ def determine_bodypart_id(event: pd.DataFrame) -> int:
 
 def determine_type_id(event: pd.DataFrame) -> int:  # noqa: C901
     """Determine the type of each action.
+
+    .. deprecated:: 1.3.0
+           The type ids of all events are determined at once by
+           :func:`create_df_actions`.
+
     This function transforms the Wyscout events, sub_events and tags
     into the corresponding SciSports action type
     Parameters
@@ -782,6 +1030,9 @@ def determine_type_id(event: pd.DataFrame) -> int:  # noqa: C901
     int
         id of the action type
     """
+    warnings.warn(
+        'determine_type_id is deprecated, use create_df_actions instead', DeprecationWarning
+    )
     # if event["own_goal"]:
     #     action_type = "bad_touch"
     if event["type_primary"] == "pass":
@@ -835,6 +1086,11 @@ def determine_type_id(event: pd.DataFrame) -> int:  # noqa: C901
 
 def determine_result_id(event: pd.DataFrame) -> int:  # noqa: C901
     """Determine the result of each event.
+
+    .. deprecated:: 1.3.0
+           The result ids of all events are determined at once by
+           :func:`create_df_actions`.
+
     Parameters
     ----------
     event : pd.Series
@@ -844,6 +1100,9 @@ def determine_result_id(event: pd.DataFrame) -> int:  # noqa: C901
     int
         result of the action
     """
+    warnings.warn(
+        'determine_result_id is deprecated, use create_df_actions instead', DeprecationWarning
+    )
     if event["offside"] == 1:
         return 2
     if event["type_primary"] == "foul":  # foul
@@ -881,6 +1140,88 @@ def determine_result_id(event: pd.DataFrame) -> int:  # noqa: C901
     return 1
 
 
+# The functions below implement the rules of the deprecated determine_bodypart_id,
+# determine_type_id and determine_result_id as ordered decision tables over all
+# events at once. The first rule that matches an event determines its value.
+
+
+def _determine_bodyparts(df_events: pd.DataFrame) -> np.ndarray:
+    type_primary = df_events["type_primary"].values
+    rules = [
+        (
+            (df_events["type_save"].values == 1)
+            | (type_primary == "throw_in")
+            | (df_events["type_hand_pass"].values == 1)
+            | df_events["infraction_type"].eq("hand_foul").values,
+            "other",
+        ),
+        (
+            (df_events["type_head_pass"].values == 1)
+            | _truthy(df_events["type_head_shot"])
+            | (df_events["type_aerial_duel"].values == 1),
+            "head",
+        ),
+    ]
+    return np.select([cond for cond, _ in rules], [b for _, b in rules], "foot").astype(object)
+
+
+def _determine_types(df_events: pd.DataFrame) -> np.ndarray:
+    type_primary = df_events["type_primary"].values
+    rules = [
+        ((type_primary == "pass") & (df_events["type_cross"].values == 1), "cross"),
+        (type_primary == "pass", "pass"),
+        (type_primary == "throw_in", "throw_in"),
+        ((type_primary == "corner") & (df_events["pass_length"].values > 25), "corner_crossed"),
+        (type_primary == "corner", "corner_short"),
+        (
+            (type_primary == "free_kick") & (df_events["type_free_kick_cross"].values == 1),
+            "free_kick_crossed",
+        ),
+        (
+            (type_primary == "free_kick") & (df_events["type_free_kick_shot"].values == 1),
+            "free_kick_shot",
+        ),
+        (type_primary == "free_kick", "free_kick_pass"),
+        (
+            (type_primary == "infraction")
+            & df_events["infraction_type"].isin(["hand_foul", "regular_foul"]).values,
+            "foul",
+        ),
+        (type_primary == "penalty", "shot_penalty"),
+        (df_events["type_save"].values == 1, "keeper_save"),
+        ((type_primary == "touch") & (df_events["type_carry"].values == 1), "carry"),
+        (type_primary == "interception", "interception"),
+    ]
+    # all other events keep their primary type
+    return np.select(
+        [cond for cond, _ in rules], [t for _, t in rules], type_primary.astype(object)
+    )
+
+
+def _determine_results(df_events: pd.DataFrame) -> np.ndarray:
+    type_primary = df_events["type_primary"].values
+    is_pass = np.isin(
+        type_primary,
+        ["pass", "throw_in", "goal_kick", "free_kick_pass", "free_kick_crossed", "corner"],
+    )
+    rules = [
+        (df_events["offside"].values == 1, 2),
+        (type_primary == "foul", 1),
+        (df_events["touch_success"].values == True, 1),  # noqa: E712
+        (df_events["touch_fail"].values == True, 0),  # noqa: E712
+        (df_events["acceleration_success"].values == True, 1),  # noqa: E712
+        (df_events["acceleration_fail"].values == True, 0),  # noqa: E712
+        (df_events["shot_is_goal"].values == 1, 1),
+        (df_events["duel_success"].values == True, 1),  # noqa: E712
+        (df_events["duel_failure"].values == True, 0),  # noqa: E712
+        (np.isin(type_primary, ["shot", "free_kick_shot", "shot_penalty"]), 0),
+        (is_pass & (df_events["pass_accurate"].values == 1), 1),
+        (is_pass & (df_events["pass_accurate"].values == 0), 0),
+    ]
+    # all other actions, such as interceptions, clearances and keeper saves, are successful
+    return np.select([cond for cond, _ in rules], [r for _, r in rules], 1)
+
+
 # def remove_non_actions(df_actions: pd.DataFrame) -> pd.DataFrame:
 #     """Remove the remaining non_actions from the action dataframe.
 #     Parameters
@@ -6,32 +6,33 @@ xfns_default : list(callable)
     The default VAEP features.
 
 """
+import importlib
+import json
 import math
-from typing import Any, Dict, List, Optional, Tuple
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type, Union
 
 import numpy as np
 import pandas as pd
+from numpy.typing import ArrayLike
 from sklearn.exceptions import NotFittedError
 from sklearn.metrics import brier_score_loss, roc_auc_score
+from sklearn.model_selection import GroupKFold
 
+import socceraction
 import socceraction.spadl as spadlcfg
+from socceraction.dtypes import cast_features
 
 from . import features as fs
 from . import formula as vaep
 from . import labels as lab
 
-try:
-    import xgboost
-except ImportError:
-    xgboost = None  # type: ignore
-try:
+if TYPE_CHECKING:
     import catboost
-except ImportError:
-    catboost = None  # type: ignore
-try:
     import lightgbm
-except ImportError:
-    lightgbm = None  # type: ignore
+    import xgboost
 
 
 xfns_default = [
@@ -93,8 +94,18 @@ class VAEP:
         self.xfns = xfns_default if xfns is None else xfns
         self.yfns = [self._lab.scores, self._lab.concedes]
         self.nb_prev_actions = nb_prev_actions
+        self._pruned_xfns: Dict[fs.FeatureTransfomer, List[str]] = {}
+        self.__model_files: Dict[str, str] = {}
+        self.__learner: Optional[str] = None
 
-    def compute_features(self, game: pd.Series, game_actions: fs.Actions) -> pd.DataFrame:
+    def compute_features(
+        self,
+        game: pd.Series,
+        game_actions: fs.Actions,
+        mask: Optional[ArrayLike] = None,
+        prune: bool = False,
+        action_ids: Optional[ArrayLike] = None,
+    ) -> pd.DataFrame:
         """
         Transform actions to the feature-based representation of game states.
 
@@ -104,16 +115,70 @@ class VAEP:
             The SPADL representation of a single game.
         game_actions : pd.DataFrame
             The actions performed during `game` in the SPADL representation.
+        mask : array-like of bool, optional
+            Selects the actions for which the game state is computed. Only the
+            selected actions and their <nb_prev_actions> predecessors are
+            featurised. If None, the game state of each action is computed.
+        prune : bool, default=False
+            Skip the feature transformers that are not used by the fitted
+            models (see :meth:`prune_features`). Their columns are filled with
+            zeros.
+        action_ids : array-like, optional
+            Selects the actions with these ids, as an alternative to `mask`.
+
+        Raises
+        ------
+        ValueError
+            If both `mask` and `action_ids` are given, or if an action id is
+            not in the game.
 
         Returns
         -------
         features : pd.DataFrame
-            Returns the feature-based representation of each game state in the game.
+            Returns the feature-based representation of each (selected) game
+            state in the game.
         """
+        mask = _selection_mask(game_actions, mask, action_ids)
+        xfns = self._active_xfns(prune)
         game_actions_with_names = self._spadlcfg.add_names(game_actions)  # type: ignore
-        gamestates = self._fs.gamestates(game_actions_with_names, self.nb_prev_actions)
+        if mask is None:
+            gamestates = self._fs.gamestates(game_actions_with_names, self.nb_prev_actions)
+            gamestates = self._fs.play_left_to_right(gamestates, game.home_team_id)
+            features = _concat_features([cast_features(fn(gamestates)) for fn in xfns], gamestates)
+            return self._add_pruned_columns(features, prune)
+
+        idx = np.flatnonzero(np.asarray(mask, dtype=bool))
+        gamestates = self._fs.gamestates(game_actions_with_names, self.nb_prev_actions, idx)
+        gamestates = [actions.reset_index(drop=True) for actions in gamestates]
         gamestates = self._fs.play_left_to_right(gamestates, game.home_team_id)
-        return pd.concat([fn(gamestates) for fn in self.xfns], axis=1)
+        # features that depend on all preceding actions are computed on the
+        # full game and filtered afterwards
+        history = [game_actions_with_names]
+        if any(getattr(fn, 'requires_game_history', False) for fn in xfns):
+            history = self._fs.play_left_to_right(history, game.home_team_id)
+        features = _concat_features(
+            [
+                cast_features(fn(history).iloc[idx].reset_index(drop=True))
+                if getattr(fn, 'requires_game_history', False)
+                else cast_features(fn(gamestates))
+                for fn in xfns
+            ],
+            gamestates,
+        )
+        features.index = game_actions_with_names.index[idx]
+        return self._add_pruned_columns(features, prune)
+
+    def _active_xfns(self, prune: bool) -> List[fs.FeatureTransfomer]:
+        if not prune:
+            return self.xfns
+        return [fn for fn in self.xfns if fn not in self._pruned_xfns]
+
+    def _add_pruned_columns(self, features: pd.DataFrame, prune: bool) -> pd.DataFrame:
+        if not prune or not self._pruned_xfns:
+            return features
+        cols = [c for fn_cols in self._pruned_xfns.values() for c in fn_cols]
+        placeholders = pd.DataFrame(0, index=features.index, columns=cols, dtype=np.int8)
+        return pd.concat([features, placeholders], axis=1)
 
     def compute_labels(
         self, game: pd.Series, game_actions: fs.Actions  # pylint: disable=W0613
@@ -134,7 +199,66 @@ class VAEP:
             Returns the labels of each game state in the game.
         """
         game_actions_with_names = self._spadlcfg.add_names(game_actions)  # type: ignore
-        return pd.concat([fn(game_actions_with_names) for fn in self.yfns], axis=1)
+        labels = [cast_features(fn(game_actions_with_names)) for fn in self.yfns]
+        return pd.concat(labels, axis=1)
+
+    def compute_features_many(
+        self, games: pd.DataFrame, actions: fs.Actions, prune: bool = False
+    ) -> pd.DataFrame:
+        """
+        Transform the actions of multiple games to the feature-based representation of game states.
+
+        The features of all games are computed in a single pass over the
+        concatenated actions. Game states never include actions of another game.
+
+        Parameters
+        ----------
+        games : pd.DataFrame
+            The SPADL representation of the games, with a 'game_id' and
+            'home_team_id' column.
+        actions : pd.DataFrame
+            The actions performed during `games` in the SPADL representation.
+            The actions of each game should be contiguous.
+        prune : bool, default=False
+            Skip the feature transformers that are not used by the fitted
+            models (see :meth:`prune_features`). Their columns are filled with
+            zeros.
+
+        Returns
+        -------
+        features : pd.DataFrame
+            Returns the feature-based representation of each game state.
+        """
+        actions_with_names = self._spadlcfg.add_names(actions)  # type: ignore
+        home_team_ids = actions_with_names.game_id.map(games.set_index('game_id').home_team_id)
+        gamestates = self._fs.gamestates(actions_with_names, self.nb_prev_actions)
+        gamestates = self._fs.play_left_to_right(gamestates, home_team_ids.values)
+        features = _concat_features(
+            [cast_features(fn(gamestates)) for fn in self._active_xfns(prune)], gamestates
+        )
+        return self._add_pruned_columns(features, prune)
+
+    def compute_labels_many(
+        self, games: pd.DataFrame, actions: fs.Actions  # pylint: disable=W0613
+    ) -> pd.DataFrame:
+        """
+        Compute the labels for each game state in the given games.
+
+        Parameters
+        ----------
+        games : pd.DataFrame
+            The SPADL representation of the games.
+        actions : pd.DataFrame
+            The actions performed during `games` in the SPADL representation.
+            The actions of each game should be contiguous.
+
+        Returns
+        -------
+        labels : pd.DataFrame
+            Returns the labels of each game state.
+        """
+        actions_with_names = self._spadlcfg.add_names(actions)  # type: ignore
+        return pd.concat([cast_features(fn(actions_with_names)) for fn in self.yfns], axis=1)
 
     def fit(
         self,
@@ -194,24 +318,67 @@ class VAEP:
         X_val, y_val = X.iloc[val_idx][cols], y.iloc[val_idx]
 
         # train classifiers F(X) = Y
+        self._pruned_xfns = {}
+        self.__model_files = {}
         for col in list(y.columns):
             eval_set = [(X_val, y_val[col])] if val_size > 0 else None
-            if learner == 'xgboost':
-                self.__models[col] = self._fit_xgboost(
-                    X_train, y_train[col], eval_set, tree_params, fit_params
-                )
-            elif learner == 'catboost':
-                self.__models[col] = self._fit_catboost(
-                    X_train, y_train[col], eval_set, tree_params, fit_params
-                )
-            elif learner == 'lightgbm':
-                self.__models[col] = self._fit_lightgbm(
-                    X_train, y_train[col], eval_set, tree_params, fit_params
-                )
-            else:
-                raise ValueError(f'A {learner} learner is not supported')
+            self.__models[col] = self._fit_learner(
+                learner, X_train, y_train[col], eval_set, tree_params, fit_params
+            )
+        self.__learner = learner
+        return self
+
+    def prune_features(self) -> 'VAEP':
+        """Skip the feature transformers that are not used by the fitted models.
+
+        Tree ensembles typically split on a fraction of the features. This
+        records the transformers of which none of the generated features is
+        used by any of the fitted models. These transformers are no longer
+        computed when rating actions; their features are replaced by zeros.
+        Fitting the model again resets the pruning.
+
+        Raises
+        ------
+        NotFittedError
+            If the model is not fitted yet.
+
+        Returns
+        -------
+        self
+            The VAEP model.
+        """
+        self._check_is_fitted()
+
+        cols = self._fs.feature_column_names(self.xfns, self.nb_prev_actions)
+        used_cols = set()
+        for model in self.__models.values():
+            importances = np.asarray(model.feature_importances_)
+            used_cols.update(c for c, imp in zip(cols, importances) if imp > 0)
+
+        self._pruned_xfns = {}
+        for fn in self.xfns:
+            fn_cols = self._fs.feature_column_names([fn], self.nb_prev_actions)
+            if used_cols.isdisjoint(fn_cols):
+                self._pruned_xfns[fn] = fn_cols
         return self
 
+    def _fit_learner(
+        self,
+        learner: str,
+        X: pd.DataFrame,
+        y: pd.Series,
+        eval_set: Optional[List[Tuple[pd.DataFrame, pd.Series]]] = None,
+        tree_params: Optional[Dict[str, Any]] = None,
+        fit_params: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        if learner == 'xgboost':
+            return self._fit_xgboost(X, y, eval_set, tree_params, fit_params)
+        if learner == 'catboost':
+            return self._fit_catboost(X, y, eval_set, tree_params, fit_params)
+        if learner == 'lightgbm':
+            return self._fit_lightgbm(X, y, eval_set, tree_params, fit_params)
+        raise ValueError(f'A {learner} learner is not supported')
+
     def _fit_xgboost(
         self,
         X: pd.DataFrame,
@@ -220,8 +387,7 @@ class VAEP:
         tree_params: Optional[Dict[str, Any]] = None,
         fit_params: Optional[Dict[str, Any]] = None,
     ) -> 'xgboost.XGBClassifier':
-        if xgboost is None:
-            raise ImportError('xgboost is not installed.')
+        xgboost = _import_learner('xgboost')
         # Default settings
         if tree_params is None:
             tree_params = dict(n_estimators=100, max_depth=3)
@@ -242,8 +408,7 @@ class VAEP:
         tree_params: Optional[Dict[str, Any]] = None,
         fit_params: Optional[Dict[str, Any]] = None,
     ) -> 'catboost.CatBoostClassifier':
-        if catboost is None:
-            raise ImportError('catboost is not installed.')
+        catboost = _import_learner('catboost')
         # Default settings
         if tree_params is None:
             tree_params = dict(eval_metric='BrierScore', loss_function='Logloss', iterations=100)
@@ -268,8 +433,7 @@ class VAEP:
         tree_params: Optional[Dict[str, Any]] = None,
         fit_params: Optional[Dict[str, Any]] = None,
     ) -> 'lightgbm.LGBMClassifier':
-        if lightgbm is None:
-            raise ImportError('lightgbm is not installed.')
+        lightgbm = _import_learner('lightgbm')
         if tree_params is None:
             tree_params = dict(n_estimators=100, max_depth=3)
         if fit_params is None:
@@ -288,13 +452,19 @@ class VAEP:
             missing_cols = ' and '.join(set(cols).difference(X.columns))
             raise ValueError(f'{missing_cols} are not available in the features dataframe')
 
+        X = X[cols]
         Y_hat = pd.DataFrame()
         for col in self.__models:
-            Y_hat[col] = [p[1] for p in self.__models[col].predict_proba(X[cols])]
+            Y_hat[col] = self.__models[col].predict_proba(X)[:, 1]
         return Y_hat
 
     def rate(
-        self, game: pd.Series, game_actions: fs.Actions, game_states: Optional[fs.Features] = None
+        self,
+        game: pd.Series,
+        game_actions: fs.Actions,
+        game_states: Optional[fs.Features] = None,
+        mask: Optional[ArrayLike] = None,
+        action_ids: Optional[ArrayLike] = None,
     ) -> pd.DataFrame:
         """
         Compute the VAEP rating for the given game states.
@@ -308,6 +478,91 @@ class VAEP:
         game_states : pd.DataFrame, default=None
             DataFrame with the game state representation of each action. If
             `None`, these will be computed on-th-fly.
+        mask : array-like of bool, optional
+            Selects the actions that should be rated. Only the game states of
+            the selected actions and the actions preceding them are computed,
+            passed to the models and valued. If None, all actions are rated.
+        action_ids : array-like, optional
+            Selects the actions with these ids, as an alternative to `mask`.
+
+        Raises
+        ------
+        NotFittedError
+            If the model is not fitted yet.
+        ValueError
+            If both `mask` and `action_ids` are given, or if an action id is
+            not in the game.
+
+        Returns
+        -------
+        ratings : pd.DataFrame
+            Returns the VAEP rating for each given (selected) action, as well
+            as the offensive and defensive value of each action.
+        """
+        self._check_is_fitted()
+        mask = _selection_mask(game_actions, mask, action_ids)
+
+        if mask is None:
+            game_actions_with_names = self._spadlcfg.add_names(game_actions)  # type: ignore
+            if game_states is None:
+                game_states = self.compute_features(game, game_actions, prune=True)
+
+            y_hat = self._estimate_probabilities(game_states)
+            p_scores, p_concedes = y_hat.scores, y_hat.concedes
+            vaep_values = self._vaep.value(game_actions_with_names, p_scores, p_concedes)
+            return vaep_values
+
+        if not mask.any():
+            return pd.DataFrame(
+                columns=['offensive_value', 'defensive_value', 'vaep_value'],
+                index=game_actions.index[:0],
+                dtype=float,
+            )
+
+        # the value of an action depends on its own game state and the
+        # game state of the previous action
+        needed = mask.copy()
+        needed[np.maximum(np.flatnonzero(mask) - 1, 0)] = True
+        needed_idx = np.flatnonzero(needed)
+        if game_states is None:
+            game_states = self.compute_features(game, game_actions, needed, prune=True)
+        else:
+            game_states = game_states.iloc[needed_idx]
+
+        y_hat = self._estimate_probabilities(game_states)
+        # The previous action of each selected action directly precedes it in
+        # the needed actions, such that these can be valued on their own.
+        needed_actions = self._spadlcfg.add_names(game_actions.iloc[needed_idx])  # type: ignore
+        vaep_values = self._vaep.value(
+            needed_actions,
+            pd.Series(y_hat.scores.values, index=needed_idx),
+            pd.Series(y_hat.concedes.values, index=needed_idx),
+        )
+        return vaep_values[mask[needed_idx]]
+
+    def rate_many(
+        self,
+        games: pd.DataFrame,
+        actions: fs.Actions,
+        game_states: Optional[fs.Features] = None,
+    ) -> pd.DataFrame:
+        """
+        Compute the VAEP rating for the actions of multiple games.
+
+        In contrast to calling :meth:`rate` for each game, the features of all
+        games are computed in one pass and each model is queried once.
+
+        Parameters
+        ----------
+        games : pd.DataFrame
+            The SPADL representation of the games, with a 'game_id' and
+            'home_team_id' column.
+        actions : pd.DataFrame
+            The actions performed during `games` in the SPADL representation.
+        game_states : pd.DataFrame, default=None
+            DataFrame with the game state representation of each action, in
+            the same order as `actions`. If `None`, these will be computed
+            on-th-fly.
 
         Raises
         ------
@@ -318,20 +573,155 @@ class VAEP:
         -------
         ratings : pd.DataFrame
             Returns the VAEP rating for each given action, as well as the
-            offensive and defensive value of each action.
+            offensive and defensive value of each action, indexed by
+            'game_id' and 'action_id'.
         """
-        if not self.__models:
-            raise NotFittedError()
+        self._check_is_fitted()
 
-        game_actions_with_names = self._spadlcfg.add_names(game_actions)  # type: ignore
+        # the actions of each game should be contiguous
+        order = np.argsort(actions.game_id.values, kind='stable')
+        actions = actions.iloc[order].reset_index(drop=True)
         if game_states is None:
-            game_states = self.compute_features(game, game_actions)
+            game_states = self.compute_features_many(games, actions, prune=True)
+        else:
+            game_states = game_states.iloc[order].reset_index(drop=True)
 
         y_hat = self._estimate_probabilities(game_states)
-        p_scores, p_concedes = y_hat.scores, y_hat.concedes
-        vaep_values = self._vaep.value(game_actions_with_names, p_scores, p_concedes)
+        vaep_values = self._vaep.value(actions, y_hat.scores, y_hat.concedes)
+        vaep_values.index = pd.MultiIndex.from_frame(actions[['game_id', 'action_id']])
         return vaep_values
 
+    def rate_counterfactuals(
+        self,
+        game: pd.Series,
+        game_actions: fs.Actions,
+        action_id: int,
+        variants: pd.DataFrame,
+    ) -> pd.DataFrame:
+        """
+        Compute the VAEP rating of alternatives for one action in a game.
+
+        Each row in `variants` replaces some attributes of the action, such as
+        its end location, body part or type. Changing an action changes the
+        game state of the action itself and of the next <nb_prev_actions> - 1
+        actions, which include it as a previous action. Only these game states
+        are computed for each variant, and all variants are passed to the
+        models at once.
+
+        Features that depend on all preceding actions of the game (such as
+        the 'goalscore' feature) are copied from the original game states.
+        Hence, a variant that turns the action into a goal does not change the
+        score in the game states of the next actions.
+
+        Parameters
+        ----------
+        game : pd.Series
+            The SPADL representation of a single game.
+        game_actions : pd.DataFrame
+            The actions performed during `game` in the SPADL representation.
+        action_id : int
+            The id of the action to change.
+        variants : pd.DataFrame
+            The alternatives for the action. Each column overwrites the
+            corresponding column of the action, e.g. 'end_x' and 'end_y'.
+
+        Raises
+        ------
+        NotFittedError
+            If the model is not fitted yet.
+        ValueError
+            If a column of `variants` is not a column of `game_actions` or if
+            no action has the given `action_id`.
+
+        Returns
+        -------
+        ratings : pd.DataFrame
+            The VAEP rating of the changed action and of the actions whose
+            game state or previous game state is affected, as well as their
+            offensive and defensive value, indexed by the index of `variants`
+            and the 'action_id' of the actions.
+        """
+        self._check_is_fitted()
+        unknown_cols = set(variants.columns) - set(game_actions.columns)
+        if unknown_cols:
+            raise ValueError(f'{", ".join(unknown_cols)} are not columns of the actions')
+
+        actions = game_actions.reset_index(drop=True)
+        n, nb_variants = len(actions), len(variants)
+        matches = np.flatnonzero(actions.action_id.values == action_id)
+        if len(matches) == 0:
+            raise ValueError(f'Unknown action_id {action_id}')
+        pos = int(matches[0])
+        # the game states that include the changed action
+        states = np.arange(pos, min(pos + self.nb_prev_actions, n))
+        # the game states on both sides of them, which are needed to value
+        # the affected actions but do not change
+        before = [pos - 1] if pos > 0 else []
+        after = [states[-1] + 1] if states[-1] + 1 < n else []
+
+        def perturb(rows: np.ndarray) -> pd.DataFrame:
+            # one copy of the given rows per variant, with the changed action
+            # replaced. Each copy is a separate game, such that game states
+            # do not look back into the copy of another variant.
+            copies = actions.iloc[np.tile(rows, nb_variants)].reset_index(drop=True)
+            changed = np.flatnonzero(np.tile(rows == pos, nb_variants))
+            for col in variants.columns:
+                copies.loc[changed, col] = variants[col].values
+            copies['game_id'] = np.repeat(np.arange(nb_variants), len(rows))
+            return self._spadlcfg.add_names(copies)  # type: ignore
+
+        # compute the affected game states of each variant
+        window = np.arange(max(pos - self.nb_prev_actions + 1, 0), states[-1] + 1)
+        window_actions = perturb(window)
+        idx = (np.arange(nb_variants)[:, None] * len(window) + (states - window[0])).ravel()
+        gamestates = self._fs.gamestates(window_actions, self.nb_prev_actions, idx)
+        gamestates = [a.reset_index(drop=True) for a in gamestates]
+        gamestates = self._fs.play_left_to_right(gamestates, game.home_team_id)
+
+        mask = np.zeros(n, dtype=bool)
+        mask[np.concatenate([before, states, after]).astype(int)] = True
+        original = self.compute_features(game, actions, mask, prune=True)
+        original_states = original.iloc[len(before) : len(before) + len(states)]
+        features = []
+        for fn in self._active_xfns(prune=True):
+            if getattr(fn, 'requires_game_history', False):
+                cols = self._fs.feature_column_names([fn], self.nb_prev_actions)
+                features.append(
+                    pd.concat([original_states[cols]] * nb_variants, ignore_index=True)
+                )
+            else:
+                features.append(cast_features(fn(gamestates)))
+        features = _concat_features(features, gamestates)
+        features = self._add_pruned_columns(features, prune=True)
+
+        # score the original and changed game states in a single call
+        y_hat = self._estimate_probabilities(pd.concat([original, features], ignore_index=True))
+        y_original, y_variants = y_hat.iloc[: len(original)], y_hat.iloc[len(original) :]
+
+        # value the affected actions of each variant
+        segment = np.concatenate([before, states, after]).astype(int)
+        segment_actions = perturb(segment)
+        p_scores = np.empty((nb_variants, len(segment)))
+        p_concedes = np.empty((nb_variants, len(segment)))
+        affected = slice(len(before), len(before) + len(states))
+        p_scores[:] = y_original.scores.values
+        p_concedes[:] = y_original.concedes.values
+        p_scores[:, affected] = y_variants.scores.values.reshape(nb_variants, -1)
+        p_concedes[:, affected] = y_variants.concedes.values.reshape(nb_variants, -1)
+        vaep_values = self._vaep.value(
+            segment_actions, pd.Series(p_scores.ravel()), pd.Series(p_concedes.ravel())
+        )
+        vaep_values.index = pd.MultiIndex.from_arrays(
+            [
+                np.repeat(variants.index.values, len(segment)),
+                segment_actions.action_id.values,
+            ],
+            names=[variants.index.name, 'action_id'],
+        )
+        # the previous action is only included for its game state
+        keep = np.tile(np.arange(len(segment)) >= len(before), nb_variants)
+        return vaep_values[keep]
+
     def score(self, X: pd.DataFrame, y: pd.DataFrame) -> Dict[str, Dict[str, float]]:
         """Evaluate the fit of the model on the given test data and labels.
 
@@ -352,8 +742,7 @@ class VAEP:
         score : dict
             The Brier and AUROC scores for both binary classification problems.
         """
-        if not self.__models:
-            raise NotFittedError()
+        self._check_is_fitted()
 
         y_hat = self._estimate_probabilities(X)
 
@@ -364,3 +753,336 @@ class VAEP:
             scores[col]['auroc'] = roc_auc_score(y[col], y_hat[col])
 
         return scores
+
+    def save(self, path: Union[str, 'os.PathLike[str]']) -> None:
+        """Save the fitted model to a directory.
+
+        Each model is stored in the native format of its learner, together
+        with a 'manifest.json' file that describes the feature transformers,
+        the feature names and the number of previous actions.
+
+        Parameters
+        ----------
+        path : str or os.PathLike
+            The directory in which the model is saved. It is created if it
+            does not exist yet.
+
+        Raises
+        ------
+        NotFittedError
+            If the model is not fitted yet.
+        ValueError
+            If a feature transformer is not a module-level function, such
+            that it cannot be imported when the model is loaded.
+        """
+        self._check_is_fitted()
+        xfn_names = {fn: _xfn_name(fn) for fn in self.xfns}
+
+        os.makedirs(path, exist_ok=True)
+        learner = self.__learner or _learner_name(next(iter(self.__models.values())))
+        model_files = {}
+        for col, model in self.__models.items():
+            model_files[col] = f'{col}.{_model_file_extensions[learner]}'
+            _save_booster(learner, model, os.path.join(path, model_files[col]))
+        manifest = {
+            'format_version': 1,
+            'socceraction_version': socceraction.__version__,
+            'model': _qualified_name(type(self)),
+            'learner': learner,
+            'nb_prev_actions': self.nb_prev_actions,
+            'xfns': [xfn_names[fn] for fn in self.xfns],
+            'pruned_xfns': [xfn_names[fn] for fn in self._pruned_xfns],
+            'features': self._fs.feature_column_names(self.xfns, self.nb_prev_actions),
+            'models': model_files,
+        }
+        with open(os.path.join(path, 'manifest.json'), 'w') as fh:
+            json.dump(manifest, fh, indent=2)
+
+    @classmethod
+    def load(cls, path: Union[str, 'os.PathLike[str]']) -> 'VAEP':
+        """Load a model that was saved with :meth:`save`.
+
+        Only the manifest is read. The models are deserialised the first time
+        they are needed, which only imports the learner that was used to fit
+        them.
+
+        Parameters
+        ----------
+        path : str or os.PathLike
+            The directory in which the model was saved.
+
+        Raises
+        ------
+        ValueError
+            If the model was saved by another class or if the saved features
+            do not match the feature transformers.
+
+        Returns
+        -------
+        VAEP
+            The loaded model.
+        """
+        with open(os.path.join(path, 'manifest.json')) as fh:
+            manifest = json.load(fh)
+        if manifest['model'] != _qualified_name(cls):
+            raise ValueError(f"The saved model is a {manifest['model']}, not a {cls.__name__}")
+
+        xfns = [_import_qualified_name(name) for name in manifest['xfns']]
+        model = cls(xfns=xfns, nb_prev_actions=manifest['nb_prev_actions'])
+        if (
+            model._fs.feature_column_names(model.xfns, model.nb_prev_actions)
+            != manifest['features']
+        ):
+            raise ValueError('The saved features do not match the feature transformers')
+        model._pruned_xfns = {
+            fn: model._fs.feature_column_names([fn], model.nb_prev_actions)
+            for fn in model.xfns
+            if _qualified_name(fn) in manifest['pruned_xfns']
+        }
+        model.__learner = manifest['learner']
+        model.__model_files = {
+            col: os.path.join(path, fname) for col, fname in manifest['models'].items()
+        }
+        return model
+
+    def _check_is_fitted(self) -> None:
+        if not self.__models and self.__model_files:
+            # deserialise the models of a loaded VAEP model on first use
+            self.__models = {
+                col: _load_booster(self.__learner, fname)  # type: ignore
+                for col, fname in self.__model_files.items()
+            }
+        if not self.__models:
+            raise NotFittedError()
+
+    def cross_validate(
+        self,
+        X: pd.DataFrame,
+        y: pd.DataFrame,
+        game_ids: ArrayLike,
+        n_splits: int = 5,
+        learner: str = 'xgboost',
+        param_grid: Optional[List[Dict[str, Any]]] = None,
+        fit_params: Optional[Dict[str, Any]] = None,
+        n_jobs: Optional[int] = None,
+        tmp_dir: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Evaluate the model with K-fold cross-validation grouped by game.
+
+        The game states of a game are never split across the training and
+        test set of a fold. The feature and label matrices are written once to
+        a memory-mapped file, such that each worker process reads the same
+        data instead of receiving its own copy. Each combination of a fold
+        and a hyperparameter candidate is fitted in a separate task. The
+        model itself is not fitted by this method.
+
+        Parameters
+        ----------
+        X : pd.DataFrame
+            Feature representation of the game states.
+        y : pd.DataFrame
+            Scoring and conceding labels for each game state.
+        game_ids : array-like
+            The ID of the game of each game state, used to group the folds.
+        n_splits : int, default=5  # noqa: DAR103
+            Number of folds.
+        learner : string, default='xgboost'  # noqa: DAR103
+            Gradient boosting implementation which should be used to learn the
+            model. The supported learners are 'xgboost', 'catboost' and 'lightgbm'.
+        param_grid : list(dict), optional
+            Hyperparameter candidates. Each candidate is a dict of parameters
+            passed to the constructor of the learner. If None, only the
+            default parameters of the learner are evaluated.
+        fit_params : dict, optional
+            Parameters passed to the fit method of the learner.
+        n_jobs : int, optional
+            Number of worker processes. If None, the number of processors
+            on the machine is used. If 1, all tasks run in the current process.
+        tmp_dir : str, optional
+            Directory in which the memory-mapped matrices are stored. Uses the
+            system's default temporary directory if None.
+
+        Raises
+        ------
+        ValueError
+            If one of the features is missing in the provided dataframe.
+
+        Returns
+        -------
+        pd.DataFrame
+            The Brier and AUROC score of each hyperparameter candidate
+            ('candidate'), fold ('fold') and label ('label').
+        """
+        cols = self._fs.feature_column_names(self.xfns, self.nb_prev_actions)
+        if not set(cols).issubset(set(X.columns)):
+            missing_cols = ' and '.join(set(cols).difference(X.columns))
+            raise ValueError(f'{missing_cols} are not available in the features dataframe')
+        candidates: List[Optional[Dict[str, Any]]] = (
+            [None] if param_grid is None else list(param_grid)
+        )
+        game_ids = np.asarray(game_ids)
+        if len(game_ids) != len(X):
+            raise ValueError('game_ids should contain the game of each game state')
+
+        folds = list(GroupKFold(n_splits=n_splits).split(X, groups=game_ids))
+        tasks = [(c, f) for c in range(len(candidates)) for f in range(len(folds))]
+
+        with tempfile.TemporaryDirectory(dir=tmp_dir) as mmap_dir:
+            X_path = os.path.join(mmap_dir, 'X.npy')
+            y_path = os.path.join(mmap_dir, 'y.npy')
+            np.save(X_path, X[cols].to_numpy(dtype=np.float32))
+            np.save(y_path, y.to_numpy(dtype=np.int8))
+            args = [
+                (
+                    type(self),
+                    X_path,
+                    y_path,
+                    cols,
+                    list(y.columns),
+                    folds[f][0],
+                    folds[f][1],
+                    learner,
+                    candidates[c],
+                    fit_params,
+                )
+                for c, f in tasks
+            ]
+            if n_jobs == 1:
+                results = [_cross_validate_fold(*a) for a in args]
+            else:
+                with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                    results = list(executor.map(_cross_validate_fold, *zip(*args)))
+
+        records = []
+        for (c, f), fold_scores in zip(tasks, results):
+            for label, label_scores in fold_scores.items():
+                records.append({'candidate': c, 'fold': f, 'label': label, **label_scores})
+        return pd.DataFrame.from_records(
+            records, columns=['candidate', 'fold', 'label', 'brier', 'auroc']
+        )
+
+
+def _selection_mask(
+    game_actions: fs.Actions, mask: Optional[ArrayLike], action_ids: Optional[ArrayLike]
+) -> Optional[np.ndarray]:
+    if action_ids is None:
+        return None if mask is None else np.asarray(mask, dtype=bool)
+    if mask is not None:
+        raise ValueError('Pass either a mask or action_ids, not both')
+    action_ids = np.asarray(action_ids)
+    unknown = np.setdiff1d(action_ids, game_actions.action_id.values)
+    if len(unknown) > 0:
+        raise ValueError(f'Unknown action_id {", ".join(map(str, unknown))}')
+    return np.isin(game_actions.action_id.values, action_ids)
+
+
+def _concat_features(features: List[pd.DataFrame], gamestates: fs.GameStates) -> pd.DataFrame:
+    # without feature transformers, there is still one row per game state
+    return pd.concat(features or [pd.DataFrame(index=gamestates[0].index)], axis=1)
+
+
+def _cross_validate_fold(
+    model_cls: Type[VAEP],
+    X_path: str,
+    y_path: str,
+    cols: List[str],
+    label_cols: List[str],
+    train_idx: np.ndarray,
+    test_idx: np.ndarray,
+    learner: str,
+    tree_params: Optional[Dict[str, Any]],
+    fit_params: Optional[Dict[str, Any]],
+) -> Dict[str, Dict[str, float]]:
+    # the matrices are shared between processes through the page cache;
+    # only the rows of the current fold are copied into memory
+    X = np.load(X_path, mmap_mode='r')
+    y = np.load(y_path, mmap_mode='r')
+    X_train = pd.DataFrame(X[train_idx], columns=cols)
+    X_test = pd.DataFrame(X[test_idx], columns=cols)
+
+    model = model_cls()
+    scores: Dict[str, Dict[str, float]] = {}
+    for i, col in enumerate(label_cols):
+        y_train = pd.Series(y[train_idx, i], name=col)
+        y_test = y[test_idx, i]
+        clf = model._fit_learner(learner, X_train, y_train, None, tree_params, fit_params)
+        y_hat = clf.predict_proba(X_test)[:, 1]
+        scores[col] = {}
+        scores[col]['brier'] = brier_score_loss(y_test, y_hat)
+        scores[col]['auroc'] = roc_auc_score(y_test, y_hat)
+    return scores
+
+
+def _import_learner(learner: str) -> Any:
+    # the learners are optional dependencies that are imported on first use
+    try:
+        return importlib.import_module(learner)
+    except ImportError:
+        raise ImportError(f'{learner} is not installed.') from None
+
+
+_model_file_extensions = {'xgboost': 'ubj', 'catboost': 'cbm', 'lightgbm': 'txt'}
+
+
+def _learner_name(model: Any) -> str:
+    return type(model).__module__.split('.')[0]
+
+
+def _qualified_name(obj: Any) -> str:
+    return f'{obj.__module__}.{obj.__qualname__}'
+
+
+def _import_qualified_name(name: str) -> Any:
+    module_name, _, attr = name.rpartition('.')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _xfn_name(fn: fs.FeatureTransfomer) -> str:
+    # load imports the feature transformers by name, which only works for
+    # module-level functions (e.g., not for lambdas or partial functions)
+    try:
+        name = _qualified_name(fn)
+        if _import_qualified_name(name) is fn:
+            return name
+    except (AttributeError, ImportError):
+        pass
+    raise ValueError(
+        f'Cannot save the feature transformer {fn!r}, only module-level functions are supported'
+    )
+
+
+def _save_booster(learner: str, model: Any, fname: str) -> None:
+    if learner == 'lightgbm':
+        model.booster_.save_model(fname)
+    elif learner in ('xgboost', 'catboost'):
+        model.save_model(fname)
+    else:
+        raise ValueError(f'A {learner} learner is not supported')
+
+
+def _load_booster(learner: str, fname: str) -> Any:
+    # only the learner that was used to fit the model is imported
+    if learner == 'xgboost':
+        model = _import_learner('xgboost').XGBClassifier()
+        model.load_model(fname)
+        return model
+    if learner == 'catboost':
+        return _import_learner('catboost').CatBoostClassifier().load_model(fname)
+    if learner == 'lightgbm':
+        return _LightGBMBooster(_import_learner('lightgbm').Booster(model_file=fname))
+    raise ValueError(f'A {learner} learner is not supported')
+
+
+class _LightGBMBooster:
+    """Expose a LightGBM booster with the classifier API used by VAEP."""
+
+    def __init__(self, booster: Any) -> None:
+        self.booster_ = booster
+
+    @property
+    def feature_importances_(self) -> np.ndarray:
+        return self.booster_.feature_importance(importance_type='split')
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        p = self.booster_.predict(X)
+        return np.column_stack([1 - p, p])
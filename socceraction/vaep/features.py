@@ -1,12 +1,14 @@
 """Implements the feature tranformers of the VAEP framework."""
 from functools import wraps
-from typing import Any, Callable, List, Union, no_type_check
+from typing import Any, Callable, List, Optional, Union, no_type_check
 
 import numpy as np  # type: ignore
 import pandas as pd  # type: ignore
+from numpy.typing import ArrayLike
 from pandera.typing import DataFrame
 
 import socceraction.spadl.config as spadlconfig
+from socceraction import kernels
 from socceraction.atomic.spadl import AtomicSPADLSchema
 from socceraction.spadl.schema import SPADLSchema
 
@@ -59,10 +61,14 @@ def feature_column_names(fs: List[FeatureTransfomer], nb_prev_actions: int = 3)
     return list(pd.concat([f(gs) for f in fs], axis=1).columns.values)
 
 
-def gamestates(actions: Actions, nb_prev_actions: int = 3) -> GameStates:
+def gamestates(
+    actions: Actions, nb_prev_actions: int = 3, idx: Optional[ArrayLike] = None
+) -> GameStates:
     r"""Convert a dataframe of actions to gamestates.
 
     Each gamestate is represented as the <nb_prev_actions> previous actions.
+    If the dataframe contains the actions of multiple games, the actions of
+    each game should be contiguous.
 
     The list of gamestates is internally represented as a list of actions
     dataframes :math:`[a_0,a_1,\ldots]` where each row in the a_i dataframe contains the
@@ -71,24 +77,40 @@ def gamestates(actions: Actions, nb_prev_actions: int = 3) -> GameStates:
     Parameters
     ----------
     actions : Actions
-        A DataFrame with the actions of a game.
+        A DataFrame with the actions of one or more games.
     nb_prev_actions : int, default=3  # noqa: DAR103
         The number of previous actions included in the game state.
+    idx : array-like, optional
+        The positions of the actions for which the game state is computed.
+        If None, the game state of each action is computed.
 
     Returns
     -------
     GameStates
          The <nb_prev_actions> previous actions for each action.
     """
-    states = [actions]
+    # the previous actions of the first actions in a game are padded with
+    # the first action of that game, such that states never cross games
+    positions = np.arange(len(actions))
+    game_start = np.zeros(len(actions), dtype=int)
+    if 'game_id' in actions.columns and len(actions) > 0:
+        game_id = actions['game_id'].values
+        new_game = np.concatenate([[True], game_id[1:] != game_id[:-1]])
+        game_start = np.maximum.accumulate(np.where(new_game, positions, 0))
+    if idx is None:
+        states = [actions]
+    else:
+        positions = np.asarray(idx, dtype=int)
+        game_start = game_start[positions]
+        states = [actions.iloc[positions]]
     for i in range(1, nb_prev_actions):
-        prev_actions = actions.copy().shift(i, fill_value=0)
-        prev_actions.loc[: i - 1, :] = pd.concat([actions[:1]] * i, ignore_index=True)
+        prev_actions = actions.iloc[np.maximum(positions - i, game_start)]
+        prev_actions.index = states[0].index
         states.append(prev_actions)  # type: ignore
     return states
 
 
-def play_left_to_right(gamestates: GameStates, home_team_id: int) -> GameStates:
+def play_left_to_right(gamestates: GameStates, home_team_id: Union[int, ArrayLike]) -> GameStates:
     """Perform all action in the same playing direction.
 
     This changes the start and end location of each action, such that all actions
@@ -98,8 +120,9 @@ def play_left_to_right(gamestates: GameStates, home_team_id: int) -> GameStates:
     ----------
     gamestates : GameStates
         The game states of a game.
-    home_team_id : int
-        The ID of the home team.
+    home_team_id : int or array-like
+        The ID of the home team, or the ID of the home team in the game of
+        each game state.
 
     Returns
     -------
@@ -107,7 +130,7 @@ def play_left_to_right(gamestates: GameStates, home_team_id: int) -> GameStates:
         The game states with all actions performed left to right.
     """
     a0 = gamestates[0]
-    away_idx = a0.team_id != home_team_id
+    away_idx = (a0.team_id != home_team_id).values
     for actions in gamestates:
         for col in ['start_x', 'end_x']:
             actions.loc[away_idx, col] = spadlconfig.field_length - actions[away_idx][col].values
@@ -310,7 +333,9 @@ def time(actions: Actions) -> Features:
         action was performed.
     """
     timedf = actions[['period_id', 'time_seconds']].copy()
-    timedf['time_seconds_overall'] = ((timedf.period_id - 1) * 45 * 60) + timedf.time_seconds
+    # the period may be stored as a small integer, which would overflow
+    period_start = (timedf.period_id.astype(np.int64) - 1) * 45 * 60
+    timedf['time_seconds_overall'] = period_start + timedf.time_seconds
     return timedf
 
 
@@ -518,22 +543,56 @@ def goalscore(gamestates: GameStates) -> Features:
         and the goal difference between both teams ('goalscore_diff').
     """
     actions = gamestates[0]
-    teamA = actions['team_id'].values[0]
     goals = actions['type_name'].str.contains('shot') & (
         actions['result_id'] == spadlconfig.results.index('success')
     )
     owngoals = actions['type_name'].str.contains('shot') & (
         actions['result_id'] == spadlconfig.results.index('owngoal')
     )
+    return _goalscore(actions, goals, owngoals)
+
+
+# goalscore counts the goals in all preceding actions of the game
+goalscore.requires_game_history = True  # type: ignore
+
+
+def _goalscore(actions: Actions, goals: pd.Series, owngoals: pd.Series) -> Features:
+    # count the goals and own goals of both teams before each action of a game
+    team_id = actions['team_id'].values
+    if kernels.accelerated(team_id):
+        if 'game_id' in actions.columns:
+            game_codes = pd.factorize(actions['game_id'])[0]
+        else:
+            game_codes = np.zeros(len(actions), dtype=np.int64)
+        team, opponent = kernels.goalscore(
+            game_codes, team_id, goals.values.astype(bool), owngoals.values.astype(bool)
+        )
+        scoredf = pd.DataFrame(
+            {'goalscore_team': team, 'goalscore_opponent': opponent}, index=actions.index
+        )
+        scoredf['goalscore_diff'] = scoredf['goalscore_team'] - scoredf['goalscore_opponent']
+        return scoredf
+
+    if 'game_id' in actions.columns:
+        teamA = actions.groupby('game_id', sort=False)['team_id'].transform('first')
+    else:
+        teamA = actions['team_id'].values[0]
     teamisA = actions['team_id'] == teamA
     teamisB = ~teamisA
     goalsteamA = (goals & teamisA) | (owngoals & teamisB)
     goalsteamB = (goals & teamisB) | (owngoals & teamisA)
-    goalscoreteamA = goalsteamA.cumsum() - goalsteamA
-    goalscoreteamB = goalsteamB.cumsum() - goalsteamB
+    goalscoreteamA = _cumsum(goalsteamA, actions) - goalsteamA
+    goalscoreteamB = _cumsum(goalsteamB, actions) - goalsteamB
 
     scoredf = pd.DataFrame()
     scoredf['goalscore_team'] = (goalscoreteamA * teamisA) + (goalscoreteamB * teamisB)
     scoredf['goalscore_opponent'] = (goalscoreteamB * teamisA) + (goalscoreteamA * teamisB)
     scoredf['goalscore_diff'] = scoredf['goalscore_team'] - scoredf['goalscore_opponent']
     return scoredf
+
+
+def _cumsum(x: pd.Series, actions: Actions) -> pd.Series:
+    # cumulative sum that restarts at the first action of each game
+    if 'game_id' in actions.columns:
+        return x.groupby(actions['game_id'].values, sort=False).cumsum()
+    return x.cumsum()
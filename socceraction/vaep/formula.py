@@ -1,18 +1,42 @@
 """Implements the formula of the VAEP framework."""
+from typing import Optional, Tuple
+
+import numpy as np  # type: ignore
 import pandas as pd  # type: ignore
+from numpy.typing import ArrayLike
 from pandera.typing import DataFrame, Series
 
+import socceraction.spadl.config as spadlconfig
 from socceraction.spadl.schema import SPADLSchema
 
 
-def _prev(x: pd.Series) -> pd.Series:
-    prev_x = x.shift(1)
-    prev_x[:1] = x.values[0]
-    return prev_x
+def _prev_idx(n: int, game_id: Optional[ArrayLike] = None) -> np.ndarray:
+    """Return the position of the previous action in the same game.
+
+    The first action of each game is its own previous action.
+    """
+    idx = np.arange(n)
+    if game_id is None or n == 0:
+        return np.maximum(idx - 1, 0)
+    game_id = np.asarray(game_id)
+    prev_idx = idx - 1
+    prev_idx[0] = 0
+    new_game = np.concatenate([[True], game_id[1:] != game_id[:-1]])
+    prev_idx[new_game] = idx[new_game]
+    return prev_idx
 
 
 _samephase_nb: int = 10
 
+_shot_ids = np.array(
+    [spadlconfig.actiontypes.index(t) for t in ['shot', 'shot_freekick', 'shot_penalty']]
+)
+_corner_ids = np.array(
+    [spadlconfig.actiontypes.index(t) for t in ['corner_crossed', 'corner_short']]
+)
+_penalty_id: int = spadlconfig.actiontypes.index('shot_penalty')
+_success_id: int = spadlconfig.results.index('success')
+
 
 def offensive_value(
     actions: DataFrame[SPADLSchema], scores: Series[float], concedes: Series[float]
@@ -44,28 +68,16 @@ def offensive_value(
     pd.Series
         The offensive value of each action.
     """
-    sameteam = _prev(actions.team_id) == actions.team_id
-    prev_scores = _prev(scores) * sameteam + _prev(concedes) * (~sameteam)
-
-    # if the previous action was too long ago, the odds of scoring are now 0
-    toolong_idx = abs(actions.time_seconds - _prev(actions.time_seconds)) > _samephase_nb
-    prev_scores[toolong_idx] = 0
-
-    # if the previous action was a goal, the odds of scoring are now 0
-    prevgoal_idx = (_prev(actions.type_name).isin(['shot', 'shot_freekick', 'shot_penalty'])) & (
-        _prev(actions.result_name) == 'success'
+    offensive, _ = values_from_arrays(
+        actions.type_id.values,
+        actions.result_id.values,
+        actions.team_id.values,
+        actions.time_seconds.values,
+        np.asarray(scores, dtype=float),
+        np.asarray(concedes, dtype=float),
+        actions.game_id.values if 'game_id' in actions.columns else None,
     )
-    prev_scores[prevgoal_idx] = 0
-
-    # fixed odds of scoring when penalty
-    penalty_idx = actions.type_name == 'shot_penalty'
-    prev_scores[penalty_idx] = 0.792453
-
-    # fixed odds of scoring when corner
-    corner_idx = actions.type_name.isin(['corner_crossed', 'corner_short'])
-    prev_scores[corner_idx] = 0.046500
-
-    return scores - prev_scores
+    return pd.Series(offensive, index=scores.index)
 
 
 def defensive_value(
@@ -98,19 +110,16 @@ def defensive_value(
     pd.Series
         The defensive value of each action.
     """
-    sameteam = _prev(actions.team_id) == actions.team_id
-    prev_concedes = _prev(concedes) * sameteam + _prev(scores) * (~sameteam)
-
-    toolong_idx = abs(actions.time_seconds - _prev(actions.time_seconds)) > _samephase_nb
-    prev_concedes[toolong_idx] = 0
-
-    # if the previous action was a goal, the odds of conceding are now 0
-    prevgoal_idx = (_prev(actions.type_name).isin(['shot', 'shot_freekick', 'shot_penalty'])) & (
-        _prev(actions.result_name) == 'success'
+    _, defensive = values_from_arrays(
+        actions.type_id.values,
+        actions.result_id.values,
+        actions.team_id.values,
+        actions.time_seconds.values,
+        np.asarray(scores, dtype=float),
+        np.asarray(concedes, dtype=float),
+        actions.game_id.values if 'game_id' in actions.columns else None,
     )
-    prev_concedes[prevgoal_idx] = 0
-
-    return -(concedes - prev_concedes)
+    return pd.Series(defensive, index=concedes.index)
 
 
 def value(
@@ -144,8 +153,83 @@ def value(
     :func:`~socceraction.vaep.formula.offensive_value`: The offensive value
     :func:`~socceraction.vaep.formula.defensive_value`: The defensive value
     """
-    v = pd.DataFrame()
-    v['offensive_value'] = offensive_value(actions, Pscores, Pconcedes)
-    v['defensive_value'] = defensive_value(actions, Pscores, Pconcedes)
+    offensive, defensive = values_from_arrays(
+        actions.type_id.values,
+        actions.result_id.values,
+        actions.team_id.values,
+        actions.time_seconds.values,
+        np.asarray(Pscores, dtype=float),
+        np.asarray(Pconcedes, dtype=float),
+        actions.game_id.values if 'game_id' in actions.columns else None,
+    )
+    v = pd.DataFrame(index=Pscores.index)
+    v['offensive_value'] = offensive
+    v['defensive_value'] = defensive
     v['vaep_value'] = v['offensive_value'] + v['defensive_value']
     return v
+
+
+def values_from_arrays(
+    type_id: ArrayLike,
+    result_id: ArrayLike,
+    team_id: ArrayLike,
+    time_seconds: ArrayLike,
+    scores: ArrayLike,
+    concedes: ArrayLike,
+    game_id: Optional[ArrayLike] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute the offensive and defensive value of each action from flat arrays.
+
+    This is a vectorised implementation of :func:`offensive_value` and
+    :func:`defensive_value`. The actions of multiple games can be valued in
+    a single call, in which case the previous game state of the first action
+    in each game is the action itself.
+
+    Parameters
+    ----------
+    type_id : array-like
+        The SPADL type id of each action.
+    result_id : array-like
+        The SPADL result id of each action.
+    team_id : array-like
+        The team id of each action.
+    time_seconds : array-like
+        The time of each action, in seconds since the start of the period.
+    scores : array-like
+        The probability of scoring from each corresponding game state.
+    concedes : array-like
+        The probability of conceding from each corresponding game state.
+    game_id : array-like, optional
+        The game id of each action. The actions of each game should be
+        contiguous. If None, all actions are assumed to belong to one game.
+
+    Returns
+    -------
+    tuple(np.ndarray, np.ndarray)
+        The offensive and defensive value of each action.
+    """
+    type_id = np.asarray(type_id)
+    team_id = np.asarray(team_id)
+    time_seconds = np.asarray(time_seconds)
+    scores = np.asarray(scores, dtype=float)
+    concedes = np.asarray(concedes, dtype=float)
+    prev = _prev_idx(len(type_id), game_id)
+
+    sameteam = team_id[prev] == team_id
+    prev_scores = np.where(sameteam, scores[prev], concedes[prev])
+    prev_concedes = np.where(sameteam, concedes[prev], scores[prev])
+
+    # if the previous action was too long ago, the odds of scoring are now 0
+    toolong_idx = np.abs(time_seconds - time_seconds[prev]) > _samephase_nb
+    # if the previous action was a goal, the odds of scoring are now 0
+    prevgoal_idx = np.isin(type_id[prev], _shot_ids) & (np.asarray(result_id)[prev] == _success_id)
+    reset_idx = toolong_idx | prevgoal_idx
+    prev_scores[reset_idx] = 0
+    prev_concedes[reset_idx] = 0
+
+    # fixed odds of scoring when penalty
+    prev_scores[type_id == _penalty_id] = 0.792453
+    # fixed odds of scoring when corner
+    prev_scores[np.isin(type_id, _corner_ids)] = 0.046500
+
+    return scores - prev_scores, -(concedes - prev_concedes)
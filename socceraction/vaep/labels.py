@@ -1,10 +1,117 @@
 """Implements the label tranformers of the VAEP framework."""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np  # type: ignore
 import pandas as pd  # type: ignore
+from numpy.typing import ArrayLike
 from pandera.typing import DataFrame
 
 import socceraction.spadl.config as spadl
+from socceraction import kernels
 from socceraction.spadl.schema import SPADLSchema
 
+_shot_ids = np.array(
+    [spadl.actiontypes.index(t) for t in ['shot', 'shot_freekick', 'shot_penalty']]
+)
+
+
+def _goals(actions: DataFrame[SPADLSchema]) -> Tuple[np.ndarray, np.ndarray]:
+    shots = np.isin(actions['type_id'].values, _shot_ids)
+    result_id = actions['result_id'].values
+    goals = shots & (result_id == spadl.results.index('success'))
+    owngoals = shots & (result_id == spadl.results.index('owngoal'))
+    return goals, owngoals
+
+
+def _game_bounds(n: int, game_id: Optional[ArrayLike] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the position of the first and last action in the game of each action."""
+    idx = np.arange(n)
+    if game_id is None or n == 0:
+        return np.zeros(n, dtype=int), np.full(n, n - 1)
+    game_id = np.asarray(game_id)
+    changes = game_id[1:] != game_id[:-1]
+    first = np.concatenate([[True], changes])
+    last = np.concatenate([changes, [True]])
+    start = np.maximum.accumulate(np.where(first, idx, 0))
+    end = np.minimum.accumulate(np.where(last, idx, n - 1)[::-1])[::-1]
+    return start, end
+
+
+def _goal_windows(
+    goals: np.ndarray,
+    owngoals: np.ndarray,
+    team_id: ArrayLike,
+    game_start: np.ndarray,
+    window_ends: Sequence[np.ndarray],
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Look ahead for goals in a window starting at each action.
+
+    The goals are counted relative to the two teams in each game, such that a
+    window sum over the cumulative count of each team tells whether that team
+    scored in the window. Each window ends before the given (exclusive) end
+    position.
+    """
+    team_id = np.asarray(team_id)
+    if kernels.accelerated(goals, owngoals, team_id):
+        return [
+            kernels.goal_windows(goals, owngoals, team_id, game_start, window_end)
+            for window_end in window_ends
+        ]
+    idx = np.arange(len(team_id))
+    is_a = team_id == team_id[game_start]
+    goals_a = np.concatenate([[0], np.cumsum((goals & is_a) | (owngoals & ~is_a))])
+    goals_b = np.concatenate([[0], np.cumsum((goals & ~is_a) | (owngoals & is_a))])
+    windows = []
+    for window_end in window_ends:
+        scored_a = goals_a[window_end] > goals_a[idx]
+        scored_b = goals_b[window_end] > goals_b[idx]
+        windows.append((np.where(is_a, scored_a, scored_b), np.where(is_a, scored_b, scored_a)))
+    return windows
+
+
+def _window_labels(
+    actions: pd.DataFrame,
+    goals: np.ndarray,
+    owngoals: np.ndarray,
+    sizes: Sequence[int],
+) -> pd.DataFrame:
+    game_id = actions['game_id'].values if 'game_id' in actions.columns else None
+    start, end = _game_bounds(len(actions), game_id)
+    idx = np.arange(len(actions))
+    window_ends = [np.minimum(idx + max(nr_actions, 1), end + 1) for nr_actions in sizes]
+    windows = _goal_windows(goals, owngoals, actions['team_id'].values, start, window_ends)
+    labels = pd.DataFrame(index=actions.index)
+    for nr_actions, (y_scores, y_concedes) in zip(sizes, windows):
+        labels[f'scores_{nr_actions}'] = y_scores
+        labels[f'concedes_{nr_actions}'] = y_concedes
+    return labels
+
+
+def _time_window_labels(
+    actions: pd.DataFrame,
+    goals: np.ndarray,
+    owngoals: np.ndarray,
+    nr_seconds: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    n = len(actions)
+    game_id = actions['game_id'].values if 'game_id' in actions.columns else np.zeros(n)
+    period_id = actions['period_id'].values
+    time_seconds = actions['time_seconds'].values.astype(float)
+    start, _ = _game_bounds(n, game_id)
+    # each (game, period) segment is shifted on the time axis by more than the
+    # look-ahead, such that a single sorted search never crosses a segment
+    if n > 0:
+        new_segment = np.concatenate(
+            [[False], (game_id[1:] != game_id[:-1]) | (period_id[1:] != period_id[:-1])]
+        )
+        span = np.abs(time_seconds).max() + abs(nr_seconds) + 1
+        key = time_seconds + np.cumsum(new_segment) * (2 * span)
+    else:
+        key = time_seconds
+    window_end = np.searchsorted(key, key + nr_seconds, side='right')
+    (windows,) = _goal_windows(goals, owngoals, actions['team_id'].values, start, [window_end])
+    return windows
+
 
 def scores(actions: DataFrame[SPADLSchema], nr_actions: int = 10) -> pd.DataFrame:
     """Determine whether the team possessing the ball scored a goal within the next x actions.
@@ -23,31 +130,8 @@ def scores(actions: DataFrame[SPADLSchema], nr_actions: int = 10) -> pd.DataFram
         True if a goal was scored by the team possessing the ball within the
         next x actions; otherwise False.
     """
-    # merging goals, owngoals and team_ids
-
-    goals = actions['type_name'].str.contains('shot') & (
-        actions['result_id'] == spadl.results.index('success')
-    )
-    owngoals = actions['type_name'].str.contains('shot') & (
-        actions['result_id'] == spadl.results.index('owngoal')
-    )
-    y = pd.concat([goals, owngoals, actions['team_id']], axis=1)
-    y.columns = ['goal', 'owngoal', 'team_id']
-
-    # adding future results
-    for i in range(1, nr_actions):
-        for c in ['team_id', 'goal', 'owngoal']:
-            shifted = y[c].shift(-i)
-            shifted[-i:] = y[c][len(y) - 1]
-            y['%s+%d' % (c, i)] = shifted
-
-    res = y['goal']
-    for i in range(1, nr_actions):
-        gi = y['goal+%d' % i] & (y['team_id+%d' % i] == y['team_id'])
-        ogi = y['owngoal+%d' % i] & (y['team_id+%d' % i] != y['team_id'])
-        res = res | gi | ogi
-
-    return pd.DataFrame(res, columns=['scores'])
+    labels = horizons(actions, [nr_actions])
+    return labels[[f'scores_{nr_actions}']].set_axis(['scores'], axis=1)
 
 
 def concedes(actions: DataFrame[SPADLSchema], nr_actions: int = 10) -> pd.DataFrame:
@@ -67,30 +151,93 @@ def concedes(actions: DataFrame[SPADLSchema], nr_actions: int = 10) -> pd.DataFr
         True if a goal was conceded by the team possessing the ball within the
         next x actions; otherwise False.
     """
-    # merging goals,owngoals and team_ids
-    goals = actions['type_name'].str.contains('shot') & (
-        actions['result_id'] == spadl.results.index('success')
-    )
-    owngoals = actions['type_name'].str.contains('shot') & (
-        actions['result_id'] == spadl.results.index('owngoal')
-    )
-    y = pd.concat([goals, owngoals, actions['team_id']], axis=1)
-    y.columns = ['goal', 'owngoal', 'team_id']
-
-    # adding future results
-    for i in range(1, nr_actions):
-        for c in ['team_id', 'goal', 'owngoal']:
-            shifted = y[c].shift(-i)
-            shifted[-i:] = y[c][len(y) - 1]
-            y['%s+%d' % (c, i)] = shifted
-
-    res = y['owngoal']
-    for i in range(1, nr_actions):
-        gi = y['goal+%d' % i] & (y['team_id+%d' % i] != y['team_id'])
-        ogi = y['owngoal+%d' % i] & (y['team_id+%d' % i] == y['team_id'])
-        res = res | gi | ogi
-
-    return pd.DataFrame(res, columns=['concedes'])
+    labels = horizons(actions, [nr_actions])
+    return labels[[f'concedes_{nr_actions}']].set_axis(['concedes'], axis=1)
+
+
+def horizons(
+    actions: DataFrame[SPADLSchema], nr_actions: Sequence[int] = (5, 10, 20)
+) -> pd.DataFrame:
+    """Determine whether the team possessing the ball scored or conceded within multiple horizons.
+
+    All horizons are computed in a single pass over the actions. If the
+    actions of multiple games are given, the look-ahead window never extends
+    into the next game.
+
+    Parameters
+    ----------
+    actions : pd.DataFrame
+        The actions of one or more games. The actions of each game should
+        be contiguous.
+    nr_actions : list(int), default=(5, 10, 20)  # noqa: DAR103
+        The numbers of actions after the current action to consider.
+
+    Returns
+    -------
+    pd.DataFrame
+        A dataframe with a column 'scores_x' and 'concedes_x' for each
+        horizon x, and a row for each action set to True if a goal was
+        scored (conceded) by the team possessing the ball within the next
+        x actions; otherwise False.
+    """
+    goals, owngoals = _goals(actions)
+    return _window_labels(actions, goals, owngoals, nr_actions)
+
+
+def scores_in_time(actions: DataFrame[SPADLSchema], nr_seconds: float = 10.0) -> pd.DataFrame:
+    """Determine whether the team possessing the ball scored a goal within the next x seconds.
+
+    The goals in the window of each action are found with a sorted search over
+    the period and time of the actions, so the labels of a full season can be
+    computed in a single call.
+
+    Parameters
+    ----------
+    actions : pd.DataFrame
+        The actions of one or more games. The actions of each game should be
+        contiguous and sorted by period and time.
+    nr_seconds : float, default=10.0  # noqa: DAR103
+        Number of seconds after the current action to consider. The window
+        does not extend beyond the end of the period.
+
+    Returns
+    -------
+    pd.DataFrame
+        A dataframe with a column 'scores' and a row for each action set to
+        True if a goal was scored by the team possessing the ball within the
+        next x seconds; otherwise False.
+    """
+    goals, owngoals = _goals(actions)
+    y_scores, _ = _time_window_labels(actions, goals, owngoals, nr_seconds)
+    return pd.DataFrame({'scores': y_scores}, index=actions.index)
+
+
+def concedes_in_time(actions: DataFrame[SPADLSchema], nr_seconds: float = 10.0) -> pd.DataFrame:
+    """Determine whether the team possessing the ball conceded a goal within the next x seconds.
+
+    The goals in the window of each action are found with a sorted search over
+    the period and time of the actions, so the labels of a full season can be
+    computed in a single call.
+
+    Parameters
+    ----------
+    actions : pd.DataFrame
+        The actions of one or more games. The actions of each game should be
+        contiguous and sorted by period and time.
+    nr_seconds : float, default=10.0  # noqa: DAR103
+        Number of seconds after the current action to consider. The window
+        does not extend beyond the end of the period.
+
+    Returns
+    -------
+    pd.DataFrame
+        A dataframe with a column 'concedes' and a row for each action set to
+        True if a goal was conceded by the team possessing the ball within the
+        next x seconds; otherwise False.
+    """
+    goals, owngoals = _goals(actions)
+    _, y_concedes = _time_window_labels(actions, goals, owngoals, nr_seconds)
+    return pd.DataFrame({'concedes': y_concedes}, index=actions.index)
 
 
 def goal_from_shot(actions: DataFrame[SPADLSchema]) -> pd.DataFrame:
@@ -109,8 +256,5 @@ def goal_from_shot(actions: DataFrame[SPADLSchema]) -> pd.DataFrame:
         A dataframe with a column 'goal' and a row for each action set to
         True if a goal was scored from the current action; otherwise False.
     """
-    goals = actions['type_name'].str.contains('shot') & (
-        actions['result_id'] == spadl.results.index('success')
-    )
-
-    return pd.DataFrame(goals, columns=['goal_from_shot'])
+    goals, _ = _goals(actions)
+    return pd.DataFrame(goals, columns=['goal_from_shot'], index=actions.index)
@@ -0,0 +1,287 @@
+"""Implements a persistent store for the features and labels of games.
+
+Computing the features of all games in a dataset is one of the most time
+consuming steps of the VAEP pipeline, and it has to be redone whenever a
+feature transformer is added. The :class:`FeatureStore` caches the output
+of each feature and label transformer for each game in an HDF5 file. When
+the features of a game are requested, only the transformers that have not
+been computed before for that game are run.
+
+Each cached entry is identified by the game and the identity of the
+transformer. The identity includes the source code of the transformer, the
+version of socceraction and parameters such as the number of previous
+actions in a game state. Each entry also records a hash of the SPADL actions
+from which it was computed. Hence, entries are automatically recomputed when
+a transformer or the actions of a game change.
+
+Only the source code of the transformer itself is hashed, not the source of
+the functions that it calls. When such a function changes, change the
+`version` of the store to recompute all entries.
+"""
+import hashlib
+import inspect
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Union
+
+import pandas as pd
+
+import socceraction
+from socceraction.dtypes import cast_features
+
+from . import features as fs
+from .base import VAEP, _qualified_name
+
+
+def _transformer_id(fn: Callable[..., Any], params: Dict[str, Any]) -> str:
+    try:
+        source = inspect.getsource(inspect.unwrap(fn))
+    except (OSError, TypeError):
+        source = repr(getattr(inspect.unwrap(fn), '__code__', fn))
+    identity = json.dumps(
+        {
+            'name': _qualified_name(fn),
+            'source': source,
+            'version': socceraction.__version__,
+            'params': params,
+        },
+        sort_keys=True,
+    )
+    digest = hashlib.sha1(identity.encode()).hexdigest()[:16]
+    return f'{fn.__name__}_{digest}'
+
+
+def _actions_hash(game: pd.Series, game_actions: fs.Actions) -> str:
+    hashes = pd.util.hash_pandas_object(game_actions, index=False).values
+    digest = hashlib.sha1(hashes.tobytes())
+    digest.update(str(game.home_team_id).encode())
+    return digest.hexdigest()
+
+
+def _up_to_date_columns(
+    store: pd.HDFStore, keys: Dict[str, str], actions_hash: str
+) -> Dict[str, List[str]]:
+    """Return the columns of each entry that was computed from the same actions."""
+    cached = {}
+    for fn_id, key in keys.items():
+        if store.get_node(key) is None:
+            continue
+        storer = store.get_storer(key)
+        if getattr(storer.attrs, 'actions_hash', None) == actions_hash:
+            cached[fn_id] = list(storer.non_index_axes[0][1])
+    return cached
+
+
+def _read_frames(
+    store: pd.HDFStore,
+    keys: Dict[str, str],
+    cached: Dict[str, List[str]],
+    computed: Dict[str, pd.DataFrame],
+    columns: Optional[List[str]],
+) -> List[pd.DataFrame]:
+    """Collect the computed and the requested cached columns of each entry, in order."""
+    frames = []
+    for fn_id, key in keys.items():
+        if fn_id in computed:
+            frames.append(computed[fn_id])
+        elif fn_id in cached:
+            fn_cols = [c for c in cached[fn_id] if columns is None or c in columns]
+            if fn_cols:
+                frames.append(store.select(key, columns=fn_cols))
+    return frames
+
+
+class FeatureStore:
+    """A persistent, column-level cache for the features and labels of games.
+
+    The output of each transformer is stored as a separate table in
+    an HDF5 file, such that the features of a single transformer can be added
+    without recomputing the others and a subset of the columns can be read
+    without loading the full table.
+
+    Parameters
+    ----------
+    path : str or os.PathLike
+        The HDF5 file in which the features are stored. It is created if it
+        does not exist yet.
+    complevel : int, default=5
+        The compression level of the tables.
+    version : str, optional
+        A version that is part of the identity of each entry. The identity
+        of a transformer only includes its own source code. Hence, entries
+        are not recomputed when a function that the transformer calls
+        changes, such as ``_goalscore`` or the Numba kernel behind the
+        ``goalscore`` feature. Change the version to recompute all entries.
+
+    Notes
+    -----
+    Entries of transformers that are no longer used, or of older versions
+    of a transformer, stay in the file until :meth:`prune` or :meth:`clear`
+    is called. HDF5 does not return the space of removed entries to the file
+    system; repack the file with ``ptrepack`` to shrink it.
+
+    Examples
+    --------
+    >>> store = FeatureStore('features.h5')
+    >>> model = VAEP()
+    >>> X = pd.concat([store.features(model, game, actions[game.game_id]) for game in games])
+    >>> y = pd.concat([store.labels(model, game, actions[game.game_id]) for game in games])
+    """
+
+    def __init__(
+        self,
+        path: Union[str, 'os.PathLike[str]'],
+        complevel: int = 5,
+        version: Optional[str] = None,
+    ) -> None:
+        self.path = path
+        self.complevel = complevel
+        self.version = version
+
+    def features(
+        self,
+        model: VAEP,
+        game: pd.Series,
+        game_actions: fs.Actions,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Return the features of a game, computing only the missing ones.
+
+        Parameters
+        ----------
+        model : VAEP
+            The model whose feature transformers and number of previous actions
+            define the features.
+        game : pd.Series
+            The SPADL representation of a single game.
+        game_actions : pd.DataFrame
+            The actions performed during `game` in the SPADL representation.
+        columns : list(str), optional
+            Only return these feature columns. The transformers that do not
+            produce any of these columns are neither computed nor read.
+
+        Raises
+        ------
+        ValueError
+            If a column in `columns` is not produced by any of the feature
+            transformers of the model.
+
+        Returns
+        -------
+        features : pd.DataFrame
+            Returns the feature-based representation of each game state in
+            the game, as :meth:`VAEP.compute_features` does.
+        """
+        if columns is not None:
+            known = model._fs.feature_column_names(model.xfns, model.nb_prev_actions)
+            unknown = [c for c in columns if c not in known]
+            if unknown:
+                raise ValueError(f'Unknown feature columns: {", ".join(unknown)}')
+        xfns = self._feature_fns(model)
+
+        def compute(fns: List[Callable[..., Any]]) -> List[pd.DataFrame]:
+            actions = model._spadlcfg.add_names(game_actions)  # type: ignore
+            gamestates = model._fs.gamestates(actions, model.nb_prev_actions)
+            gamestates = model._fs.play_left_to_right(gamestates, game.home_team_id)
+            return [cast_features(fn(gamestates)) for fn in fns]
+
+        def column_names(fn: Callable[..., Any]) -> List[str]:
+            return model._fs.feature_column_names([fn], model.nb_prev_actions)
+
+        features = self._get('features', game, game_actions, xfns, compute, columns, column_names)
+        return features if columns is None else features[columns]
+
+    def labels(self, model: VAEP, game: pd.Series, game_actions: fs.Actions) -> pd.DataFrame:
+        """Return the labels of a game, computing only the missing ones.
+
+        Parameters
+        ----------
+        model : VAEP
+            The model whose label transformers define the labels.
+        game : pd.Series
+            The SPADL representation of a single game.
+        game_actions : pd.DataFrame
+            The actions performed during `game` in the SPADL representation.
+
+        Returns
+        -------
+        labels : pd.DataFrame
+            Returns the labels of each game state in the game, as
+            :meth:`VAEP.compute_labels` does.
+        """
+        yfns = self._label_fns(model)
+
+        def compute(fns: List[Callable[..., Any]]) -> List[pd.DataFrame]:
+            actions = model._spadlcfg.add_names(game_actions)  # type: ignore
+            return [cast_features(fn(actions)) for fn in fns]
+
+        return self._get('labels', game, game_actions, yfns, compute)
+
+    def prune(self, models: Sequence[VAEP]) -> None:
+        """Remove the entries of the transformers that none of the given models use.
+
+        Parameters
+        ----------
+        models : list(VAEP)
+            The models whose features and labels are kept.
+        """
+        keep: Dict[str, Set[str]] = {'features': set(), 'labels': set()}
+        for model in models:
+            keep['features'].update(self._feature_fns(model))
+            keep['labels'].update(self._label_fns(model))
+        if not os.path.exists(self.path):
+            return
+        with pd.HDFStore(self.path, mode='a') as store:
+            for kind, fn_ids in keep.items():
+                group = store.get_node(kind)
+                if group is None:
+                    continue
+                for fn_id in list(group._v_children):
+                    if fn_id not in fn_ids:
+                        store.remove(f'/{kind}/{fn_id}')
+
+    def clear(self) -> None:
+        """Remove all entries from the store."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _feature_fns(self, model: VAEP) -> Dict[str, Callable[..., Any]]:
+        params = {
+            'model': _qualified_name(type(model)),
+            'nb_prev_actions': model.nb_prev_actions,
+            'store_version': self.version,
+        }
+        return {_transformer_id(fn, params): fn for fn in model.xfns}
+
+    def _label_fns(self, model: VAEP) -> Dict[str, Callable[..., Any]]:
+        params = {'model': _qualified_name(type(model)), 'store_version': self.version}
+        return {_transformer_id(fn, params): fn for fn in model.yfns}
+
+    def _get(
+        self,
+        kind: str,
+        game: pd.Series,
+        game_actions: fs.Actions,
+        fns: Dict[str, Callable[..., Any]],
+        compute: Callable[[List[Callable[..., Any]]], List[pd.DataFrame]],
+        columns: Optional[List[str]] = None,
+        column_names: Optional[Callable[[Callable[..., Any]], List[str]]] = None,
+    ) -> pd.DataFrame:
+        actions_hash = _actions_hash(game, game_actions)
+        keys = {fn_id: f'/{kind}/{fn_id}/game_{game.game_id}' for fn_id in fns}
+        with pd.HDFStore(self.path, mode='a', complevel=self.complevel) as store:
+            cached = _up_to_date_columns(store, keys, actions_hash)
+            missing = [fn_id for fn_id in fns if fn_id not in cached]
+            if columns is not None and column_names is not None:
+                missing = [f for f in missing if set(column_names(fns[f])) & set(columns)]
+            computed = {}
+            if missing:
+                computed = dict(zip(missing, compute([fns[fn_id] for fn_id in missing])))
+            for fn_id, values in computed.items():
+                store.put(keys[fn_id], values, format='table')
+                store.get_storer(keys[fn_id]).attrs.actions_hash = actions_hash
+
+            frames = _read_frames(store, keys, cached, computed, columns)
+        if not frames:
+            return pd.DataFrame(index=pd.RangeIndex(len(game_actions)))
+        return pd.concat(frames, axis=1)
@@ -0,0 +1,218 @@
+import numpy as np
+import pandas as pd
+from pandera.typing import DataFrame
+
+import socceraction.atomic.spadl as atomicspadl
+from socceraction.atomic.spadl import AtomicSPADLSchema
+from socceraction.atomic.spadl import base as atomicbase
+from socceraction.dtypes import cast_actions
+from socceraction.spadl import SPADLSchema
+from socceraction.spadl import config as spadlconfig
+from socceraction.spadl.base import _add_dribbles, _interleave
+
+
+def _extra_from_passes(actions: pd.DataFrame) -> pd.DataFrame:
+    """Insert the receival, interception, out or offside after each pass.
+
+    This and the steps below convert the actions in separate passes, as a
+    reference for convert_to_atomic.
+    """
+    ar = atomicspadl.config.actiontypes
+    next_actions = actions.shift(-1)
+    same_team = actions.team_id == next_actions.team_id
+    samegame = actions.game_id == next_actions.game_id
+    sameperiod = actions.period_id == next_actions.period_id
+    # samephase = next_actions.time_seconds - actions.time_seconds < max_pass_duration
+    extra_idx = (
+        actions.type_id.isin(atomicbase._pass_ids)
+        & samegame
+        & sameperiod  # & samephase
+        & ~next_actions.type_id.isin(atomicbase._interception_ids)
+    )
+    prev = actions[extra_idx]
+    nex = next_actions[extra_idx]
+
+    extra = pd.DataFrame()
+    extra['game_id'] = prev.game_id
+    extra['original_event_id'] = prev.original_event_id
+    extra['period_id'] = prev.period_id
+    extra['time_seconds'] = (prev.time_seconds + nex.time_seconds) / 2
+    extra['start_x'] = prev.end_x
+    extra['start_y'] = prev.end_y
+    extra['end_x'] = prev.end_x
+    extra['end_y'] = prev.end_y
+    extra['bodypart_id'] = atomicspadl.config.bodyparts.index('foot')
+    extra['result_id'] = -1
+
+    offside = prev.result_id == spadlconfig.results.index('offside')
+    out = ((nex.type_id == ar.index('goalkick')) & (~same_team)) | (
+        nex.type_id == ar.index('throw_in')
+    )
+    extra['type_id'] = -1
+    extra['type_id'] = (
+        extra.type_id.mask(same_team, ar.index('receival'))
+        .mask(~same_team, ar.index('interception'))
+        .mask(out, ar.index('out'))
+        .mask(offside, ar.index('offside'))
+    )
+    out_or_offside = out | offside
+    is_interception = extra['type_id'] == ar.index('interception')
+    extra['team_id'] = prev.team_id.mask(is_interception, nex.team_id)
+    extra['player_id'] = nex.player_id.mask(out_or_offside, prev.player_id).astype(
+        prev.player_id.dtype
+    )
+
+    return _interleave(actions, extra, np.flatnonzero(extra_idx))
+
+
+def _extra_from_shots(actions: pd.DataFrame) -> pd.DataFrame:
+    """Insert the goal, owngoal or out after each shot."""
+    next_actions = actions.shift(-1)
+
+    samegame = actions.game_id == next_actions.game_id
+    sameperiod = actions.period_id == next_actions.period_id
+
+    shot = actions.type_id.isin(atomicbase._shot_ids)
+    goal = shot & (actions.result_id == spadlconfig.results.index('success'))
+    owngoal = actions.result_id == spadlconfig.results.index('owngoal')
+    out = shot & next_actions.type_id.isin(atomicbase._restart_ids) & samegame & sameperiod
+
+    extra_idx = goal | owngoal | out
+    prev = actions[extra_idx]
+    # nex = next_actions[extra_idx]
+
+    extra = pd.DataFrame()
+    extra['game_id'] = prev.game_id
+    extra['original_event_id'] = prev.original_event_id
+    extra['period_id'] = prev.period_id
+    extra['time_seconds'] = prev.time_seconds  # + nex.time_seconds) / 2
+    extra['start_x'] = prev.end_x
+    extra['start_y'] = prev.end_y
+    extra['end_x'] = prev.end_x
+    extra['end_y'] = prev.end_y
+    extra['bodypart_id'] = prev.bodypart_id
+    extra['result_id'] = -1
+    extra['team_id'] = prev.team_id
+    extra['player_id'] = prev.player_id
+
+    ar = atomicspadl.config.actiontypes
+    extra['type_id'] = -1
+    extra['type_id'] = (
+        extra.type_id.mask(out, ar.index('out'))
+        .mask(goal, ar.index('goal'))
+        .mask(owngoal, ar.index('owngoal'))
+    )
+    return _interleave(actions, extra, np.flatnonzero(extra_idx))
+
+
+def _extra_from_fouls(actions: pd.DataFrame) -> pd.DataFrame:
+    """Insert the card after each foul."""
+    yellow = actions.result_id == spadlconfig.results.index('yellow_card')
+    red = actions.result_id == spadlconfig.results.index('red_card')
+
+    extra_idx = yellow | red
+    prev = actions[extra_idx]
+    extra = pd.DataFrame()
+    extra['game_id'] = prev.game_id
+    extra['original_event_id'] = prev.original_event_id
+    extra['period_id'] = prev.period_id
+    extra['time_seconds'] = prev.time_seconds  # + nex.time_seconds) / 2
+    extra['start_x'] = prev.end_x
+    extra['start_y'] = prev.end_y
+    extra['end_x'] = prev.end_x
+    extra['end_y'] = prev.end_y
+    extra['bodypart_id'] = prev.bodypart_id
+    extra['result_id'] = -1
+    extra['team_id'] = prev.team_id
+    extra['player_id'] = prev.player_id
+
+    ar = atomicspadl.config.actiontypes
+    extra['type_id'] = -1
+    extra['type_id'] = extra.type_id.mask(yellow, ar.index('yellow_card')).mask(
+        red, ar.index('red_card')
+    )
+    return _interleave(actions, extra, np.flatnonzero(extra_idx))
+
+
+def _convert_columns(actions: pd.DataFrame) -> pd.DataFrame:
+    """Convert the start and end location into a location and a displacement."""
+    actions['x'] = actions.start_x
+    actions['y'] = actions.start_y
+    actions['dx'] = actions.end_x - actions.start_x
+    actions['dy'] = actions.end_y - actions.start_y
+    return actions[
+        [
+            'game_id',
+            'original_event_id',
+            'action_id',
+            'period_id',
+            'time_seconds',
+            'team_id',
+            'player_id',
+            'x',
+            'y',
+            'dx',
+            'dy',
+            'type_id',
+            'bodypart_id',
+        ]
+    ]
+
+
+def _simplify(actions: pd.DataFrame) -> pd.DataFrame:
+    """Merge the corner and freekick types."""
+    a = actions
+    ar = atomicspadl.config.actiontypes
+
+    a['type_id'] = a.type_id.mask(a.type_id.isin(atomicbase._corner_ids), ar.index('corner'))
+    a['type_id'] = a.type_id.mask(a.type_id.isin(atomicbase._freekick_ids), ar.index('freekick'))
+    return a
+
+
+def test_convert_to_atomic(spadl_actions: DataFrame[SPADLSchema]) -> None:
+    rng = np.random.default_rng(0)
+    games = []
+    for game_id in range(20):
+        game = spadl_actions.assign(game_id=game_id)
+        if game_id % 2:
+            game['team_id'] = rng.choice(game.team_id.unique(), 200)
+        # add cards, owngoals, offsides and other types of actions
+        game['result_id'] = np.where(
+            rng.random(200) < 0.2, rng.integers(0, 6, 200), game.result_id
+        )
+        game['type_id'] = np.where(rng.random(200) < 0.2, rng.integers(0, 23, 200), game.type_id)
+        # move the start of the actions away from the end of the previous action
+        game['start_x'] = np.clip(game.start_x + rng.normal(0, 5, 200), 0, 105)
+        games.append(game)
+    actions = pd.concat(games, ignore_index=True)
+    expected = actions.copy()
+    for step in [
+        _extra_from_passes,
+        _add_dribbles,
+        _extra_from_shots,
+        _extra_from_fouls,
+        _convert_columns,
+        _simplify,
+    ]:
+        expected = step(expected)
+    expected = cast_actions(expected.pipe(DataFrame[AtomicSPADLSchema]))
+    actual = atomicspadl.convert_to_atomic(actions)
+    extra_types = ['receival', 'out', 'offside', 'goal', 'owngoal', 'yellow_card', 'red_card']
+    assert set(actual.type_id) >= {atomicspadl.config.actiontypes.index(t) for t in extra_types}
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_convert_to_atomic_many_games(spadl_actions: DataFrame[SPADLSchema]) -> None:
+    # the second game ends with a pass that would be received in the third game
+    games = [
+        spadl_actions.assign(game_id=1),
+        spadl_actions.iloc[:-1].assign(game_id=2),
+        spadl_actions.assign(game_id=3, team_id=spadl_actions.team_id.iloc[::-1].values),
+    ]
+    expected = pd.concat(
+        [atomicspadl.convert_to_atomic(game) for game in games], ignore_index=True
+    )
+    actual = atomicspadl.convert_to_atomic(pd.concat(games, ignore_index=True))
+    pd.testing.assert_frame_equal(actual, expected)
+    for _, game in actual.groupby('game_id'):
+        assert game.action_id.tolist() == list(range(len(game)))
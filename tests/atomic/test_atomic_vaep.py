@@ -1,8 +1,10 @@
+import numpy as np
 import pandas as pd
 import pytest
 
 import socceraction.atomic.spadl as atomicspadl
 import socceraction.atomic.spadl.config as spadlconfig
+import socceraction.atomic.vaep.formula as vaep
 import socceraction.atomic.vaep.labels as lab
 from socceraction.atomic.vaep import AtomicVAEP
 from socceraction.atomic.vaep import features as fs
@@ -60,3 +62,19 @@ def test_predict(sb_worldcup_data: pd.HDFStore) -> None:
     ratings = model.rate(game, actions)
     expected_rating_columns = {'offensive_value', 'defensive_value', 'vaep_value'}
     assert set(ratings.columns) == expected_rating_columns
+
+
+def test_formula_respects_game_boundaries(atomic_spadl_actions: pd.DataFrame) -> None:
+    actions = atomicspadl.add_names(atomic_spadl_actions)
+    rng = np.random.default_rng(0)
+    p_scores = pd.Series(rng.random(len(actions)))
+    p_concedes = pd.Series(rng.random(len(actions)))
+    season = pd.concat([actions, actions.assign(game_id=0)], ignore_index=True)
+    season_values = vaep.value(
+        season,
+        pd.concat([p_scores] * 2, ignore_index=True),
+        pd.concat([p_concedes] * 2, ignore_index=True),
+    )
+    game_values = vaep.value(actions, p_scores, p_concedes)
+    np.testing.assert_allclose(season_values.values[: len(actions)], game_values.values)
+    np.testing.assert_allclose(season_values.values[len(actions) :], game_values.values)
@@ -1,6 +1,8 @@
 """Configuration for pytest."""
 import os
+from typing import Tuple
 
+import numpy as np
 import pandas as pd
 import pytest
 from _pytest.config import Config
@@ -8,6 +10,7 @@ from pandera.typing import DataFrame
 
 from socceraction.atomic.spadl import AtomicSPADLSchema
 from socceraction.spadl import SPADLSchema
+from socceraction.vaep import VAEP
 
 
 def pytest_configure(config: Config) -> None:
@@ -25,3 +28,28 @@ def spadl_actions() -> DataFrame[SPADLSchema]:
 def atomic_spadl_actions() -> DataFrame[AtomicSPADLSchema]:
     json_file = os.path.join(os.path.dirname(__file__), 'datasets', 'spadl', 'atomic_spadl.json')
     return pd.read_json(json_file, orient='records')
+
+
+@pytest.fixture(scope='session')
+def spadl_game(spadl_actions: DataFrame[SPADLSchema]) -> pd.Series:
+    return pd.Series({'game_id': 8657, 'home_team_id': spadl_actions.team_id.iloc[0]})
+
+
+@pytest.fixture(scope='module')
+def vaep_training_data(
+    spadl_game: pd.Series, spadl_actions: DataFrame[SPADLSchema]
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """The features of the test game and random labels."""
+    X = VAEP(nb_prev_actions=3).compute_features(spadl_game, spadl_actions)
+    rng = np.random.default_rng(0)
+    y = pd.DataFrame({'scores': rng.random(len(X)) < 0.3, 'concedes': rng.random(len(X)) < 0.3})
+    return X, y
+
+
+@pytest.fixture(scope='module')
+def fitted_vaep(vaep_training_data: Tuple[pd.DataFrame, pd.DataFrame]) -> VAEP:
+    """A VAEP model with three previous actions, fitted on the test game."""
+    model = VAEP(nb_prev_actions=3)
+    X, y = vaep_training_data
+    model.fit(X, y, tree_params=dict(n_estimators=5, max_depth=2), fit_params={}, val_size=0)
+    return model
@@ -1,4 +1,5 @@
 import os
+from typing import Any, Dict, Tuple
 
 import pandas as pd
 import pytest
@@ -11,6 +12,97 @@ from socceraction.spadl import SPADLSchema
 from socceraction.spadl import opta as opta
 
 
+def _get_bodypart_id(qualifiers: Dict[int, Any]) -> int:
+    """Row-wise reference for the bodypart rules of opta._parse_events."""
+    if 15 in qualifiers:
+        b = 'head'
+    elif 21 in qualifiers:
+        b = 'other'
+    else:
+        b = 'foot'
+    return spadlcfg.bodyparts.index(b)
+
+
+def _get_result_id(args: Tuple[str, bool, Dict[int, Any]]) -> int:
+    """Row-wise reference for the result rules of opta._parse_events."""
+    e, outcome, q = args
+    if e == 'offside pass':
+        r = 'offside'  # offside
+    elif e == 'foul':
+        r = 'fail'
+    elif e in ['attempt saved', 'miss', 'post']:
+        r = 'fail'
+    elif e == 'goal':
+        if 28 in q:
+            r = 'owngoal'  # own goal, x and y must be switched
+        else:
+            r = 'success'
+    elif e == 'ball touch':
+        r = 'fail'
+    elif outcome:
+        r = 'success'
+    else:
+        r = 'fail'
+    return spadlcfg.results.index(r)
+
+
+def _get_type_id(args: Tuple[str, bool, Dict[int, Any]]) -> int:  # noqa: C901
+    """Row-wise reference for the type rules of opta._parse_events."""
+    eventname, outcome, q = args
+    if eventname in ('pass', 'offside pass'):
+        cross = 2 in q
+        freekick = 5 in q
+        corner = 6 in q
+        throw_in = 107 in q
+        goalkick = 124 in q
+        if throw_in:
+            a = 'throw_in'
+        elif freekick and cross:
+            a = 'freekick_crossed'
+        elif freekick:
+            a = 'freekick_short'
+        elif corner and cross:
+            a = 'corner_crossed'
+        elif corner:
+            a = 'corner_short'
+        elif cross:
+            a = 'cross'
+        elif goalkick:
+            a = 'goalkick'
+        else:
+            a = 'pass'
+    elif eventname == 'take on':
+        a = 'take_on'
+    elif eventname == 'foul' and outcome is False:
+        a = 'foul'
+    elif eventname == 'tackle':
+        a = 'tackle'
+    elif eventname in ('interception', 'blocked pass'):
+        a = 'interception'
+    elif eventname in ['miss', 'post', 'attempt saved', 'goal']:
+        if 9 in q:
+            a = 'shot_penalty'
+        elif 26 in q:
+            a = 'shot_freekick'
+        else:
+            a = 'shot'
+    elif eventname == 'save':
+        a = 'keeper_save'
+    elif eventname == 'claim':
+        a = 'keeper_claim'
+    elif eventname == 'punch':
+        a = 'keeper_punch'
+    elif eventname == 'keeper pick-up':
+        a = 'keeper_pick_up'
+    elif eventname == 'clearance':
+        a = 'clearance'
+    elif eventname == 'ball touch' and outcome is False:
+        a = 'bad_touch'
+    else:
+        a = 'non_action'
+    return spadlcfg.actiontypes.index(a)
+
+
 class TestSpadlConvertor:
     def setup_method(self) -> None:
         data_dir = os.path.join(os.path.dirname(__file__), os.pardir, 'datasets', 'opta')
@@ -33,6 +125,28 @@ class TestSpadlConvertor:
         assert (df_actions.game_id == 1009316).all()
         assert ((df_actions.team_id == 174) | (df_actions.team_id == 957)).all()
 
+    def test_parse_events(self) -> None:
+        # an object outcome column, with missing outcomes
+        outcome = self.events.outcome.astype(object).mask(self.events.index % 7 == 0)
+        for events in [self.events, self.events.assign(outcome=outcome)]:
+            cols = events[['type_name', 'outcome', 'qualifiers']]
+            type_id, result_id, bodypart_id = opta._parse_events(events)
+            assert (type_id == cols.apply(_get_type_id, axis=1).values).all()
+            assert (result_id == cols.apply(_get_result_id, axis=1).values).all()
+            assert (bodypart_id == events.qualifiers.apply(_get_bodypart_id).values).all()
+
+    def test_qualifier_matrix(self) -> None:
+        qualifiers = pd.Series([{2: True, 140: '73.0'}, {}, None, {15: True}])
+        matrix = opta._qualifier_matrix(qualifiers)
+        assert matrix.shape == (4, 141)
+        mask = opta._has_qualifiers(matrix, [15, 2, 500])
+        assert mask.tolist() == [
+            [False, True, False],
+            [False, False, False],
+            [False, False, False],
+            [True, False, False],
+        ]
+
     def test_convert_goalkick(self) -> None:
         event = pd.DataFrame(
             [
@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+from socceraction.spadl.base import _interleave
+
+
+def test_interleave() -> None:
+    actions = pd.DataFrame(
+        {'game_id': [1, 1, 1, 2, 2], 'action_id': [0, 1, 2, 0, 1], 'name': list('abcde')}
+    )
+    extra = pd.DataFrame({'game_id': [1, 1, 1, 2], 'name': ['a1', 'a2', 'c1', 'e1']})
+    actual = _interleave(actions, extra, np.array([0, 0, 2, 4]))
+    assert actual.name.tolist() == ['a', 'a1', 'a2', 'b', 'c', 'c1', 'd', 'e', 'e1']
+    assert actual.action_id.tolist() == [0, 1, 2, 3, 4, 5, 0, 1, 2]
+    assert list(actual.index) == list(range(9))
+    # nothing to insert
+    pd.testing.assert_frame_equal(_interleave(actions, extra.iloc[:0], np.array([], int)), actions)
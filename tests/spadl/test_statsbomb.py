@@ -1,5 +1,9 @@
+import itertools
 import os
+from typing import Any, Dict, List, Tuple
 
+import numpy as np
+import pandas as pd
 import pytest
 
 from socceraction.data.statsbomb import StatsBombLoader
@@ -99,3 +103,390 @@ class TestSpadlConvertor:
         assert own_goal_against_actions.iloc[0]['type_id'] == spadl.actiontypes.index('bad_touch')
         assert own_goal_against_actions.iloc[0]['result_id'] == spadl.results.index('owngoal')
         assert own_goal_against_actions.iloc[0]['bodypart_id'] == spadl.bodyparts.index('foot')
+
+
+def _parse_event(q: Tuple[str, Dict[str, Any]]) -> Tuple[int, int, int]:
+    """Parse a single event with the row-wise rules that sb._parse_events replaced."""
+    t, x = q
+    events = {
+        'Pass': _parse_pass_event,
+        'Dribble': _parse_dribble_event,
+        'Carry': _parse_carry_event,
+        'Foul Committed': _parse_foul_event,
+        'Duel': _parse_duel_event,
+        'Interception': _parse_interception_event,
+        'Shot': _parse_shot_event,
+        'Own Goal Against': _parse_own_goal_event,
+        'Goal Keeper': _parse_goalkeeper_event,
+        'Clearance': _parse_clearance_event,
+        'Miscontrol': _parse_miscontrol_event,
+    }
+    parser = events.get(t, _parse_event_as_non_action)
+    a, r, b = parser(x)
+    actiontype = spadl.actiontypes.index(a)
+    result = spadl.results.index(r)
+    bodypart = spadl.bodyparts.index(b)
+    return actiontype, result, bodypart
+
+
+def _parse_event_as_non_action(_extra: Dict[str, Any]) -> Tuple[str, str, str]:
+    a = 'non_action'
+    r = 'success'
+    b = 'foot'
+    return a, r, b
+
+
+def _parse_pass_event(extra: Dict[str, Any]) -> Tuple[str, str, str]:  # noqa: C901
+
+    a = 'pass'  # default
+    p = extra.get('pass', {})
+    ptype = p.get('type', {}).get('name')
+    height = p.get('height', {}).get('name')
+    cross = p.get('cross')
+    if ptype == 'Free Kick':
+        if height == 'High Pass' or cross:
+            a = 'freekick_crossed'
+        else:
+            a = 'freekick_short'
+    elif ptype == 'Corner':
+        if height == 'High Pass' or cross:
+            a = 'corner_crossed'
+        else:
+            a = 'corner_short'
+    elif ptype == 'Goal Kick':
+        a = 'goalkick'
+    elif ptype == 'Throw-in':
+        a = 'throw_in'
+    elif cross:
+        a = 'cross'
+    else:
+        a = 'pass'
+
+    pass_outcome = extra.get('pass', {}).get('outcome', {}).get('name')
+    if pass_outcome in ['Incomplete', 'Out']:
+        r = 'fail'
+    elif pass_outcome == 'Pass Offside':
+        r = 'offside'
+    else:
+        r = 'success'
+
+    bp = extra.get('pass', {}).get('body_part', {}).get('name')
+    if bp is None:
+        b = 'foot'
+    elif 'Head' in bp:
+        b = 'head'
+    elif 'Foot' in bp or bp == 'Drop Kick':
+        b = 'foot'
+    else:
+        b = 'other'
+
+    return a, r, b
+
+
+def _parse_dribble_event(extra: Dict[str, Any]) -> Tuple[str, str, str]:
+    a = 'take_on'
+
+    dribble_outcome = extra.get('dribble', {}).get('outcome', {}).get('name')
+    if dribble_outcome == 'Incomplete':
+        r = 'fail'
+    elif dribble_outcome == 'Complete':
+        r = 'success'
+    else:
+        r = 'success'
+
+    b = 'foot'
+
+    return a, r, b
+
+
+def _parse_carry_event(_extra: Dict[str, Any]) -> Tuple[str, str, str]:
+    a = 'dribble'
+    r = 'success'
+    b = 'foot'
+    return a, r, b
+
+
+def _parse_foul_event(extra: Dict[str, Any]) -> Tuple[str, str, str]:
+    a = 'foul'
+
+    foul_card = extra.get('foul_committed', {}).get('card', {}).get('name', '')
+    if 'Yellow' in foul_card:
+        r = 'yellow_card'
+    elif 'Red' in foul_card:
+        r = 'red_card'
+    else:
+        r = 'success'
+
+    b = 'foot'
+
+    return a, r, b
+
+
+def _parse_duel_event(extra: Dict[str, Any]) -> Tuple[str, str, str]:
+    if extra.get('duel', {}).get('type', {}).get('name') == 'Tackle':
+        a = 'tackle'
+        duel_outcome = extra.get('duel', {}).get('outcome', {}).get('name')
+        if duel_outcome in ['Lost In Play', 'Lost Out']:
+            r = 'fail'
+        elif duel_outcome in ['Success in Play', 'Won']:
+            r = 'success'
+        else:
+            r = 'success'
+
+        b = 'foot'
+        return a, r, b
+    return _parse_event_as_non_action(extra)
+
+
+def _parse_interception_event(extra: Dict[str, Any]) -> Tuple[str, str, str]:
+    a = 'interception'
+    interception_outcome = extra.get('interception', {}).get('outcome', {}).get('name')
+    if interception_outcome in ['Lost In Play', 'Lost Out']:
+        r = 'fail'
+    elif interception_outcome == 'Won':
+        r = 'success'
+    else:
+        r = 'success'
+    b = 'foot'
+    return a, r, b
+
+
+def _parse_shot_event(extra: Dict[str, Any]) -> Tuple[str, str, str]:
+    extra_type = extra.get('shot', {}).get('type', {}).get('name')
+    if extra_type == 'Free Kick':
+        a = 'shot_freekick'
+    elif extra_type == 'Penalty':
+        a = 'shot_penalty'
+    else:
+        a = 'shot'
+
+    shot_outcome = extra.get('shot', {}).get('outcome', {}).get('name')
+    if shot_outcome == 'Goal':
+        r = 'success'
+    elif shot_outcome in ['Blocked', 'Off T', 'Post', 'Saved', 'Wayward']:
+        r = 'fail'
+    else:
+        r = 'fail'
+
+    bp = extra.get('shot', {}).get('body_part', {}).get('name')
+    if bp is None:
+        b = 'foot'
+    elif 'Head' in bp:
+        b = 'head'
+    elif 'Foot' in bp or bp == 'Drop Kick':
+        b = 'foot'
+    else:
+        b = 'other'
+
+    return a, r, b
+
+
+def _parse_own_goal_event(_extra: Dict[str, Any]) -> Tuple[str, str, str]:
+    a = 'bad_touch'
+    r = 'owngoal'
+    b = 'foot'
+    return a, r, b
+
+
+def _parse_goalkeeper_event(extra: Dict[str, Any]) -> Tuple[str, str, str]:  # noqa: C901
+    extra_type = extra.get('goalkeeper', {}).get('type', {}).get('name')
+    if extra_type == 'Shot Saved':
+        a = 'keeper_save'
+    elif extra_type in ('Collected', 'Keeper Sweeper'):
+        a = 'keeper_claim'
+    elif extra_type == 'Punch':
+        a = 'keeper_punch'
+    else:
+        a = 'non_action'
+
+    goalkeeper_outcome = extra.get('goalkeeper', {}).get('outcome', {}).get('name', 'x')
+    if goalkeeper_outcome in [
+        'Claim',
+        'Clear',
+        'Collected Twice',
+        'In Play Safe',
+        'Success',
+        'Touched Out',
+    ]:
+        r = 'success'
+    elif goalkeeper_outcome in ['In Play Danger', 'No Touch']:
+        r = 'fail'
+    else:
+        r = 'success'
+
+    bp = extra.get('goalkeeper', {}).get('body_part', {}).get('name')
+    if bp is None:
+        b = 'foot'
+    elif 'Head' in bp:
+        b = 'head'
+    elif 'Foot' in bp or bp == 'Drop Kick':
+        b = 'foot'
+    else:
+        b = 'other'
+
+    return a, r, b
+
+
+def _parse_clearance_event(_extra: Dict[str, Any]) -> Tuple[str, str, str]:
+    a = 'clearance'
+    r = 'success'
+    b = 'foot'
+    return a, r, b
+
+
+def _parse_miscontrol_event(_extra: Dict[str, Any]) -> Tuple[str, str, str]:
+    a = 'bad_touch'
+    r = 'fail'
+    b = 'foot'
+    return a, r, b
+
+
+# the fields in the extra column of each event type and the values to combine
+_extra_fields: Dict[str, Tuple[str, Dict[str, List[Any]]]] = {
+    'Pass': (
+        'pass',
+        {
+            'type': [None, 'Free Kick', 'Corner', 'Goal Kick', 'Throw-in', 'Kick Off'],
+            'height': [None, 'High Pass', 'Ground Pass'],
+            'cross': [None, True],
+            'outcome': [None, 'Incomplete', 'Out', 'Pass Offside', 'Unknown'],
+            'body_part': [None, 'Head', 'Left Foot', 'Drop Kick', 'Other', 'No Touch'],
+        },
+    ),
+    'Dribble': ('dribble', {'outcome': [None, 'Incomplete', 'Complete']}),
+    'Foul Committed': (
+        'foul_committed',
+        {'card': [None, 'Yellow Card', 'Second Yellow', 'Red Card']},
+    ),
+    'Duel': (
+        'duel',
+        {
+            'type': ['Tackle', 'Aerial Lost'],
+            'outcome': [None, 'Lost In Play', 'Lost Out', 'Won', 'Success in Play'],
+        },
+    ),
+    'Interception': (
+        'interception',
+        {'outcome': [None, 'Lost In Play', 'Won', 'Success In Play']},
+    ),
+    'Shot': (
+        'shot',
+        {
+            'type': [None, 'Free Kick', 'Penalty', 'Open Play'],
+            'outcome': [None, 'Goal', 'Saved'],
+            'body_part': [None, 'Head', 'Right Foot', 'Other'],
+        },
+    ),
+    'Goal Keeper': (
+        'goalkeeper',
+        {
+            'type': [None, 'Shot Saved', 'Collected', 'Keeper Sweeper', 'Punch', 'Smother'],
+            'outcome': [None, 'Claim', 'In Play Danger', 'No Touch'],
+            'body_part': [None, 'Both Hands', 'Head'],
+        },
+    ),
+    'Carry': ('carry', {}),
+    'Own Goal Against': ('own_goal_against', {}),
+    'Clearance': ('clearance', {}),
+    'Miscontrol': ('miscontrol', {}),
+    'Pressure': ('pressure', {}),
+}
+
+
+def _extra(key: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+    # flags are stored as is, the other fields by their name
+    details = {f: v if isinstance(v, bool) else {'name': v} for f, v in fields.items()}
+    return {key: {f: v for f, v in details.items() if fields[f] is not None}}
+
+
+def _synthetic_events() -> pd.DataFrame:
+    """Events that cover each branch of the StatsBomb event parsers."""
+    samples = [
+        (type_name, _extra(key, dict(zip(fields, values))))
+        for type_name, (key, fields) in _extra_fields.items()
+        for values in itertools.product(*fields.values())
+    ]
+    rng = np.random.default_rng(0)
+
+    def location(dims: int = 2) -> Any:
+        # some locations are missing or outside of the pitch
+        if rng.random() < 0.05:
+            return None
+        return [float(rng.integers(-5, 126)), float(rng.integers(-5, 86)), 1.0][:dims]
+
+    for type_name, extra in samples:
+        key = {'Pass': 'pass', 'Shot': 'shot', 'Carry': 'carry'}.get(type_name)
+        if key is not None and rng.random() < 0.9:
+            extra.setdefault(key, {})['end_location'] = location(3 if key == 'shot' else 2)
+
+    n = len(samples)
+    player_id = rng.integers(1, 22, n).astype(float)
+    player_id[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame(
+        {
+            'game_id': 1,
+            'event_id': [f'e{i}' for i in range(n)],
+            'period_id': 1,
+            'minute': np.arange(n) // 60,
+            'second': np.arange(n) % 60,
+            'team_id': rng.choice([1, 2], n),
+            'player_id': player_id,
+            'type_name': [t for t, _ in samples],
+            'location': [location() for _ in samples],
+            'extra': [x for _, x in samples],
+        }
+    )
+
+
+def test_parse_events_by_type() -> None:
+    events = _synthetic_events()
+    expected = events[['type_name', 'extra']].apply(_parse_event, axis=1, result_type='expand')
+    type_id, result_id, bodypart_id = sb._parse_events(events)
+    np.testing.assert_array_equal(type_id, expected[0].values)
+    np.testing.assert_array_equal(result_id, expected[1].values)
+    np.testing.assert_array_equal(bodypart_id, expected[2].values)
+    assert len(set(type_id)) > 15
+
+
+def test_convert_synthetic_events() -> None:
+    events = _synthetic_events()
+    actions = sb.convert_to_actions(events, 1)
+    SPADLSchema.validate(actions)
+    assert (actions.type_id != spadl.actiontypes.index('non_action')).all()
+
+
+def _get_end_location(q: Tuple[List[float], Dict[str, Any]]) -> List[float]:
+    """Find the end location of a single event with the rule that sb._end_locations replaced."""
+    start_location, extra = q
+    for event in ['pass', 'shot', 'carry']:
+        if event in extra and 'end_location' in extra[event]:
+            return extra[event]['end_location']
+    return start_location
+
+
+def test_decode_locations() -> None:
+    events = _synthetic_events()
+    start, missing = sb._decode_locations(events.location.values)
+    assert missing.sum() == events.location.isna().sum()
+    start[missing] = 1
+    end = sb._end_locations(events.extra.values, start)
+    expected_end = events.fillna(0)[['location', 'extra']].apply(_get_end_location, axis=1)
+    for coords, expected in [(start, events.location.fillna(0)), (end, expected_end)]:
+        np.testing.assert_array_equal(coords[:, 0], expected.apply(lambda x: x[0] if x else 1))
+        np.testing.assert_array_equal(coords[:, 1], expected.apply(lambda x: x[1] if x else 1))
+
+
+def test_convert_to_actions_many() -> None:
+    # each game ends with a clearance
+    game = _synthetic_events().iloc[:-2]
+    games = pd.concat([game, game.assign(game_id=2), game.assign(game_id=3)], ignore_index=True)
+    home_team_ids = {1: 1, 2: 2, 3: 1}
+    actions = sb.convert_to_actions_many(games, home_team_ids)
+    expected = pd.concat(
+        [sb.convert_to_actions(game.assign(game_id=g), h) for g, h in home_team_ids.items()],
+        ignore_index=True,
+    )
+    pd.testing.assert_frame_equal(actions, expected)
+    assert (actions.groupby('game_id').action_id.min() == 0).all()
+    with pytest.raises(ValueError):
+        sb.convert_to_actions_many(games, {1: 1, 2: 2})
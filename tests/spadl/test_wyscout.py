@@ -1,6 +1,9 @@
 import os
+from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
+import pytest
 
 from socceraction.data.wyscout import PublicWyscoutLoader
 from socceraction.spadl import SPADLSchema
@@ -214,3 +217,122 @@ class TestSpadlConvertor:
         assert len(actions) == 3
         assert actions.at[2, 'type_id'] == spadl.actiontypes.index('take_on')
         assert actions.at[2, 'result_id'] == spadl.results.index('fail')
+
+
+def test_get_tagsdf() -> None:
+    events = pd.DataFrame(
+        {'tags': [[{'id': 101}, {'id': 1801}], [], [{'id': 9999}, {'id': 1802}]]},
+        index=[10, 20, 30],
+    )
+    tagsdf = wy.get_tagsdf(events)
+    assert list(tagsdf.columns) == [col for _, col in wy.wyscout_tags]
+    assert list(tagsdf.index) == [10, 20, 30]
+    assert tagsdf.sum().sum() == 3
+    assert tagsdf.loc[10, 'goal'] and tagsdf.loc[10, 'accurate']
+    assert tagsdf.loc[30, 'not_accurate']
+    bitset = wy.get_tag_bitset(events)
+    assert bitset.dtype == 'uint64'
+    for col in tagsdf.columns:
+        pd.testing.assert_series_equal(wy.has_tag(bitset, col), tagsdf[col], check_names=False)
+
+
+def test_decision_tables() -> None:
+    rng = np.random.default_rng(0)
+    n = 2000
+    subtypes = [np.nan, 0, 10, 11, 12, 13, 21, 22, 23, 24, 26, 30, 31, 32, 33, 34, 35, 36, 70]
+    subtypes += [71, 72, 80, 81, 82, 85, 90, 91, 100]
+    events = pd.DataFrame(
+        {
+            'type_id': rng.choice([1, 2, 3, 5, 6, 7, 8, 9, 10], n),
+            'subtype_id': rng.choice(subtypes, n),
+            'offside': rng.choice([0, 1, np.nan], n),
+        }
+    )
+    for _, col in wy.wyscout_tags:
+        events[col] = rng.random(n) < 0.1
+    # the tags of inserted events may be missing
+    events['high'] = events['high'].astype(object).mask(rng.random(n) < 0.1)
+
+    with pytest.deprecated_call():
+        bodypart_id = events.apply(wy.determine_bodypart_id, axis=1)
+        type_id = events.apply(wy.determine_type_id, axis=1)
+        result_id = events.apply(wy.determine_result_id, axis=1)
+    np.testing.assert_array_equal(wy._determine_bodypart_ids(events), bodypart_id)
+    np.testing.assert_array_equal(wy._determine_type_ids(events), type_id)
+    np.testing.assert_array_equal(wy._determine_result_ids(events), result_id)
+    assert type_id.nunique() > 15
+
+
+def _make_position_vars(event_id: int, positions: List[Dict[str, Optional[float]]]) -> pd.Series:
+    """Row-wise reference for the position rules of wy.make_new_positions."""
+    if len(positions) == 2:  # if less than 2 then action is removed
+        start_x = positions[0]["x"]
+        start_y = positions[0]["y"]
+        end_x = positions[1]["x"]
+        end_y = positions[1]["y"]
+    elif len(positions) == 1:
+        start_x = positions[0]["x"]
+        start_y = positions[0]["y"]
+        end_x = start_x
+        end_y = start_y
+    else:
+        start_x = None
+        start_y = None
+        end_x = None
+        end_y = None
+    return pd.Series([event_id, start_x, start_y, end_x, end_y])
+
+
+def test_make_new_positions() -> None:
+    positions = [
+        [{'x': 10, 'y': 20}, {'x': 30, 'y': 40}],
+        [{'x': 50, 'y': 60}],
+        [],
+        [{'x': 1, 'y': 2}, {'x': 3, 'y': 4}, {'x': 5, 'y': 6}],
+        [{'x': 70.5, 'y': 80}, {'x': 90, 'y': 100}],
+    ]
+    events = pd.DataFrame({'id': range(5), 'positions': positions}, index=[5, 4, 3, 2, 1])
+    expected = pd.DataFrame(
+        [_make_position_vars(*args) for args in zip(events.id, events.positions)]
+    ).astype(float)
+    expected.columns = ['id', 'start_x', 'start_y', 'end_x', 'end_y']
+    actual = wy.make_new_positions(events)
+    assert list(actual.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(actual.iloc[:, 1:], expected.iloc[:, 1:])
+    # integer coordinates are kept when all events have a position
+    actual = wy.make_new_positions(events.iloc[:2])
+    assert actual.start_x.tolist() == [10, 50] and actual.end_y.tolist() == [40, 60]
+    assert actual.start_x.dtype == 'int64'
+
+
+def test_convert_to_actions_many() -> None:
+    def event(game_id: int, event_id: int, type_id: int, subtype_id: int, team_id: int) -> dict:
+        return {
+            'type_id': type_id,
+            'subtype_id': subtype_id,
+            'tags': [{'id': 1801}],
+            'player_id': team_id * 10 + event_id % 2,
+            'positions': [{'y': 50, 'x': 50}, {'y': 50, 'x': 50}],
+            'game_id': game_id,
+            'team_id': team_id,
+            'period_id': 1 if event_id < 2 else 2,
+            'milliseconds': 1000.0 * event_id,
+            'event_id': game_id * 100 + event_id,
+        }
+
+    # the last event of the first game is a touch that would be converted to a
+    # pass to the first event of the second game
+    games = pd.DataFrame(
+        [event(1, i, 8, 85, 1) for i in range(3)]
+        + [event(1, 3, 7, 72, 1)]
+        + [event(2, i, 8, 85, 2) for i in range(3)]
+    )
+    home_team_ids = {1: 1, 2: 2}
+    # the events of a game do not have to be consecutive
+    actions = wy.convert_to_actions_many(games.iloc[[4, 0, 1, 5, 2, 3, 6]], home_team_ids)
+    expected = pd.concat(
+        [wy.convert_to_actions(games[games.game_id == g], h) for g, h in home_team_ids.items()],
+        ignore_index=True,
+    )
+    pd.testing.assert_frame_equal(actions, expected)
+    assert actions.action_id.tolist() == [0, 1, 2, 0, 1, 2]
@@ -0,0 +1,242 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from socceraction.spadl import SPADLSchema
+from socceraction.spadl import config as spadlconfig
+from socceraction.spadl import wyscout_v3 as wy
+
+
+def _events(n: int = 2000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    type_primary = [
+        'pass',
+        'throw_in',
+        'corner',
+        'free_kick',
+        'infraction',
+        'penalty',
+        'touch',
+        'interception',
+        'shot',
+        'goal_kick',
+        'clearance',
+        'duel',
+        'acceleration',
+    ]
+
+    def flag(missing: bool = False) -> np.ndarray:
+        values = rng.choice([0, 1], n).astype(float)
+        if missing:
+            values[rng.random(n) < 0.2] = np.nan
+        return values
+
+    def outcome() -> np.ndarray:
+        return rng.choice(np.array([True, False, np.nan], dtype=object), n)
+
+    return pd.DataFrame(
+        {
+            'type_primary': rng.choice(type_primary, n),
+            'type_save': flag(),
+            'type_hand_pass': flag(),
+            'infraction_type': rng.choice(
+                np.array(['hand_foul', 'regular_foul', 'offside', None], dtype=object), n
+            ),
+            'type_head_pass': flag(),
+            # NaN is truthy for the rule on head shots
+            'type_head_shot': flag(missing=True),
+            'type_aerial_duel': flag(),
+            'type_cross': flag(),
+            'pass_length': rng.choice([np.nan, 10.0, 25.0, 40.0], n),
+            'type_free_kick_cross': flag(),
+            'type_free_kick_shot': flag(),
+            'type_carry': flag(),
+            'offside': flag(missing=True),
+            'touch_success': outcome(),
+            'touch_fail': outcome(),
+            'acceleration_success': outcome(),
+            'acceleration_fail': outcome(),
+            'shot_is_goal': flag(missing=True),
+            'duel_success': outcome(),
+            'duel_failure': outcome(),
+            'pass_accurate': flag(missing=True),
+        }
+    )
+
+
+def test_decision_tables() -> None:
+    events = _events()
+    with pytest.deprecated_call():
+        bodypart = events.apply(wy.determine_bodypart_id, axis=1)
+        type_primary = events.apply(wy.determine_type_id, axis=1)
+        # the result is determined from the converted types
+        result = events.assign(type_primary=type_primary).apply(wy.determine_result_id, axis=1)
+    np.testing.assert_array_equal(wy._determine_bodyparts(events), bodypart)
+    np.testing.assert_array_equal(wy._determine_types(events), type_primary)
+    events['type_primary'] = type_primary
+    np.testing.assert_array_equal(wy._determine_results(events), result)
+    assert set(result) == {0, 1, 2}
+
+
+def test_create_df_actions() -> None:
+    events = _events().assign(id=range(2000))
+    expected = events.copy()
+    expected['original_event_id'] = expected['id'].astype(object)
+    with pytest.deprecated_call():
+        expected['bodypart'] = expected.apply(wy.determine_bodypart_id, axis=1)
+        expected['type_primary'] = expected.apply(wy.determine_type_id, axis=1)
+        expected['result'] = expected.apply(wy.determine_result_id, axis=1)
+    pd.testing.assert_frame_equal(wy.create_df_actions(events), expected)
+
+
+def _make_position_vars(events: pd.DataFrame) -> pd.Series:
+    """Row-wise reference for the position rules of wy.make_new_positions."""
+    if events["pass_height"] == "blocked":
+        start_x = end_x = events["location_x"]
+        start_y = end_y = events["location_y"]
+    elif events["type_primary"] in [
+        "pass",
+        "clearance",
+        "throw_in",
+        "interception",
+        "goal_kick",
+        "free_kick",
+        "corner",
+        "fairplay",
+    ]:
+        start_x = events["location_x"]
+        start_y = events["location_y"]
+        end_x = events["pass_end_location_x"]
+        end_y = events["pass_end_location_y"]
+    elif events["type_primary"] in ["touch", "duel", "acceleration", "goalkeeper_exit"]:
+        if events["type_carry"] == 1:
+            start_x = events["location_x"]
+            start_y = events["location_y"]
+            end_x = events["carry_end_location_x"]
+            end_y = events["carry_end_location_y"]
+        else:
+            start_x = events["location_x"]
+            start_y = events["location_y"]
+            end_x = None
+            end_y = None
+    else:
+        start_x = events["location_x"]
+        start_y = events["location_y"]
+        end_x = None
+        end_y = None
+    return pd.Series([events['id'], start_x, start_y, end_x, end_y])
+
+
+def test_make_new_positions() -> None:
+    events = _events().assign(
+        id=range(2000),
+        pass_height=np.resize(np.array(['blocked', 'high', None], dtype=object), 2000),
+        location_x=np.arange(2000) % 100,
+        location_y=np.arange(2000) % 50,
+        pass_end_location_x=np.arange(2000) % 90 + 0.5,
+        pass_end_location_y=np.arange(2000) % 40 + 0.5,
+        carry_end_location_x=np.arange(2000) % 80 + 0.25,
+        carry_end_location_y=np.arange(2000) % 30 + 0.25,
+    )
+    expected = events.apply(_make_position_vars, axis=1).infer_objects().astype(float)
+    expected.columns = ['id', 'start_x', 'start_y', 'end_x', 'end_y']
+    actual = wy.make_new_positions(events.set_axis(np.arange(2000) * 2))
+    assert list(actual.index) == list(range(2000))
+    pd.testing.assert_frame_equal(actual[expected.columns[1:]], expected.iloc[:, 1:])
+    assert actual.end_x.isna().any()
+
+
+def _raw_events(n: int = 2000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ids = np.arange(n) * 10 + 1000
+    type_primary = ['pass', 'touch', 'duel', 'acceleration', 'interception', 'shot']
+    type_primary += ['offside', 'game_interruption', 'fairplay', 'infraction', 'shot_against']
+
+    def flag() -> np.ndarray:
+        return rng.choice([0.0, 1.0, np.nan], n)
+
+    def coordinate() -> np.ndarray:
+        return rng.integers(0, 101, n).astype(float)
+
+    events = _events(n).drop(
+        columns=[
+            'touch_success',
+            'touch_fail',
+            'acceleration_success',
+            'acceleration_fail',
+            'duel_success',
+            'duel_failure',
+            'offside',
+        ]
+    )
+    return events.assign(
+        id=ids,
+        match_id=1,
+        match_period=np.where(np.arange(n) < n // 2, '1H', '2H'),
+        minute=np.arange(n) * 90 // n,
+        second=rng.integers(0, 60, n),
+        team_id=rng.choice([1, 2], n),
+        player_id=rng.integers(1, 30, n),
+        home_team_id=1,
+        type_primary=np.where(
+            rng.random(n) < 0.5, rng.choice(type_primary, n), events['type_primary']
+        ),
+        pass_height=rng.choice(np.array(['blocked', 'high', None], dtype=object), n),
+        location_x=rng.integers(0, 101, n),
+        location_y=rng.integers(0, 101, n),
+        pass_end_location_x=coordinate(),
+        pass_end_location_y=coordinate(),
+        carry_end_location_x=coordinate(),
+        carry_end_location_y=coordinate(),
+        shot_goal_zone=rng.choice(np.array(['gt', 'glb', 'otr', 'pr', 'bc', None]), n),
+        shot_xg=rng.random(n),
+        type_shot_assist=flag(),
+        ground_duel_related_duel_id=np.where(rng.random(n) < 0.5, ids + 10, np.nan),
+        aerial_duel_related_duel_id=np.where(rng.random(n) < 0.2, ids + 10, np.nan),
+        ground_duel_duel_type=rng.choice(np.array(['dribble', 'defensive', None]), n),
+        ground_duel_take_on=flag(),
+        ground_duel_kept_possession=flag(),
+        ground_duel_recovered_possession=flag(),
+        aerial_duel_first_touch=flag(),
+        ground_duel_progressed_with_ball=flag(),
+        ground_duel_stopped_progress=flag(),
+    )
+
+
+def test_fix_wyscout_events() -> None:
+    for seed in range(3):
+        events = wy.make_new_positions(_raw_events(seed=seed))
+        expected = events.copy()
+        for fix in [
+            wy.create_shot_coordinates,
+            wy.add_expected_assists,
+            wy.convert_duels,
+            wy.insert_interception_coordinates,
+            wy.add_offside_variable,
+            wy.convert_touches,
+            wy.convert_accelerations,
+            wy.insert_fairplay_coordinates,
+            wy.insert_coordinates_edge_cases,
+        ]:
+            expected = fix(expected)
+        actual = wy.fix_wyscout_events(events)
+        assert (actual.type_primary == 'take_on').any()
+        assert actual.touch_success.notna().any()
+        pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_convert_to_actions() -> None:
+    events = _raw_events()
+    actions = wy.convert_to_actions(events)
+    SPADLSchema.validate(actions)
+    assert list(actions.action_id) == list(range(len(actions)))
+    assert actions.period_id.tolist() == sorted(actions.period_id)
+    assert set(actions.type_id) >= {
+        spadlconfig.actiontypes.index('pass'),
+        spadlconfig.actiontypes.index('dribble'),
+        spadlconfig.actiontypes.index('take_on'),
+    }
+    assert (actions.end_x.values != actions.start_x.values).any()
+    pd.testing.assert_frame_equal(
+        wy.convert_to_actions(events.drop(columns='home_team_id'), home_team_id=1), actions
+    )
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandera.typing import DataFrame
+
+from socceraction.aggregation import RatingAggregator
+from socceraction.spadl import SPADLSchema
+
+
+@pytest.fixture
+def ratings(spadl_actions: DataFrame[SPADLSchema]) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    ratings = pd.concat([spadl_actions.assign(game_id=1), spadl_actions.assign(game_id=2)])
+    ratings['offensive_value'] = rng.random(len(ratings))
+    ratings['defensive_value'] = -rng.random(len(ratings))
+    ratings['vaep_value'] = ratings.offensive_value + ratings.defensive_value
+    return ratings.reset_index(drop=True)
+
+
+@pytest.fixture
+def player_games(ratings: pd.DataFrame) -> pd.DataFrame:
+    player_games = ratings[['game_id', 'player_id', 'team_id']].drop_duplicates()
+    return player_games.assign(minutes_played=np.where(player_games.player_id % 2, 90, 45))
+
+
+@pytest.fixture
+def games() -> pd.DataFrame:
+    return pd.DataFrame({'game_id': [1, 2], 'season_id': [2020, 2021]})
+
+
+def test_players(ratings: pd.DataFrame, player_games: pd.DataFrame, games: pd.DataFrame) -> None:
+    """It should compute the total and per-90 ratings of each player."""
+    agg = RatingAggregator().update(ratings, player_games, games)
+    players = agg.players()
+    expected = ratings.groupby('player_id').vaep_value.sum()
+    pd.testing.assert_series_equal(players.vaep_value, expected, check_names=False)
+    minutes = player_games.groupby('player_id').minutes_played.sum()
+    pd.testing.assert_series_equal(
+        players.vaep_value_per90, expected / minutes * 90, check_names=False
+    )
+    passes = ratings[ratings.type_id == 0].groupby('player_id').vaep_value.sum()
+    pd.testing.assert_series_equal(
+        players.vaep_value_pass.loc[passes.index], passes, check_names=False
+    )
+    assert (agg.players(min_minutes=100).minutes_played >= 100).all()
+    assert len(agg.players(per_season=True)) == 2 * len(players)
+
+
+def test_teams(ratings: pd.DataFrame, player_games: pd.DataFrame, games: pd.DataFrame) -> None:
+    """It should normalise team ratings by the minutes played by the team."""
+    teams = RatingAggregator().update(ratings, player_games, games).teams()
+    assert (teams.minutes_played == 180).all()
+    assert (teams.nb_games == 2).all()
+    pd.testing.assert_series_equal(
+        teams.nb_actions, ratings.groupby('team_id').size(), check_names=False, check_dtype=False
+    )
+
+
+def test_incremental_update(
+    ratings: pd.DataFrame, player_games: pd.DataFrame, games: pd.DataFrame
+) -> None:
+    """It should give the same result when games are added one at a time."""
+    expected = RatingAggregator().update(ratings, player_games, games).players(per_season=True)
+    agg = RatingAggregator()
+    for game_id in [1, 2, 2]:
+        agg.update(
+            ratings[ratings.game_id == game_id],
+            player_games[player_games.game_id == game_id],
+            games,
+        )
+    pd.testing.assert_frame_equal(
+        agg.players(per_season=True), expected, check_like=True, check_dtype=False
+    )
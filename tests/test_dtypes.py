@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandera.typing import DataFrame
+
+import socceraction.atomic.spadl as atomicspadl
+import socceraction.spadl as spadl
+from socceraction.dtypes import (
+    cast_actions,
+    cast_features,
+    dtype_policy,
+    get_dtype_policy,
+    set_dtype_policy,
+)
+from socceraction.spadl import SPADLSchema
+from socceraction.vaep import VAEP
+
+
+def test_cast_actions(spadl_actions: DataFrame[SPADLSchema]) -> None:
+    """It should convert the SPADL columns to the dtypes of the policy."""
+    actions = cast_actions(spadl.add_names(spadl_actions), 'compact')
+    assert actions.start_x.dtype == np.float32
+    assert actions.type_id.dtype == np.int8
+    assert actions.type_name.dtype == 'category'
+    assert actions.player_id.dtype == spadl_actions.player_id.dtype
+    restored = cast_actions(actions, 'default')
+    pd.testing.assert_frame_equal(spadl.add_names(spadl_actions), restored, atol=1e-4)
+    with pytest.raises(ValueError):
+        cast_actions(actions, 'tiny')
+
+
+def test_dtype_policy(spadl_actions: DataFrame[SPADLSchema]) -> None:
+    """It should apply the active policy to the output of the converters."""
+    assert get_dtype_policy() == 'default'
+    with dtype_policy('compact'):
+        assert get_dtype_policy() == 'compact'
+        assert spadl.add_names(spadl_actions).result_name.dtype == 'category'
+        atomic = atomicspadl.convert_to_atomic(spadl_actions)
+        assert atomic.x.dtype == np.float32
+        # the policy of a block does not leak into other threads
+        policies = []
+        thread = threading.Thread(target=lambda: policies.append(get_dtype_policy()))
+        thread.start()
+        thread.join()
+        assert policies == ['default']
+    assert spadl.add_names(spadl_actions).result_name.dtype == object
+    set_dtype_policy('compact')
+    try:
+        assert get_dtype_policy() == 'compact'
+    finally:
+        set_dtype_policy('default')
+
+
+def test_compact_features(spadl_actions: DataFrame[SPADLSchema]) -> None:
+    """It should compute the same features and labels with compact dtypes."""
+    model = VAEP(nb_prev_actions=2)
+    game = pd.Series({'game_id': 8657, 'home_team_id': spadl_actions.team_id.iloc[0]})
+    X = model.compute_features(game, spadl_actions)
+    y = model.compute_labels(game, spadl_actions)
+    with dtype_policy('compact'):
+        actions = cast_actions(spadl_actions)
+        X_compact = model.compute_features(game, actions)
+        y_compact = model.compute_labels(game, actions)
+    assert (X_compact.dtypes != np.float64).all()
+    pd.testing.assert_frame_equal(
+        X_compact, cast_features(X, 'compact'), check_dtype=False, atol=1e-3
+    )
+    pd.testing.assert_frame_equal(y_compact, y)
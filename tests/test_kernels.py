@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+from pandera.typing import DataFrame
+
+import socceraction.atomic.spadl as atomicspadl
+import socceraction.atomic.vaep.features as afs
+import socceraction.atomic.vaep.labels as alab
+import socceraction.spadl as spadl
+import socceraction.vaep.features as fs
+import socceraction.vaep.labels as lab
+from socceraction import kernels
+from socceraction.spadl import SPADLSchema
+from socceraction.spadl.base import _add_dribbles
+
+pytestmark = pytest.mark.skipif(not kernels.NUMBA_AVAILABLE, reason='numba is not installed')
+
+
+def _both(fn, *args):  # type: ignore
+    with kernels.use_numba(True):
+        accelerated = fn(*args)
+    with kernels.use_numba(False):
+        fallback = fn(*args)
+    return accelerated, fallback
+
+
+@pytest.fixture(scope='module')
+def season_actions(spadl_actions: DataFrame[SPADLSchema]) -> DataFrame[SPADLSchema]:
+    # three games, of which the second one has the teams swapped
+    swapped = spadl_actions.assign(team_id=spadl_actions.team_id.iloc[::-1].values)
+    games = [spadl_actions.assign(game_id=1), swapped.assign(game_id=2), spadl_actions]
+    return pd.concat(games, ignore_index=True)
+
+
+def test_use_numba() -> None:
+    assert kernels.numba_enabled()
+    with kernels.use_numba(False):
+        assert not kernels.numba_enabled()
+        assert not kernels.accelerated()
+    kernels.set_numba_enabled(False)
+    try:
+        assert not kernels.numba_enabled()
+        with kernels.use_numba():
+            assert kernels.numba_enabled()
+    finally:
+        kernels.set_numba_enabled(True)
+
+
+def test_add_dribbles(spadl_actions: DataFrame[SPADLSchema]) -> None:
+    actions = spadl_actions[spadl_actions.type_id != spadl.config.actiontypes.index('dribble')]
+    accelerated, fallback = _both(_add_dribbles, actions.reset_index(drop=True))
+    assert len(accelerated) > len(actions)
+    pd.testing.assert_frame_equal(accelerated, fallback)
+
+
+def test_convert_to_atomic(season_actions: DataFrame[SPADLSchema]) -> None:
+    accelerated, fallback = _both(atomicspadl.convert_to_atomic, season_actions)
+    pd.testing.assert_frame_equal(accelerated, fallback)
+
+
+def test_goalscore(season_actions: DataFrame[SPADLSchema]) -> None:
+    actions = spadl.add_names(season_actions)
+    accelerated, fallback = _both(fs.goalscore, [actions])
+    assert accelerated.goalscore_team.max() > 0
+    pd.testing.assert_frame_equal(accelerated, fallback)
+    # a single game without a game_id
+    accelerated, fallback = _both(fs.goalscore, [actions.drop(columns='game_id')])
+    pd.testing.assert_frame_equal(accelerated, fallback)
+    # games that are not contiguous
+    shuffled = actions.sample(frac=1, random_state=0)
+    accelerated, fallback = _both(fs.goalscore, [shuffled])
+    pd.testing.assert_frame_equal(accelerated, fallback)
+
+    atomic_actions = atomicspadl.add_names(atomicspadl.convert_to_atomic(season_actions))
+    accelerated, fallback = _both(afs.goalscore, [atomic_actions])
+    assert accelerated.goalscore_team.max() > 0
+    pd.testing.assert_frame_equal(accelerated, fallback)
+
+
+def test_labels(season_actions: DataFrame[SPADLSchema]) -> None:
+    actions = spadl.add_names(season_actions)
+    accelerated, fallback = _both(lab.horizons, actions, [1, 5, 10])
+    assert accelerated.scores_10.any()
+    pd.testing.assert_frame_equal(accelerated, fallback)
+    accelerated, fallback = _both(lab.scores_in_time, actions, 20)
+    pd.testing.assert_frame_equal(accelerated, fallback)
+
+    atomic_actions = atomicspadl.add_names(atomicspadl.convert_to_atomic(season_actions))
+    accelerated, fallback = _both(alab.horizons, atomic_actions, [1, 10])
+    pd.testing.assert_frame_equal(accelerated, fallback)
+    accelerated, fallback = _both(alab.concedes_in_time, atomic_actions, 20)
+    pd.testing.assert_frame_equal(accelerated, fallback)
@@ -0,0 +1,86 @@
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import socceraction.xthreat as xt
+from socceraction.registry import ModelRegistry, UnknownModelError
+
+
+def _xt_model() -> xt.ExpectedThreat:
+    model = xt.ExpectedThreat(l=4, w=2)
+    model.xT = np.arange(8, dtype=float).reshape(2, 4)
+    return model
+
+
+def test_lazy_load(tmp_path: Path) -> None:
+    """It should only load a model when it is requested."""
+    path = tmp_path / 'xt.json'
+    _xt_model().save_model(str(path))
+    registry = ModelRegistry()
+    registry.register('xt', 43, 3, 'v1', path)
+    assert ('xt', 43, 3, 'v1') in registry
+    assert not registry.is_resident('xt', 43, 3, 'v1')
+    model = registry.get('xt', 43, 3, 'v1')
+    np.testing.assert_array_equal(model.xT, _xt_model().xT)
+    assert registry.get('xt', 43, 3, 'v1') is model
+    stats = registry.stats
+    assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+    with pytest.raises(UnknownModelError):
+        registry.get('xt', 43, 4, 'v1')
+
+
+def test_lru_eviction() -> None:
+    """It should evict the least recently used model that is not pinned."""
+    registry = ModelRegistry(max_entries=2)
+    for season in range(4):
+        registry.register('xt', 43, season, 'v1', _xt_model)
+    registry.pin('xt', 43, 0, 'v1')
+    registry.get('xt', 43, 1, 'v1')
+    registry.get('xt', 43, 2, 'v1')
+    assert registry.is_resident('xt', 43, 0, 'v1')
+    assert not registry.is_resident('xt', 43, 1, 'v1')
+    registry.unpin('xt', 43, 0, 'v1')
+    registry.get('xt', 43, 3, 'v1')
+    assert not registry.is_resident('xt', 43, 0, 'v1')
+    assert registry.stats.evictions == 2
+
+
+def test_memory_limit() -> None:
+    """It should keep the combined size of the models under the limit."""
+    registry = ModelRegistry(max_bytes=100)
+    registry.register('xt', 43, 1, 'v1', _xt_model)
+    registry.register('xt', 43, 2, 'v1', _xt_model)
+    registry.get('xt', 43, 1, 'v1')
+    assert registry.stats.nbytes == 64
+    registry.get('xt', 43, 2, 'v1')
+    assert registry.stats.entries == 1
+    assert registry.is_resident('xt', 43, 2, 'v1')
+
+
+def test_concurrent_get_loads_once() -> None:
+    """It should load a model only once when it is requested concurrently."""
+    calls = []
+
+    def load() -> xt.ExpectedThreat:
+        calls.append(1)
+        time.sleep(0.05)
+        return _xt_model()
+
+    registry = ModelRegistry()
+    registry.register('xt', 43, 3, 'v1', load)
+    models = []
+    threads = [
+        threading.Thread(target=lambda: models.append(registry.get('xt', 43, 3, 'v1')))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert all(m is models[0] for m in models)
+    assert registry.stats.misses == 1
+    assert registry.stats.hits == 7
@@ -0,0 +1,201 @@
+import json
+import threading
+import urllib.request
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandera.typing import DataFrame
+
+import socceraction.xthreat as xt
+from socceraction.registry import ModelRegistry
+from socceraction.serve import MicroBatcher, RatingService, make_server
+from socceraction.spadl import SPADLSchema
+from socceraction.vaep import VAEP
+
+
+def test_micro_batcher() -> None:
+    """It should gather concurrent calls into batches of at most max_batch items."""
+    sizes: List[int] = []
+
+    def double(items: List[int]) -> List[int]:
+        sizes.append(len(items))
+        return [2 * i for i in items]
+
+    batcher = MicroBatcher(double, max_batch=4, max_wait=0.1)
+    results = {}
+    threads = [
+        threading.Thread(target=lambda i=i: results.update({i: batcher.submit(i)}))
+        for i in range(10)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+    assert results == {i: 2 * i for i in range(10)}
+    assert sum(sizes) == 10
+    assert max(sizes) <= 4
+    assert len(sizes) < 10
+
+
+def test_micro_batcher_error() -> None:
+    """It should raise the exception of a failed batch in each caller."""
+
+    def fail(items: List[int]) -> List[int]:
+        raise RuntimeError('boom')
+
+    batcher = MicroBatcher(fail)
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
+    batcher.close()
+
+
+def test_micro_batcher_isolates_errors() -> None:
+    """It should only raise the exception of a failed batch for the failing items."""
+    sizes: List[int] = []
+
+    def invert(items: List[int]) -> List[float]:
+        sizes.append(len(items))
+        return [1 / i for i in items]
+
+    batcher = MicroBatcher(invert, max_batch=4, max_wait=0.1)
+    results = {}
+
+    def submit(i: int) -> None:
+        try:
+            results[i] = batcher.submit(i)
+        except ZeroDivisionError as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in [1, 0, 2]]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+    assert sizes[0] == 3
+    assert results[1] == 1 and results[2] == 0.5
+    assert isinstance(results[0], ZeroDivisionError)
+
+
+@pytest.fixture
+def server_url(fitted_vaep: VAEP) -> Iterator[str]:
+    model = xt.ExpectedThreat()
+    model.xT = np.random.RandomState(0).rand(model.w, model.l)
+    registry = ModelRegistry()
+    registry.register('xt', 43, 3, 'v1', lambda: model)
+    registry.register('vaep', 43, 3, 'v1', lambda: fitted_vaep)
+    service = RatingService(registry, max_batch=8, max_wait=0.01)
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def _post(url: str, body: dict) -> dict:
+    request = urllib.request.Request(
+        url, json.dumps(body).encode(), {'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def test_rate_xt(server_url: str, spadl_actions: DataFrame[SPADLSchema]) -> None:
+    """It should return the same xT ratings as the model."""
+    actions = spadl_actions.iloc[:50]
+    body = {
+        'model_type': 'xt',
+        'competition_id': 43,
+        'season_id': 3,
+        'version': 'v1',
+        'actions': actions.to_dict(orient='list'),
+    }
+    results: List[dict] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(_post(f'{server_url}/rate', body)))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    model = xt.ExpectedThreat()
+    model.xT = np.random.RandomState(0).rand(model.w, model.l)
+    expected = model.rate(actions)
+    for result in results:
+        ratings = pd.DataFrame(result['ratings'])
+        assert list(ratings.action_id) == list(actions.action_id)
+        np.testing.assert_allclose(ratings.xt_value.astype(float), expected)
+
+
+def test_rate_vaep(
+    server_url: str,
+    fitted_vaep: VAEP,
+    spadl_game: pd.Series,
+    spadl_actions: DataFrame[SPADLSchema],
+) -> None:
+    """It should return the same VAEP ratings as the model, also in a batch."""
+    body = {
+        'model_type': 'vaep',
+        'competition_id': 43,
+        'season_id': 3,
+        'version': 'v1',
+        'home_team_id': int(spadl_game.home_team_id),
+        'actions': spadl_actions.to_dict(orient='records'),
+    }
+    results: List[dict] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(_post(f'{server_url}/rate', body)))
+        for _ in range(3)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    expected = fitted_vaep.rate(spadl_game, spadl_actions)
+    assert len(results) == 3
+    for result in results:
+        ratings = pd.DataFrame(result['ratings'])
+        assert list(ratings.action_id) == list(spadl_actions.action_id)
+        np.testing.assert_allclose(ratings[expected.columns].astype(float), expected)
+
+
+def test_rate_invalid_actions(server_url: str, spadl_actions: DataFrame[SPADLSchema]) -> None:
+    """It should only reject the invalid requests of a batch, with 400."""
+    actions = spadl_actions.iloc[:50]
+    body = {'model_type': 'xt', 'competition_id': 43, 'season_id': 3, 'version': 'v1'}
+    bodies = [
+        dict(body, actions=actions.to_dict(orient='list')),
+        dict(body, actions=actions.drop(columns='start_x').to_dict(orient='list')),
+        dict(body, actions=actions.to_dict(orient='list')),
+    ]
+    statuses = {}
+
+    def post(i: int) -> None:
+        try:
+            _post(f'{server_url}/rate', bodies[i])
+            statuses[i] = 200
+        except urllib.error.HTTPError as e:
+            statuses[i] = e.code
+            assert 'start_x' in json.loads(e.read())['error']
+
+    threads = [threading.Thread(target=post, args=(i,)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert statuses == {0: 200, 1: 400, 2: 200}
+
+
+def test_rate_unknown_model(server_url: str) -> None:
+    """It should respond with 404 if the model is not registered."""
+    body = {'model_type': 'xt', 'competition_id': 1, 'season_id': 1, 'version': 'v1'}
+    body['actions'] = []
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        _post(f'{server_url}/rate', body)
+    assert excinfo.value.code == 404
@@ -0,0 +1,99 @@
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+import pytest
+
+from socceraction.vaep import VAEP
+from socceraction.vaep import features as fs
+from socceraction.vaep.store import FeatureStore
+
+calls: List[str] = []
+
+
+@fs.simple
+def counted_startlocation(actions: fs.Actions) -> fs.Features:
+    calls.append('startlocation')
+    return actions[['start_x', 'start_y']]
+
+
+@fs.simple
+def counted_endlocation(actions: fs.Actions) -> fs.Features:
+    calls.append('endlocation')
+    return actions[['end_x', 'end_y']]
+
+
+def test_features(spadl_actions: pd.DataFrame, tmp_path: Path) -> None:
+    store = FeatureStore(tmp_path / 'features.h5')
+    game = pd.Series({'game_id': 8657, 'home_team_id': spadl_actions.team_id.iloc[0]})
+    model = VAEP(nb_prev_actions=2)
+    pd.testing.assert_frame_equal(
+        store.features(model, game, spadl_actions), model.compute_features(game, spadl_actions)
+    )
+    pd.testing.assert_frame_equal(
+        store.features(model, game, spadl_actions), model.compute_features(game, spadl_actions)
+    )
+    pd.testing.assert_frame_equal(
+        store.labels(model, game, spadl_actions), model.compute_labels(game, spadl_actions)
+    )
+    pd.testing.assert_frame_equal(
+        store.features(model, game, spadl_actions, columns=['start_x_a1', 'goalscore_diff']),
+        model.compute_features(game, spadl_actions)[['start_x_a1', 'goalscore_diff']],
+    )
+    assert store.features(model, game, spadl_actions, columns=[]).shape == (len(spadl_actions), 0)
+    with pytest.raises(ValueError, match='Unknown feature columns: start_x_a5'):
+        store.features(model, game, spadl_actions, columns=['start_x_a1', 'start_x_a5'])
+
+
+def test_incremental_features(spadl_actions: pd.DataFrame, tmp_path: Path) -> None:
+    store = FeatureStore(tmp_path / 'features.h5')
+    game = pd.Series({'game_id': 8657, 'home_team_id': spadl_actions.team_id.iloc[0]})
+    calls.clear()
+    store.features(VAEP([counted_startlocation], nb_prev_actions=1), game, spadl_actions)
+    assert calls == ['startlocation']
+    # only the new transformer is computed
+    model = VAEP([counted_startlocation, counted_endlocation], nb_prev_actions=1)
+    X = store.features(model, game, spadl_actions)
+    assert calls == ['startlocation', 'endlocation']
+    assert list(X.columns) == ['start_x_a0', 'start_y_a0', 'end_x_a0', 'end_y_a0']
+    # other parameters are stored separately
+    store.features(VAEP([counted_startlocation], nb_prev_actions=2), game, spadl_actions)
+    assert calls == ['startlocation', 'endlocation', 'startlocation', 'startlocation']
+    # changing the actions invalidates the stored features
+    calls.clear()
+    changed = spadl_actions.assign(start_x=spadl_actions.start_x + 1)
+    X = store.features(model, game, changed)
+    assert calls == ['startlocation', 'endlocation']
+    pd.testing.assert_frame_equal(X, model.compute_features(game, changed))
+
+
+def test_version(spadl_actions: pd.DataFrame, tmp_path: Path) -> None:
+    game = pd.Series({'game_id': 8657, 'home_team_id': spadl_actions.team_id.iloc[0]})
+    model = VAEP([counted_startlocation], nb_prev_actions=1)
+    calls.clear()
+    FeatureStore(tmp_path / 'features.h5', version='1').features(model, game, spadl_actions)
+    FeatureStore(tmp_path / 'features.h5', version='1').features(model, game, spadl_actions)
+    assert calls == ['startlocation']
+    # a new version recomputes all entries
+    FeatureStore(tmp_path / 'features.h5', version='2').features(model, game, spadl_actions)
+    assert calls == ['startlocation', 'startlocation']
+
+
+def test_prune(spadl_actions: pd.DataFrame, tmp_path: Path) -> None:
+    store = FeatureStore(tmp_path / 'features.h5')
+    game = pd.Series({'game_id': 8657, 'home_team_id': spadl_actions.team_id.iloc[0]})
+    model = VAEP([counted_startlocation], nb_prev_actions=1)
+    store.features(VAEP([counted_endlocation], nb_prev_actions=1), game, spadl_actions)
+    store.features(model, game, spadl_actions)
+    store.labels(model, game, spadl_actions)
+    store.prune([model])
+    calls.clear()
+    store.features(
+        VAEP([counted_startlocation, counted_endlocation], nb_prev_actions=1), game, spadl_actions
+    )
+    # only the entries of the pruned transformer are recomputed
+    assert calls == ['endlocation']
+    with pd.HDFStore(tmp_path / 'features.h5', mode='r') as h5:
+        assert len(h5.get_node('labels')._v_children) == 2
+    store.clear()
+    assert not (tmp_path / 'features.h5').exists()
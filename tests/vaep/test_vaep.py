@@ -1,8 +1,18 @@
+import copy
+import functools
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
 import pandas as pd
 import pytest
 
+import socceraction.spadl as spadl
+from socceraction.atomic.vaep import AtomicVAEP
 from socceraction.vaep import VAEP
 from socceraction.vaep import features as fs
+from socceraction.vaep import formula as vaep
+from socceraction.vaep import labels as lab
 
 
 @pytest.fixture(scope='session')
@@ -52,3 +62,251 @@ def test_predict_with_missing_features(sb_worldcup_data: pd.HDFStore, vaep_model
     del X['period_id_a0']
     with pytest.raises(ValueError):
         vaep_model.rate(game, actions, X)
+
+
+def test_cross_validate(vaep_training_data: Tuple[pd.DataFrame, pd.DataFrame]) -> None:
+    model = VAEP(nb_prev_actions=3)
+    X, y = vaep_training_data
+    game_ids = np.arange(len(X)) % 4
+    param_grid = [dict(n_estimators=5, max_depth=2), dict(n_estimators=5, max_depth=3)]
+    scores = model.cross_validate(
+        X, y, game_ids, n_splits=2, param_grid=param_grid, fit_params={}, n_jobs=2
+    )
+    assert list(scores.columns) == ['candidate', 'fold', 'label', 'brier', 'auroc']
+    assert len(scores) == 2 * 2 * 2
+    assert set(scores.label) == {'scores', 'concedes'}
+    assert scores.brier.between(0, 1).all()
+    assert scores.auroc.between(0, 1).all()
+    # the same folds are evaluated in-process
+    scores_seq = model.cross_validate(
+        X, y, game_ids, n_splits=2, param_grid=param_grid, fit_params={}, n_jobs=1
+    )
+    pd.testing.assert_frame_equal(scores, scores_seq)
+
+
+def test_rate_many(fitted_vaep: VAEP, spadl_actions: pd.DataFrame) -> None:
+    model = fitted_vaep
+    # split the actions in two games with a different home team
+    actions = spadl_actions.copy()
+    actions.loc[100:, 'game_id'] = 8658
+    actions.loc[100:, 'action_id'] -= 100
+    teams = actions.team_id.unique()
+    games = pd.DataFrame({'game_id': [8657, 8658], 'home_team_id': [teams[0], teams[1]]})
+    game_actions = {g: a.reset_index(drop=True) for g, a in actions.groupby('game_id')}
+
+    X = pd.concat(
+        [model.compute_features(game, game_actions[game.game_id]) for game in games.itertuples()]
+    )
+    assert (model.compute_features_many(games, actions).values == X.values).all()
+    y = pd.concat(
+        [model.compute_labels(game, game_actions[game.game_id]) for game in games.itertuples()]
+    )
+    assert (model.compute_labels_many(games, actions).values == y.values).all()
+
+    ratings = model.rate_many(games, actions)
+    assert ratings.index.names == ['game_id', 'action_id']
+    for game in games.itertuples():
+        expected = model.rate(game, game_actions[game.game_id])
+        np.testing.assert_allclose(ratings.loc[game.game_id].values, expected.values)
+
+
+def test_formula_respects_game_boundaries(spadl_actions: pd.DataFrame) -> None:
+    actions = spadl.add_names(spadl_actions)
+    rng = np.random.default_rng(0)
+    p_scores = pd.Series(rng.random(len(actions)))
+    p_concedes = pd.Series(rng.random(len(actions)))
+    # concatenate the game with a copy of itself
+    season = pd.concat([actions, actions.assign(game_id=0)], ignore_index=True)
+    season_values = vaep.value(
+        season,
+        pd.concat([p_scores] * 2, ignore_index=True),
+        pd.concat([p_concedes] * 2, ignore_index=True),
+    )
+    game_values = vaep.value(actions, p_scores, p_concedes)
+    np.testing.assert_allclose(season_values.values[: len(actions)], game_values.values)
+    np.testing.assert_allclose(season_values.values[len(actions) :], game_values.values)
+    # the first action of a game has no previous game state
+    assert season_values.offensive_value[len(actions)] == 0
+
+
+def test_label_horizons() -> None:
+    shot = spadl.config.actiontypes.index('shot')
+    success = spadl.config.results.index('success')
+    actions = pd.DataFrame(
+        {
+            'game_id': [1, 1, 1, 1, 2, 2, 2],
+            'team_id': [10, 10, 20, 20, 10, 20, 20],
+            'type_id': [0, 0, 0, shot, 0, 0, 0],
+            'result_id': [1, 1, 1, success, 1, 1, 1],
+        }
+    )
+    labels = lab.horizons(actions, [1, 2, 5])
+    assert labels['scores_1'].tolist() == [False, False, False, True, False, False, False]
+    assert labels['scores_2'].tolist() == [False, False, True, True, False, False, False]
+    # the window never extends into the next game
+    assert labels['scores_5'].tolist() == [False, False, True, True, False, False, False]
+    assert labels['concedes_5'].tolist() == [True, True, False, False, False, False, False]
+    assert (lab.scores(actions, 2)['scores'] == labels['scores_2']).all()
+    assert (lab.concedes(actions, 5)['concedes'] == labels['concedes_5']).all()
+
+
+def test_time_horizon_labels() -> None:
+    shot = spadl.config.actiontypes.index('shot')
+    rng = np.random.default_rng(0)
+    n = 300
+    actions = pd.DataFrame(
+        {
+            'game_id': np.repeat([1, 2, 3], n // 3),
+            'period_id': np.tile(np.repeat([1, 2], n // 6), 3),
+            'time_seconds': np.tile(np.sort(rng.uniform(0, 300, n // 6)), 6),
+            'team_id': rng.choice([10, 20], n),
+            'type_id': rng.choice([0, shot], n, p=[0.9, 0.1]),
+            'result_id': rng.choice([0, 1, 3], n),
+        }
+    )
+    y_scores = lab.scores_in_time(actions, 20)['scores']
+    y_concedes = lab.concedes_in_time(actions, 20)['concedes']
+    # compare with a pairwise look-ahead
+    goals, owngoals = lab._goals(actions)
+    for i, a in actions.iterrows():
+        window = (
+            (actions.game_id == a.game_id)
+            & (actions.period_id == a.period_id)
+            & (actions.time_seconds >= a.time_seconds)
+            & (actions.time_seconds <= a.time_seconds + 20)
+            & (actions.index >= i)
+        )
+        sameteam = actions.team_id == a.team_id
+        assert y_scores[i] == (window & ((goals & sameteam) | (owngoals & ~sameteam))).any()
+        assert y_concedes[i] == (window & ((goals & ~sameteam) | (owngoals & sameteam))).any()
+
+
+def test_rate_subset(
+    fitted_vaep: VAEP,
+    vaep_training_data: Tuple[pd.DataFrame, pd.DataFrame],
+    spadl_game: pd.Series,
+    spadl_actions: pd.DataFrame,
+) -> None:
+    model, game = fitted_vaep, spadl_game
+    X, _ = vaep_training_data
+    mask = (spadl_actions.player_id == spadl_actions.player_id.iloc[0]).values
+    mask[0] = mask[-1] = True
+    pd.testing.assert_frame_equal(
+        model.compute_features(game, spadl_actions, mask), X[mask], check_dtype=False
+    )
+    pd.testing.assert_frame_equal(
+        model.rate(game, spadl_actions, mask=mask), model.rate(game, spadl_actions)[mask]
+    )
+
+
+def test_rate_action_ids(
+    fitted_vaep: VAEP, spadl_game: pd.Series, spadl_actions: pd.DataFrame
+) -> None:
+    model, game = fitted_vaep, spadl_game
+    action_ids = spadl_actions.action_id.values[[0, 5, 6, 42]]
+    mask = spadl_actions.action_id.isin(action_ids).values
+    pd.testing.assert_frame_equal(
+        model.rate(game, spadl_actions, action_ids=action_ids),
+        model.rate(game, spadl_actions, mask=mask),
+    )
+    pd.testing.assert_frame_equal(
+        model.compute_features(game, spadl_actions, action_ids=action_ids),
+        model.compute_features(game, spadl_actions, mask),
+    )
+    with pytest.raises(ValueError, match='Unknown action_id -1'):
+        model.rate(game, spadl_actions, action_ids=[-1])
+    # an empty selection rates no actions
+    for selection in [dict(mask=np.zeros(len(spadl_actions), dtype=bool)), dict(action_ids=[])]:
+        ratings = model.rate(game, spadl_actions, **selection)
+        assert ratings.empty
+        assert list(ratings.columns) == ['offensive_value', 'defensive_value', 'vaep_value']
+    with pytest.raises(ValueError):
+        model.rate(game, spadl_actions, mask=mask, action_ids=action_ids)
+
+
+def test_prune_features(spadl_actions: pd.DataFrame) -> None:
+    model = VAEP(nb_prev_actions=1)
+    game = pd.Series({'game_id': 8657, 'home_team_id': spadl_actions.team_id.iloc[0]})
+    X = model.compute_features(game, spadl_actions)
+    # the labels only depend on the start location
+    y = pd.DataFrame({'scores': X.start_x_a0 > 60, 'concedes': X.start_x_a0 < 40})
+    model.fit(X, y, tree_params=dict(n_estimators=5, max_depth=2), fit_params={}, val_size=0)
+    ratings = model.rate(game, spadl_actions)
+
+    model.prune_features()
+    assert fs.startlocation not in model._pruned_xfns
+    assert fs.actiontype_result_onehot in model._pruned_xfns
+    X_pruned = model.compute_features(game, spadl_actions, prune=True)
+    assert set(X_pruned.columns) == set(X.columns)
+    assert (X_pruned.start_x_a0 == X.start_x_a0).all()
+    pd.testing.assert_frame_equal(model.rate(game, spadl_actions), ratings)
+
+
+def test_save_and_load(
+    fitted_vaep: VAEP, spadl_game: pd.Series, spadl_actions: pd.DataFrame, tmp_path: Path
+) -> None:
+    # pruning changes the model
+    model, game = copy.deepcopy(fitted_vaep), spadl_game
+    model.prune_features()
+    model.save(tmp_path / 'vaep')
+
+    loaded = VAEP.load(tmp_path / 'vaep')
+    assert loaded.xfns == model.xfns
+    assert loaded.nb_prev_actions == 3
+    assert loaded._pruned_xfns == model._pruned_xfns
+    # the models are only deserialised when they are needed
+    assert not loaded._VAEP__models  # type: ignore
+    pd.testing.assert_frame_equal(
+        loaded.rate(game, spadl_actions), model.rate(game, spadl_actions), check_dtype=False
+    )
+    with pytest.raises(ValueError):
+        AtomicVAEP.load(tmp_path / 'vaep')
+
+
+@pytest.mark.parametrize(
+    'xfn', [lambda actions: fs.startlocation(actions), functools.partial(fs.startlocation)]
+)
+def test_save_unimportable_xfn(
+    fitted_vaep: VAEP, xfn: fs.FeatureTransfomer, tmp_path: Path
+) -> None:
+    model = copy.deepcopy(fitted_vaep)
+    model.xfns = model.xfns + [xfn]
+    with pytest.raises(ValueError, match='Cannot save the feature transformer'):
+        model.save(tmp_path / 'vaep')
+    assert not (tmp_path / 'vaep').exists()
+
+
+@pytest.mark.parametrize('action_pos', [0, 50, 199])
+def test_rate_counterfactuals(
+    fitted_vaep: VAEP, spadl_game: pd.Series, spadl_actions: pd.DataFrame, action_pos: int
+) -> None:
+    model, game = fitted_vaep, spadl_game
+    action_id = spadl_actions.action_id.iloc[action_pos]
+    variants = pd.DataFrame(
+        {
+            'end_x': [10.0, 50.0, 90.0],
+            'end_y': [10.0, 30.0, 60.0],
+            'bodypart_id': [0, 1, 0],
+            'type_id': [0, 1, 2],
+        },
+        index=pd.Index(['a', 'b', 'c'], name='variant'),
+    )
+    ratings = model.rate_counterfactuals(game, spadl_actions, action_id, variants)
+    for variant, changes in variants.iterrows():
+        actions = spadl_actions.copy()
+        for col, value in changes.items():
+            actions.loc[actions.index[action_pos], col] = value
+        expected = model.rate(game, actions)
+        expected.index = actions.action_id.values
+        result = ratings.loc[variant]
+        pd.testing.assert_frame_equal(
+            result, expected.loc[result.index], check_names=False, check_dtype=False
+        )
+
+
+def test_rate_counterfactuals_unknown_action(
+    fitted_vaep: VAEP, spadl_game: pd.Series, spadl_actions: pd.DataFrame
+) -> None:
+    variants = pd.DataFrame({'end_x': [10.0]})
+    with pytest.raises(ValueError, match='Unknown action_id -1'):
+        fitted_vaep.rate_counterfactuals(spadl_game, spadl_actions, -1, variants)